@@ -1,6 +1,8 @@
 # diamond_project/settings.py
 
+import importlib.util
 import os
+from decimal import Decimal
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'rings.profiling.RequestProfilingMiddleware',  # no-op unless REQUEST_PROFILING is on
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS
@@ -79,6 +82,39 @@ DATABASES = {
     }
 }
 
+# Connection reuse (see rings/dbpool.py):
+#   'none'       - a new connection for every request
+#   'persistent' - keep each worker thread's connection for DB_CONN_MAX_AGE
+#                  seconds, health-checked before it is reused
+#   'pool'       - psycopg 3 connection pool; needs the optional
+#                  `psycopg[binary,pool]` and falls back to 'persistent'
+#                  without it
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'persistent')
+# Django's postgresql backend runs on psycopg 3 whenever it is importable
+# and only pools there; on psycopg2 OPTIONS['pool'] is ImproperlyConfigured
+DB_POOL_SUPPORTED = (
+    DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql'
+    and importlib.util.find_spec('psycopg') is not None
+    and importlib.util.find_spec('psycopg_pool') is not None
+)
+if DB_POOL_MODE == 'pool' and not DB_POOL_SUPPORTED:
+    DB_POOL_MODE = 'persistent'
+
+if DB_POOL_MODE == 'pool':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        },
+    }
+elif DB_POOL_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', '600'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Creates the unmanaged rings tables in the test database
+TEST_RUNNER = 'rings.testing.RingsTestRunner'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -127,6 +163,105 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Cache backend: in-process LRU (LocMemCache evicts least recently used
+# entries past MAX_ENTRIES) unless REDIS_URL points at a shared Redis.
+# Cached entries are keyed on catalog versions kept in the database, so
+# per-worker caches never serve stale data; Redis only lets workers share
+# the entries themselves.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'rings',
+            'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '5000'))},
+        }
+    }
+
+# Server-side cache of catalog list pages
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+RESPONSE_CACHE_MAX_PAGE = 5
+
+# Browser cache lifetime for catalog (diamond/setting) responses; clients
+# revalidate with If-None-Match afterwards and usually get a 304
+CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', '0'))
+
+# Catalog versions (rings/catalog.py) are stored in the database; each
+# process re-reads them at most this often, so other workers see a catalog
+# change within this many seconds
+CATALOG_VERSION_TTL = float(os.getenv('CATALOG_VERSION_TTL', '1.0'))
+
+# Analytics ingestion: /interactions/bulk/ buffers events in memory and
+# writes them with bulk_create in the background; a batch that fails to
+# save is retried MAX_RETRIES times before it is dropped
+INTERACTION_BUFFER = {
+    'MAX_EVENTS': int(os.getenv('INTERACTION_BUFFER_MAX_EVENTS', '50000')),
+    'FLUSH_SIZE': int(os.getenv('INTERACTION_BUFFER_FLUSH_SIZE', '1000')),
+    'FLUSH_INTERVAL': float(os.getenv('INTERACTION_BUFFER_FLUSH_INTERVAL', '1.0')),
+    'MAX_RETRIES': int(os.getenv('INTERACTION_BUFFER_MAX_RETRIES', '3')),
+}
+INTERACTION_BULK_MAX_EVENTS = 1000
+
+# Reverse proxies in front of the app whose X-Forwarded-For entries are
+# trusted for the client address (rings/votes.py); 0 uses REMOTE_ADDR
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+
+# Helpful votes accepted per client address (rings/votes.py); the address
+# only limits the rate, voters are told apart by user or session
+HELPFUL_VOTE_RATE = os.getenv('HELPFUL_VOTE_RATE', '30/minute')
+
+# How long a checkout holds a diamond before other shoppers can buy it
+DIAMOND_RESERVATION_TTL = int(os.getenv('DIAMOND_RESERVATION_TTL', '900'))
+
+# Order totals are computed on the server (rings/pricing.py price_order):
+# tax as a rate of the subtotal, and a flat shipping charge
+ORDER_TAX_RATE = Decimal(os.getenv('ORDER_TAX_RATE', '0.08'))
+ORDER_SHIPPING_COST = Decimal(os.getenv('ORDER_SHIPPING_COST', '0.00'))
+
+# Configurator price quotes: cache lifetime of per-row price components
+# (invalidated early by catalog version bumps) and batch size limit
+PRICE_CACHE_TIMEOUT = 3600
+QUOTE_MAX_ITEMS = 500
+
+# /diamonds/{id}/similar/ (rings/similarity.py): result limit, and how old
+# the in-memory index may get before a full rebuild instead of a delta sync
+SIMILAR_DIAMONDS_MAX_RESULTS = 24
+SIMILAR_DIAMONDS_FULL_REBUILD_SECONDS = int(os.getenv('SIMILAR_DIAMONDS_FULL_REBUILD_SECONDS', '3600'))
+
+# /diamonds/compare/ (rings/comparison.py): stones per compare set and
+# entries in the per-process LRU of computed comparisons
+COMPARE_MAX_ITEMS = 10
+COMPARE_CACHE_SIZE = 256
+
+# Value scores behind /diamonds/?ordering=-value_score (rings/valuation.py):
+# each worker checks for inventory changes every CHECK_INTERVAL seconds and
+# one of them refits the price model
+VALUE_SCORES = {
+    'BACKGROUND_REFRESH': os.getenv('VALUE_SCORES_BACKGROUND_REFRESH', 'True').lower() == 'true',
+    'CHECK_INTERVAL': int(os.getenv('VALUE_SCORES_CHECK_INTERVAL', '60')),
+}
+
+# The /api/ops/ views answer staff users, and clients that send
+# "Authorization: Bearer <OPS_TOKEN>" when it is set
+OPS_TOKEN = os.getenv('OPS_TOKEN', '')
+
+# Sampled per-request profiling (rings/profiling.py), exported as
+# Prometheus text at /api/ops/metrics/
+REQUEST_PROFILING = {
+    'ENABLED': os.getenv('REQUEST_PROFILING', 'False').lower() == 'true',
+    'SAMPLE_RATE': float(os.getenv('REQUEST_PROFILING_SAMPLE_RATE', '0.01')),
+    'SLOW_REQUEST_MS': int(os.getenv('SLOW_REQUEST_MS', '1000')),
+    # Same query shape this many times in one request is logged as a likely N+1
+    'DUPLICATE_QUERY_THRESHOLD': 5,
+}
+
 # CORS Configuration (for React frontend)
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,29 @@
+# gunicorn.conf.py
+#
+# Picked up automatically when gunicorn is started from diamond-backend/:
+#   gunicorn diamond_project.wsgi
+
+
+def post_worker_init(worker):
+    """Warm up a worker before it accepts requests"""
+    from rings.dbpool import warm_connections
+    from rings.valuation import start_value_score_refresher
+
+    try:
+        warm_connections()
+    except Exception:
+        # A cold worker is better than one that never starts
+        worker.log.exception('Could not pre-warm database connections')
+
+    # Per-worker background thread that refits value scores
+    start_value_score_refresher()
+
+
+def worker_exit(server, worker):
+    """Save buffered analytics events before the worker goes away"""
+    from rings.ingest import interaction_buffer
+
+    try:
+        interaction_buffer.close()
+    except Exception:
+        worker.log.exception('Could not flush buffered interactions')
@@ -0,0 +1,71 @@
+# rings/async_views.py
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Review
+from .ratings import aget_rating_summary
+from .serializers import ReviewSerializer
+from .views import DiamondViewSet, SettingViewSet, parse_product_reviews, product_reviews_body
+
+
+# ============================================
+# ASYNC READ PATH
+# ============================================
+#
+# Async variants of the hot read endpoints, for ASGI deployments
+#   gunicorn diamond_project.asgi -k uvicorn_worker.UvicornWorker
+# where a slow query must not hold a whole worker. They also work under
+# WSGI, where Django runs them in an event loop per request.
+#
+# Plain ORM reads use Django's async ORM (aget, afirst, aaggregate, async
+# for). DRF views are synchronous, so the catalog endpoints run the whole
+# viewset in sync_to_async; under ASGI every request gets its own
+# thread-sensitive executor, so requests still don't queue behind each
+# other and Django's request signals manage the connection as usual.
+#
+# Compare against the sync routes with `benchmark_api --async-routes`.
+
+def async_viewset_view(viewset_class, actions):
+    """
+    Serve a DRF viewset action from an async view. Filters, ETags, the
+    response cache and pagination all run as in the sync view.
+    """
+    view = viewset_class.as_view(actions)
+
+    def render(request, *args, **kwargs):
+        return view(request, *args, **kwargs).render()
+
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(render)(request, *args, **kwargs)
+
+    async_view.csrf_exempt = True
+    return async_view
+
+
+diamond_list = async_viewset_view(DiamondViewSet, {'get': 'list'})
+diamond_detail = async_viewset_view(DiamondViewSet, {'get': 'retrieve'})
+setting_list = async_viewset_view(SettingViewSet, {'get': 'list'})
+setting_detail = async_viewset_view(SettingViewSet, {'get': 'retrieve'})
+
+
+@require_GET
+async def product_reviews(request):
+    """ReviewViewSet.product_reviews on the async ORM"""
+    page_size = api_settings.PAGE_SIZE
+    try:
+        product, page_number, offset = parse_product_reviews(request.GET, page_size)
+    except ValidationError as exc:
+        return JsonResponse(exc.detail, status=400, encoder=JSONEncoder)
+
+    queryset = Review.objects.filter(is_approved=True, **product).select_related('user')
+    reviews = [review async for review in queryset[offset:offset + page_size]]
+    summary = await aget_rating_summary(product.get('diamond_id'), product.get('setting_id'))
+
+    return JsonResponse(product_reviews_body(
+        request.build_absolute_uri(), ReviewSerializer(reviews, many=True).data, summary, page_number, page_size,
+    ), encoder=JSONEncoder)
@@ -0,0 +1,198 @@
+# rings/caching.py
+
+import hashlib
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import parse_etags, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from .catalog import get_catalog_version
+
+
+# ============================================
+# CONDITIONAL GET
+# ============================================
+
+class ConditionalCatalogMixin:
+    """
+    ETag / 304 support for read-only catalog viewsets.
+
+    The ETag is derived from the catalog versions the view depends on plus
+    the request path and query, so it is known before any query runs. A
+    matching If-None-Match short-circuits to 304 without touching the
+    queryset or serializers.
+    """
+    catalog_names = []
+
+    def get_catalog_names(self, request):
+        """Catalog tables this request's response depends on"""
+        return self.catalog_names
+
+    def get_catalog_etag(self, request):
+        versions = ':'.join(str(get_catalog_version(name)) for name in self.get_catalog_names(request))
+        renderer = getattr(request, 'accepted_renderer', None)
+        key = f'{versions}|{request.get_full_path()}|{renderer.format if renderer else ""}'
+        return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+    def conditional_response(self, request, view, *args, **kwargs):
+        etag = self.get_catalog_etag(request)
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        matches = False
+        if if_none_match:
+            candidates = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)]
+            matches = '*' in candidates or etag in candidates
+
+        if matches:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = view(request, *args, **kwargs)
+
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            max_age = getattr(settings, 'CATALOG_CACHE_MAX_AGE', 0)
+            response['Cache-Control'] = f'public, max-age={max_age}, must-revalidate'
+            patch_vary_headers(response, ['Accept'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+
+# ============================================
+# RESPONSE CACHE
+# ============================================
+
+class ResponseCacheStats:
+    """Per-process hit/miss counters for the response cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'bypasses': 0, 'waits': 0}
+
+    def incr(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+response_cache_stats = ResponseCacheStats()
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+# Pagination links are absolute URLs built from the request's scheme and
+# host; pages are cached with them reduced to path + query
+PAGE_LINKS = ['next', 'previous']
+
+
+def relative_page_links(data):
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    for name in PAGE_LINKS:
+        if data.get(name):
+            data[name] = urlunsplit(('', '') + tuple(urlsplit(data[name]))[2:])
+    return data
+
+
+def absolute_page_links(request, data):
+    if not isinstance(data, dict):
+        return data
+    data = dict(data)
+    for name in PAGE_LINKS:
+        if data.get(name):
+            data[name] = request.build_absolute_uri(data[name])
+    return data
+
+
+class CachedListMixin:
+    """
+    Server-side cache of rendered list pages.
+
+    Only requests whose query params are all in `response_cache_params` and
+    whose page is within RESPONSE_CACHE_MAX_PAGE are cached, which covers
+    the hot default/common-filter pages without letting arbitrary queries
+    churn the cache. Keys include the catalog versions, so any catalog
+    change invalidates every cached page of that table at once.
+
+    Pagination links are stored relative and made absolute again for each
+    request, so a page first rendered through one host or scheme doesn't
+    hand those links to clients of another.
+
+    On a miss only one request per key recomputes the page; concurrent
+    requests for the same key wait briefly for it instead of all hitting
+    the database (single flight).
+    """
+    response_cache_params = []
+
+    def get_response_cache_key(self, request):
+        params = request.query_params
+        if any(name not in self.response_cache_params for name in params):
+            return None
+        try:
+            page = int(params.get('page', 1))
+        except ValueError:
+            return None
+        if page > getattr(settings, 'RESPONSE_CACHE_MAX_PAGE', 5):
+            return None
+
+        normalized = sorted(
+            (name, tuple(sorted(params.getlist(name))))
+            for name in params
+            if any(value != '' for value in params.getlist(name))
+        )
+        versions = ':'.join(str(get_catalog_version(name)) for name in self.get_catalog_names(request))
+        digest = hashlib.md5(repr(normalized).encode()).hexdigest()
+        return f'rings:response:{self.basename}:{versions}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        if key is None:
+            response_cache_stats.incr('bypasses')
+            return super().list(request, *args, **kwargs)
+
+        cache = get_response_cache()
+        data = cache.get(key)
+        if data is not None:
+            response_cache_stats.incr('hits')
+            return Response(absolute_page_links(request, data))
+
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+        lock_key = f'{key}:lock'
+        lock_timeout = getattr(settings, 'RESPONSE_CACHE_LOCK_TIMEOUT', 10)
+        acquired = cache.add(lock_key, 1, lock_timeout)
+        if not acquired:
+            # Someone else is computing this page: wait for their result
+            response_cache_stats.incr('waits')
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.01)
+                data = cache.get(key)
+                if data is not None:
+                    response_cache_stats.incr('hits')
+                    return Response(absolute_page_links(request, data))
+                if cache.get(lock_key) is None:
+                    break
+
+        response_cache_stats.incr('misses')
+        try:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, relative_page_links(response.data), timeout)
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+        return response
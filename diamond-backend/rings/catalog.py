@@ -0,0 +1,72 @@
+# rings/catalog.py
+
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import CatalogVersion
+
+
+# ============================================
+# CATALOG VERSIONS
+# ============================================
+#
+# Every catalog table (diamonds, settings) has a generation counter in the
+# catalog_versions table. Anything derived from the catalog (statistics,
+# indexes, cached responses, ETags) puts the current version in its cache
+# key, so a single bump invalidates all of it at once without having to
+# find stale entries. The counters live in the database rather than the
+# cache so that a bump made by one gunicorn worker, a management command or
+# the reservation sweeper is seen by every other process, whatever cache
+# backend is configured.
+#
+# Reading the table on every request would add a round trip to each ETag
+# check, so each process keeps a copy of the (tiny) table for
+# CATALOG_VERSION_TTL seconds. Other processes see a bump within that
+# window; the process that made it sees it as soon as it commits.
+
+_versions = {}
+_loaded_at = None
+
+
+def load_catalog_versions():
+    """Read every counter from the database into the process-wide copy"""
+    global _versions, _loaded_at
+    _versions = dict(CatalogVersion.objects.values_list('name', 'version'))
+    _loaded_at = time.monotonic()
+    return _versions
+
+
+def get_catalog_version(name):
+    """Return the current generation number for a catalog table"""
+    versions = _versions
+    ttl = getattr(settings, 'CATALOG_VERSION_TTL', 1.0)
+    if _loaded_at is None or time.monotonic() - _loaded_at >= ttl:
+        versions = load_catalog_versions()
+    return versions.get(name, 1)
+
+
+def _remember(name, version):
+    if version > _versions.get(name, 0):
+        _versions[name] = version
+
+
+def bump_catalog_version(name):
+    """Invalidate everything derived from a catalog table"""
+    table = connection.ops.quote_name(CatalogVersion._meta.db_table)
+    sql = f"""
+        INSERT INTO {table} (name, version, updated_at) VALUES (%s, 2, %s)
+        ON CONFLICT (name) DO UPDATE SET
+            version = {table}.version + 1,
+            updated_at = excluded.updated_at
+        RETURNING version
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [name, connection.ops.adapt_datetimefield_value(timezone.now())])
+        version = cursor.fetchone()[0]
+    # Only show the new version to this process once it is visible to the
+    # others too; a rolled back bump must not leave it ahead of the table
+    transaction.on_commit(lambda: _remember(name, version))
+    return version
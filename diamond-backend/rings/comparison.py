@@ -0,0 +1,156 @@
+# rings/comparison.py
+
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import F
+
+from .catalog import get_catalog_version
+from .models import Diamond
+from .serializers import DiamondDetailSerializer
+from .similarity import CLARITY_GRADES, COLOR_GRADES, CUT_GRADES
+
+
+# ============================================
+# DIAMOND COMPARISON
+# ============================================
+#
+# /diamonds/compare/?ids=... loads every stone of a compare set with one
+# in_bulk query and adds what the comparison table shows next to the raw
+# fields: price per carat, grade positions on the cut/color/clarity
+# scales, differences to the best stone in the set and per-metric ranks.
+# Results are kept in a per-process LRU keyed on the sorted id tuple and
+# the catalog versions, so reordering a set or flipping back to it costs
+# nothing, and any catalog change simply stops old entries from matching.
+
+CENTS = Decimal('0.01')
+
+GRADE_SCALES = {
+    'cut_grade': ('cut', {grade.lower(): rank for rank, grade in enumerate(CUT_GRADES)}),
+    'color_grade': ('color', {grade.lower(): rank for rank, grade in enumerate(COLOR_GRADES)}),
+    'clarity_grade': ('clarity', {grade.lower(): rank for rank, grade in enumerate(CLARITY_GRADES)}),
+}
+
+# Metric -> True if a higher value ranks first
+RANKED_METRICS = {
+    'base_price': False,
+    'price_per_carat': False,
+    'carat': True,
+    'cut_grade': True,
+    'color_grade': True,
+    'clarity_grade': True,
+    'value_score': True,
+}
+
+
+def parse_compare_ids(raw):
+    """Distinct ids from a comma separated list, in the order given"""
+    ids = []
+    for value in (raw or '').split(','):
+        value = value.strip()
+        if value:
+            ids.append(int(value))
+    return list(dict.fromkeys(ids))
+
+
+def rank(values, higher_is_better):
+    """{key: 1-based rank} with ties sharing a rank; None values are left out"""
+    known = [(key, value) for key, value in values.items() if value is not None]
+    known.sort(key=lambda item: item[1], reverse=higher_is_better)
+    ranks = {}
+    for position, (key, value) in enumerate(known, start=1):
+        ranks[key] = ranks[known[position - 2][0]] if position > 1 and known[position - 2][1] == value else position
+    return ranks
+
+
+def metrics_for(diamond):
+    metrics = {
+        'base_price': diamond.base_price,
+        'carat': diamond.carat,
+        'price_per_carat': (diamond.base_price / diamond.carat).quantize(CENTS, ROUND_HALF_UP) if diamond.carat else None,
+        'value_score': diamond.value_score,
+    }
+    for name, (field, scale) in GRADE_SCALES.items():
+        metrics[name] = scale.get((getattr(diamond, field) or '').strip().lower())
+    return metrics
+
+
+def build_comparison(ids):
+    """Comparison of the available stones among `ids` (see the module comment)"""
+    diamonds = (
+        Diamond.objects.filter(is_available=True)
+        .annotate(value_score=F('valuation__value_score'))
+        .in_bulk(ids)
+    )
+    metrics = {pk: metrics_for(diamond) for pk, diamond in diamonds.items()}
+
+    ranks = {}
+    best = {}
+    for name, higher_is_better in RANKED_METRICS.items():
+        ranks[name] = rank({pk: values[name] for pk, values in metrics.items()}, higher_is_better)
+        leaders = [pk for pk, position in ranks[name].items() if position == 1]
+        best[name] = min(leaders) if leaders else None
+
+    lowest_price = min((values['base_price'] for values in metrics.values()), default=None)
+    lowest_per_carat = min(
+        (values['price_per_carat'] for values in metrics.values() if values['price_per_carat'] is not None),
+        default=None,
+    )
+    top_grades = {
+        name: max((values[name] for values in metrics.values() if values[name] is not None), default=None)
+        for name in GRADE_SCALES
+    }
+
+    entries = {}
+    for pk, diamond in diamonds.items():
+        values = metrics[pk]
+        derived = {
+            'price_per_carat': values['price_per_carat'],
+            'value_score': values['value_score'],
+            'price_difference': values['base_price'] - lowest_price,
+            'price_difference_percent': float(
+                ((values['base_price'] - lowest_price) / lowest_price * 100).quantize(CENTS, ROUND_HALF_UP)
+            ) if lowest_price else None,
+            'price_per_carat_difference': (
+                values['price_per_carat'] - lowest_per_carat if values['price_per_carat'] is not None else None
+            ),
+        }
+        for name in GRADE_SCALES:
+            derived[name] = values[name]
+            # Steps below the best grade in the set (0 for the best)
+            derived[f'{name}_difference'] = (
+                values[name] - top_grades[name] if values[name] is not None else None
+            )
+        for name, value in derived.items():
+            if isinstance(value, Decimal):
+                derived[name] = f'{value:f}'
+
+        data = DiamondDetailSerializer(diamond).data
+        data['metrics'] = derived
+        data['ranks'] = {name: ranks[name].get(pk) for name in RANKED_METRICS}
+        entries[pk] = data
+
+    return {'entries': entries, 'best': best}
+
+
+@lru_cache(maxsize=getattr(settings, 'COMPARE_CACHE_SIZE', 256))
+def _cached_comparison(ids, diamond_version, valuation_version):
+    return build_comparison(list(ids))
+
+
+def compare_diamonds(ids):
+    """Comparison response for `ids`, with stones in the requested order"""
+    comparison = _cached_comparison(
+        tuple(sorted(ids)), get_catalog_version('diamond'), get_catalog_version('valuation'),
+    )
+    entries = comparison['entries']
+    return {
+        'diamonds': [entries[pk] for pk in ids if pk in entries],
+        'best': comparison['best'],
+        'missing': [pk for pk in ids if pk not in entries],
+    }
+
+
+def comparison_cache_info():
+    return _cached_comparison.cache_info()._asdict()
@@ -0,0 +1,106 @@
+# rings/compatibility.py
+
+import json
+import re
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Setting, SettingCompatibility
+
+
+# ============================================
+# SETTING / DIAMOND COMPATIBILITY
+# ============================================
+#
+# Setting.compatible_shapes is free text (a JSON list, a PostgreSQL array
+# literal or a delimited list, depending on who entered it). It is parsed
+# once into setting_compatibility rows so compatibility filters become
+# indexed lookups rather than LIKE scans over the text.
+
+ANY_SHAPE = '*'
+ANY_SHAPE_WORDS = {'all', 'any', 'all shapes', 'any shape'}
+
+
+def parse_compatible_shapes(text):
+    """Return the shapes a setting accepts; [ANY_SHAPE] if unrestricted"""
+    if text is None or not text.strip():
+        return [ANY_SHAPE]
+    text = text.strip()
+
+    values = None
+    if text.startswith('['):
+        try:
+            values = json.loads(text)
+        except ValueError:
+            values = None
+    if values is None:
+        if text.startswith('{') and text.endswith('}'):
+            text = text[1:-1]
+        values = re.split(r'[,;|/]', text)
+
+    shapes = []
+    for value in values:
+        shape = str(value).strip().strip('"\'').strip()
+        if not shape:
+            continue
+        if shape.lower() in ANY_SHAPE_WORDS:
+            return [ANY_SHAPE]
+        shape = shape.title()
+        if shape not in shapes:
+            shapes.append(shape)
+    return shapes or [ANY_SHAPE]
+
+
+def rebuild_compatibility(settings_queryset=None):
+    """(Re)build index rows for the given settings (default: all)"""
+    if settings_queryset is None:
+        settings_queryset = Setting.objects.all()
+    rows = []
+    setting_ids = []
+    for setting in settings_queryset.only('setting_id', 'compatible_shapes', 'min_carat', 'max_carat').iterator():
+        setting_ids.append(setting.pk)
+        for shape in parse_compatible_shapes(setting.compatible_shapes):
+            rows.append(SettingCompatibility(
+                setting_id=setting.pk,
+                shape=shape[:20],
+                min_carat=setting.min_carat,
+                max_carat=setting.max_carat,
+            ))
+    with transaction.atomic():
+        SettingCompatibility.objects.filter(setting_id__in=setting_ids).delete()
+        SettingCompatibility.objects.bulk_create(rows, batch_size=1000)
+    return len(setting_ids)
+
+
+def carat_fits(carat):
+    return (
+        (Q(min_carat__isnull=True) | Q(min_carat__lte=carat))
+        & (Q(max_carat__isnull=True) | Q(max_carat__gte=carat))
+    )
+
+
+def filter_settings_for_diamond(queryset, diamond):
+    """Settings that accept the diamond's shape and carat"""
+    matches = SettingCompatibility.objects.filter(
+        carat_fits(diamond.carat),
+        setting_id=OuterRef('pk'),
+        shape__in=[diamond.shape, ANY_SHAPE],
+    )
+    return queryset.filter(Exists(matches))
+
+
+def filter_diamonds_for_setting(queryset, setting_id):
+    """Diamonds whose shape and carat the setting accepts"""
+    rows = list(SettingCompatibility.objects.filter(setting_id=setting_id))
+    if not rows:
+        return queryset.none()
+    shapes = {row.shape for row in rows}
+    if ANY_SHAPE not in shapes:
+        queryset = queryset.filter(shape__in=shapes)
+    # Carat limits are per setting, so every row carries the same window
+    if rows[0].min_carat is not None:
+        queryset = queryset.filter(carat__gte=rows[0].min_carat)
+    if rows[0].max_carat is not None:
+        queryset = queryset.filter(carat__lte=rows[0].max_carat)
+    return queryset
@@ -0,0 +1,93 @@
+# rings/dbpool.py
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+
+# ============================================
+# DATABASE CONNECTION REUSE
+# ============================================
+#
+# settings.DB_POOL_MODE picks how request threads get a connection:
+# 'none' opens one per request, 'persistent' keeps each thread's connection
+# for CONN_MAX_AGE seconds (health-checked before reuse), and 'pool' uses
+# psycopg 3's connection pool. Workers warm their connections at boot (see
+# gunicorn.conf.py) so the first requests don't pay for TLS and auth.
+
+class ConnectionStats:
+    """Per-process counters of new database connections"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'connections_opened': 0, 'warmed': 0, 'warm_ms': 0.0}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+connection_stats = ConnectionStats()
+
+
+def get_pool_mode():
+    return getattr(settings, 'DB_POOL_MODE', 'none')
+
+
+def get_pool(alias='default'):
+    """The psycopg connection pool behind an alias, or None"""
+    connection = connections[alias]
+    if not connection.settings_dict.get('OPTIONS', {}).get('pool'):
+        return None
+    return connection.pool
+
+
+def warm_connections(timeout=10.0):
+    """
+    Open database connections ahead of the first request.
+
+    In pool mode this waits until the pool holds its min_size connections
+    and hands the checked-out one back; otherwise the calling thread's
+    connection stays open for reuse under CONN_MAX_AGE.
+    """
+    if get_pool_mode() == 'none':
+        return
+    started = time.monotonic()
+    for alias in settings.DATABASES:
+        connection = connections[alias]
+        connection.ensure_connection()
+        pool = get_pool(alias)
+        if pool is not None:
+            pool.wait(timeout=timeout)
+            connection.close()
+    connection_stats.incr('warmed')
+    connection_stats.incr('warm_ms', (time.monotonic() - started) * 1000)
+
+
+def get_pool_stats(alias='default'):
+    """Connection reuse figures for this worker process"""
+    connection = connections[alias]
+    stats = connection_stats.snapshot()
+    stats['warm_ms'] = round(stats['warm_ms'], 1)
+    stats['mode'] = get_pool_mode()
+    stats['conn_max_age'] = connection.settings_dict.get('CONN_MAX_AGE')
+
+    pool = get_pool(alias)
+    if pool is not None:
+        raw = pool.get_stats()
+        stats.update({
+            'pool_size': raw.get('pool_size', 0),
+            'pool_available': raw.get('pool_available', 0),
+            'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+            'requests_waiting': raw.get('requests_waiting', 0),
+            'waits': raw.get('requests_queued', 0),
+            'wait_ms': raw.get('requests_wait_ms', 0),
+            'timeouts': raw.get('requests_errors', 0),
+        })
+    return stats
@@ -0,0 +1,135 @@
+# rings/exports.py
+
+import csv
+from itertools import groupby
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Order, OrderItem, UserInteraction
+
+
+# ============================================
+# STREAMING EXPORTS
+# ============================================
+#
+# Exports read rows with values_list().iterator(), which uses a server-side
+# cursor on PostgreSQL, and write them out through a StreamingHttpResponse
+# generator, so memory stays flat however many rows are exported. Output is
+# yielded in blocks of rows rather than line by line to keep the per-row
+# overhead low.
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+CHUNK_SIZE = 2000
+ROWS_PER_BLOCK = 500
+
+INTERACTION_FIELDS = [field.attname for field in UserInteraction._meta.concrete_fields]
+ORDER_FIELDS = [field.attname for field in Order._meta.concrete_fields]
+ITEM_FIELDS = [field.attname for field in OrderItem._meta.concrete_fields if field.attname != 'order_id']
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+JSON_ENCODER = JSONEncoder()
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        # JSON columns (interaction_data) as JSON, not Python reprs
+        return JSON_ENCODER.encode(value)
+    return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    block = []
+    for row in rows:
+        block.append(writer.writerow([format_value(value) for value in row]))
+        if len(block) >= ROWS_PER_BLOCK:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def stream_ndjson(objects):
+    encoder = JSONEncoder()
+    block = []
+    for obj in objects:
+        block.append(encoder.encode(obj) + '\n')
+        if len(block) >= ROWS_PER_BLOCK:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+def export_response(stream, export_format, name):
+    response = StreamingHttpResponse(stream, content_type=EXPORT_FORMATS[export_format])
+    filename = f'{name}-{timezone.now():%Y%m%d-%H%M%S}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def export_interactions(queryset, export_format):
+    """Stream user_interactions rows, oldest first"""
+    rows = (
+        queryset.order_by('created_at', 'pk')
+        .values_list(*INTERACTION_FIELDS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    if export_format == 'csv':
+        stream = stream_csv(INTERACTION_FIELDS, rows)
+    else:
+        stream = stream_ndjson(dict(zip(INTERACTION_FIELDS, row)) for row in rows)
+    return export_response(stream, export_format, 'interactions')
+
+
+def export_orders(queryset, export_format):
+    """
+    Stream orders with their items from a single LEFT JOIN query.
+
+    CSV has one line per item (order columns repeated, prefixed `item_`
+    columns for the item; an order without items gets one line with empty
+    item columns). NDJSON has one object per order with an `items` list.
+    """
+    item_lookups = [f'items__{name}' for name in ITEM_FIELDS]
+    rows = (
+        queryset.order_by('pk', 'items__pk')
+        .values_list(*ORDER_FIELDS, *item_lookups)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    if export_format == 'csv':
+        header = ORDER_FIELDS + [f'item_{name}' for name in ITEM_FIELDS]
+        return export_response(stream_csv(header, rows), export_format, 'orders')
+
+    order_width = len(ORDER_FIELDS)
+
+    def orders():
+        for _, order_rows in groupby(rows, key=lambda row: row[0]):
+            order = None
+            items = []
+            for row in order_rows:
+                if order is None:
+                    order = dict(zip(ORDER_FIELDS, row[:order_width]))
+                item = row[order_width:]
+                if item[0] is not None:
+                    items.append(dict(zip(ITEM_FIELDS, item)))
+            order['items'] = items
+            yield order
+
+    return export_response(stream_ndjson(orders()), export_format, 'orders')
@@ -0,0 +1,141 @@
+# rings/fastpath.py
+
+import decimal
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .profiling import timed_serialization
+
+
+# ============================================
+# LIST SERIALIZATION FAST PATH
+# ============================================
+#
+# For list pages most of the time goes to DRF's per-row field machinery,
+# not SQL. A RowEncoder is compiled once per serializer class from its
+# declared fields: it knows which values() lookups to fetch and how each
+# field turns a raw column value into its representation, so a page is
+# rendered from plain dicts without model instances or serializer calls.
+# The output is the same as the serializer's; serializers with fields the
+# compiler doesn't understand (method fields, dotted sources, ...) simply
+# keep using the normal path.
+
+# Fields whose to_representation returns database values unchanged
+PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField)
+
+
+def compile_decimal(field):
+    """DecimalField.to_representation with its quantize context prepared once"""
+    coerce_to_string = getattr(field, 'coerce_to_string', True)
+    if field.decimal_places is None or field.localize or field.normalize_output or not coerce_to_string:
+        return field.to_representation
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+
+    def to_representation(value):
+        if not isinstance(value, decimal.Decimal):
+            return field.to_representation(value)
+        return f'{value.quantize(exponent, rounding=rounding, context=context):f}'
+    return to_representation
+
+
+class RowEncoder:
+    """Renders values() rows the way a ModelSerializer renders instances"""
+
+    def __init__(self, steps, lookups, pk_lookup):
+        self.steps = steps
+        self.lookups = lookups
+        self.pk_lookup = pk_lookup
+
+    def encode(self, row):
+        data = {}
+        for name, lookup, convert, nested in self.steps:
+            if nested is not None:
+                data[name] = None if row[nested.pk_lookup] is None else nested.encode(row)
+                continue
+            value = row[lookup]
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+
+def compile_row_encoder(serializer, prefix=''):
+    """RowEncoder for a ModelSerializer instance, or None if it can't be compiled"""
+    if not isinstance(serializer, serializers.ModelSerializer):
+        return None
+    model = serializer.Meta.model
+    model_fields = {field.name: field for field in model._meta.concrete_fields}
+    steps = []
+    lookups = [prefix + model._meta.pk.attname]
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        source = field.source
+        if isinstance(field, serializers.BaseSerializer):
+            if getattr(field, 'many', False) or source not in model_fields or not model_fields[source].is_relation:
+                return None
+            nested = compile_row_encoder(field, f'{prefix}{source}__')
+            if nested is None:
+                return None
+            steps.append((name, None, None, nested))
+            lookups.extend(nested.lookups)
+            continue
+
+        model_field = model_fields.get(source)
+        if model_field is None:
+            return None
+        lookup = prefix + source
+        if model_field.is_relation:
+            if not isinstance(field, serializers.PrimaryKeyRelatedField) or field.pk_field is not None:
+                return None
+            convert = None
+        elif isinstance(field, PASSTHROUGH_FIELDS):
+            convert = None
+        elif isinstance(field, serializers.DecimalField):
+            convert = compile_decimal(field)
+        else:
+            convert = field.to_representation
+        steps.append((name, lookup, convert, None))
+        lookups.append(lookup)
+
+    return RowEncoder(steps, list(dict.fromkeys(lookups)), prefix + model._meta.pk.attname)
+
+
+_encoders = {}
+
+
+def get_row_encoder(serializer_class):
+    """Compiled RowEncoder for a serializer class (cached), or None"""
+    if serializer_class not in _encoders:
+        _encoders[serializer_class] = compile_row_encoder(serializer_class())
+    return _encoders[serializer_class]
+
+
+class FastListMixin:
+    """
+    Serve list() from values() rows through a compiled RowEncoder.
+
+    Falls back to the regular serializer path when the list serializer
+    can't be compiled. Ordering fields are fetched as well so keyset
+    pagination can build its cursor from the rows.
+    """
+
+    def list(self, request, *args, **kwargs):
+        encoder = get_row_encoder(self.get_serializer_class())
+        if encoder is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        extra = [name for name in getattr(self, 'ordering_fields', None) or [] if isinstance(name, str)]
+        rows = queryset.values(*dict.fromkeys(encoder.lookups + extra))
+
+        page = self.paginate_queryset(rows)
+        with timed_serialization():
+            data = [encoder.encode(row) for row in (page if page is not None else rows)]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
@@ -0,0 +1,140 @@
+# rings/feeds.py
+
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .catalog import bump_catalog_version
+from .models import Diamond, OrderItem
+from .serializers import DiamondImportSerializer
+
+
+# ============================================
+# SUPPLIER FEED IMPORT
+# ============================================
+#
+# Feeds are read row by row and written in batches, so memory stays flat
+# however large the file is. Each batch is one bulk INSERT ... ON CONFLICT
+# (sku) DO UPDATE. Every upserted row gets updated_at = the run's start
+# time, so after the last batch the stones the feed no longer lists are
+# exactly the available ones with an older updated_at, less the ones whose
+# row was listed but failed validation. Signals don't fire
+# for bulk writes, so the diamond catalog version is bumped once at the
+# end. The version is stored in the database (rings/catalog.py), so the
+# bump made by the import command reaches every web worker, which drop
+# their cached pages, statistics and search index within
+# CATALOG_VERSION_TTL seconds.
+
+FEED_FORMATS = ['csv', 'ndjson']
+IMPORT_FIELDS = list(DiamondImportSerializer().fields)
+
+
+def read_feed(stream, feed_format):
+    """Yield raw row dicts from a CSV or newline-delimited JSON stream"""
+    if feed_format == 'csv':
+        for row in csv.DictReader(stream):
+            # CSV has no null: treat empty cells as missing values
+            yield {key.strip(): (value if value != '' else None) for key, value in row.items() if key}
+    elif feed_format == 'ndjson':
+        for line in stream:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+    else:
+        raise ValueError(f'Unknown feed format: {feed_format}')
+
+
+def upsert_diamonds(diamonds, run_started):
+    """Insert or update one batch of validated Diamond instances by sku"""
+    skus = [diamond.sku for diamond in diamonds]
+    # A stone we already sold must not be relisted by a stale feed
+    sold = set(OrderItem.objects.filter(diamond_sku__in=skus).values_list('diamond_sku', flat=True))
+    for diamond in diamonds:
+        diamond.is_available = diamond.sku not in sold
+        diamond.created_at = run_started
+        diamond.updated_at = run_started
+
+    with transaction.atomic():
+        Diamond.objects.bulk_create(
+            diamonds,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=IMPORT_FIELDS + ['is_available', 'updated_at'],
+        )
+
+
+def deactivate_missing(run_started, keep_skus=()):
+    """
+    Unlist available stones that the feed just imported did not contain.
+    `keep_skus` are stones the feed did list in rows that failed validation:
+    they are left as they were rather than taken off sale.
+    """
+    return Diamond.objects.filter(
+        Q(updated_at__lt=run_started) | Q(updated_at__isnull=True),
+        is_available=True,
+    ).exclude(sku__in=list(keep_skus)).update(is_available=False, updated_at=timezone.now())
+
+
+def import_diamond_feed(rows, batch_size=1000, deactivate=True, dry_run=False, progress=None):
+    """
+    Validate and upsert feed rows. Returns counters: read, imported,
+    invalid, deactivated, `errors` (the first few invalid rows) and
+    `catalog_version` (the diamond version after the import, or None if
+    nothing was written).
+    """
+    run_started = timezone.now()
+    stats = {'read': 0, 'imported': 0, 'invalid': 0, 'deactivated': 0, 'errors': [], 'catalog_version': None}
+    batch = {}
+    invalid_skus = set()
+    # One serializer validates every row: building its fields per row
+    # would cost more than the database writes
+    validator = DiamondImportSerializer()
+
+    def flush():
+        if batch and not dry_run:
+            upsert_diamonds(list(batch.values()), run_started)
+        stats['imported'] += len(batch)
+        batch.clear()
+        if progress:
+            progress(stats)
+
+    try:
+        for line_number, row in enumerate(rows, start=1):
+            stats['read'] += 1
+            if not isinstance(row, dict):
+                # An NDJSON line can hold any JSON value, not just an object
+                stats['invalid'] += 1
+                if len(stats['errors']) < 20:
+                    stats['errors'].append(
+                        (line_number, None, {'non_field_errors': f'Expected an object, got {type(row).__name__}.'})
+                    )
+                continue
+            try:
+                diamond = Diamond(**validator.run_validation(row))
+            except ValidationError as exc:
+                stats['invalid'] += 1
+                if isinstance(row.get('sku'), str) and row['sku'].strip():
+                    invalid_skus.add(row['sku'].strip())
+                if len(stats['errors']) < 20:
+                    errors = {field: ' '.join(map(str, messages)) for field, messages in exc.detail.items()}
+                    stats['errors'].append((line_number, row.get('sku'), errors))
+                continue
+            # Within a batch the last row for a sku wins; ON CONFLICT can't
+            # touch the same row twice in one statement
+            batch[diamond.sku] = diamond
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+        # An empty or entirely invalid feed must not unlist the whole catalog
+        if deactivate and not dry_run and stats['imported']:
+            stats['deactivated'] = deactivate_missing(run_started, invalid_skus)
+    finally:
+        # Batches written before a failure are live too
+        if not dry_run and stats['imported']:
+            stats['catalog_version'] = bump_catalog_version('diamond')
+    return stats
@@ -0,0 +1,64 @@
+# rings/hll.py
+
+import hashlib
+import math
+
+
+# ============================================
+# HYPERLOGLOG
+# ============================================
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch.
+
+    With the default precision (2**12 one-byte registers, 4 KB serialized)
+    estimates are within about 1.6% of the true count. Two sketches merge by
+    taking the register-wise maximum, which is what lets hourly buckets be
+    combined into any date range.
+    """
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            registers = bytearray(self.size)
+        elif len(registers) != self.size:
+            raise ValueError('Register count does not match precision')
+        self.registers = bytearray(registers)
+
+    @classmethod
+    def from_bytes(cls, data, precision=12):
+        return cls(precision, data)
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+    def add(self, value):
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('Cannot merge sketches of different precision')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
@@ -0,0 +1,169 @@
+# rings/ingest.py
+
+import atexit
+import logging
+import os
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import User, Diamond, Setting, RingConfiguration, UserInteraction
+from .serializers import prefetch_primary_keys
+
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# INTERACTION BUFFER
+# ============================================
+
+class BufferFull(Exception):
+    """Raised when accepting events would exceed the buffer capacity"""
+
+
+class InteractionBuffer:
+    """
+    Bounded in-memory buffer of unsaved UserInteraction rows.
+
+    Request threads only append to a deque; a background thread writes the
+    rows with bulk_create once `flush_size` events are waiting or every
+    `flush_interval` seconds, whichever comes first. When the buffer holds
+    `max_events` rows new batches are refused with BufferFull so callers can
+    apply backpressure instead of growing memory without bound.
+
+    A batch that fails to save goes back to the front of the buffer and is
+    retried on the next flush; after `max_retries` failed retries in a row
+    it is dropped and logged, so a bad row can't block the buffer forever.
+    """
+
+    def __init__(self, max_events=50000, flush_size=1000, flush_interval=1.0, max_retries=3):
+        self.max_events = max_events
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self._failures = 0
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._pid = None
+        self.stats = {'accepted': 0, 'rejected': 0, 'flushed': 0, 'retried': 0, 'failed': 0}
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, events):
+        """Queue a batch of unsaved UserInteraction instances"""
+        with self._lock:
+            if len(self._events) + len(events) > self.max_events:
+                self.stats['rejected'] += len(events)
+                raise BufferFull()
+            self._events.extend(events)
+            self.stats['accepted'] += len(events)
+            pending = len(self._events)
+        self._ensure_flusher()
+        if pending >= self.flush_size:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything currently buffered; returns the number of rows saved"""
+        saved = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._events.popleft() for _ in range(min(self.flush_size, len(self._events)))]
+                if not batch:
+                    break
+                try:
+                    UserInteraction.objects.bulk_create(batch, batch_size=self.flush_size)
+                except Exception:
+                    # Analytics must never take the site down: retry a few
+                    # times, then log and drop
+                    self._failures += 1
+                    if self._failures > self.max_retries:
+                        logger.exception(
+                            'Dropped %d buffered interactions after %d retries', len(batch), self.max_retries,
+                        )
+                        self._failures = 0
+                        self.stats['failed'] += len(batch)
+                    else:
+                        logger.warning(
+                            'Could not save %d buffered interactions (attempt %d of %d), will retry',
+                            len(batch), self._failures, self.max_retries + 1, exc_info=True,
+                        )
+                        with self._lock:
+                            self._events.extendleft(reversed(batch))
+                        self.stats['retried'] += len(batch)
+                    break
+                self._failures = 0
+                saved += len(batch)
+                self.stats['flushed'] += len(batch)
+        return saved
+
+    def close(self):
+        """Stop the flusher and write whatever is left (worker shutdown)"""
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        # Ends once every batch was saved or used up its retries
+        while self._events:
+            close_old_connections()
+            self.flush()
+
+    def _ensure_flusher(self):
+        # Threads don't survive fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='interaction-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            close_old_connections()
+            self.flush()
+
+
+def _create_buffer():
+    options = getattr(settings, 'INTERACTION_BUFFER', {})
+    buffer = InteractionBuffer(
+        max_events=options.get('MAX_EVENTS', 50000),
+        flush_size=options.get('FLUSH_SIZE', 1000),
+        flush_interval=options.get('FLUSH_INTERVAL', 1.0),
+        max_retries=options.get('MAX_RETRIES', 3),
+    )
+    # Under gunicorn the worker_exit hook closes the buffer (see
+    # gunicorn.conf.py); atexit covers runserver and management commands
+    atexit.register(buffer.close)
+    return buffer
+
+
+interaction_buffer = _create_buffer()
+
+
+# ============================================
+# BULK VALIDATION HELPERS
+# ============================================
+
+INTERACTION_RELATIONS = {
+    'user': User,
+    'diamond': Diamond,
+    'setting': Setting,
+    'config': RingConfiguration,
+}
+
+
+def prefetch_interaction_relations(events):
+    """Related rows for a batch of raw events, for PrefetchedPrimaryKeyRelatedField"""
+    return prefetch_primary_keys(events, INTERACTION_RELATIONS)
@@ -0,0 +1,19 @@
+# rings/management/commands/aggregate_helpful_votes.py
+
+from django.core.management.base import BaseCommand
+
+from rings.votes import aggregate_helpful_votes
+
+
+class Command(BaseCommand):
+    help = 'Fold pending review helpful votes into reviews.helpful_count. Run it periodically from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=10000,
+            help='Votes folded per transaction (default 10000)',
+        )
+
+    def handle(self, *args, **options):
+        processed = aggregate_helpful_votes(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Aggregated {processed} vote(s)'))
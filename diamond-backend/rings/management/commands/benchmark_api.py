@@ -0,0 +1,293 @@
+# rings/management/commands/benchmark_api.py
+
+import json
+import platform
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from rings.models import Diamond, Order, Review, Setting, User
+
+
+# ============================================
+# TRAFFIC MIX
+# ============================================
+#
+# Modeled on the frontend's diamondAPI / settingAPI / reviewAPI / orderAPI
+# calls (diamond-frontend/src/services/api.js): browsing and detail pages
+# dominate, account pages are rare. Read-only, so a run never changes the
+# catalog it measures. Each scenario is (name, weight, build) where build
+# returns the request path from sampled ids.
+
+SHAPES = ['Round', 'Princess', 'Oval', 'Cushion', 'Emerald', 'Pear']
+CUTS = ['Ideal', 'Excellent', 'Very Good']
+CARAT_RANGES = [('0.5', '1.0'), ('1.0', '1.5'), ('1.5', '2.5'), ('0.3', '0.7')]
+ORDERINGS = ['base_price', '-base_price', 'carat', '-carat', '-created_at']
+
+SCENARIOS = [
+    ('diamonds.featured', 8, lambda ids, rng: '/api/diamonds/?ordering=-created_at&page_size=6'),
+    ('diamonds.browse', 20, lambda ids, rng: '/api/diamonds/?' + urlencode({
+        'shape': rng.choice(SHAPES), 'cut': rng.choice(CUTS),
+        **dict(zip(['min_carat', 'max_carat'], rng.choice(CARAT_RANGES))), 'ordering': rng.choice(ORDERINGS),
+    })),
+    ('diamonds.detail', 15, lambda ids, rng: f"/api/diamonds/{rng.choice(ids['diamonds'])}/"),
+    ('diamonds.statistics', 3, lambda ids, rng: '/api/diamonds/statistics/'),
+    ('diamonds.search', 8, lambda ids, rng: (
+        f'/api/diamonds/search/?shape={rng.choice(SHAPES)}&min_price=1000&max_price={rng.choice([5000, 10000, 25000])}'
+    )),
+    ('settings.featured', 6, lambda ids, rng: '/api/settings/?ordering=-popularity_score'),
+    ('settings.browse', 6, lambda ids, rng: f"/api/settings/?ordering={rng.choice(['base_price', '-base_price'])}"),
+    ('settings.detail', 10, lambda ids, rng: f"/api/settings/{rng.choice(ids['settings'])}/"),
+    ('reviews.diamond', 8, lambda ids, rng: f"/api/reviews/product_reviews/?diamond_id={rng.choice(ids['reviewed_diamonds'])}"),
+    ('reviews.setting', 6, lambda ids, rng: f"/api/reviews/product_reviews/?setting_id={rng.choice(ids['reviewed_settings'])}"),
+    ('orders.mine', 4, lambda ids, rng: f"/api/orders/my_orders/?user_id={rng.choice(ids['users'])}"),
+    ('orders.detail', 4, lambda ids, rng: f"/api/orders/{rng.choice(ids['orders'])}/"),
+    ('orders.recent', 2, lambda ids, rng: '/api/orders/?ordering=-created_at'),
+]
+
+# --async-routes sends the scenarios that have an async variant (see
+# rings/async_views.py) there instead. Scenario names stay the same, so a
+# sync run and an async run of the same seed compare endpoint by endpoint:
+#   gunicorn diamond_project.wsgi -w 4
+#   benchmark_api --base-url http://localhost:8000 --concurrency 32 --output sync.json
+#   gunicorn diamond_project.asgi -w 4 -k uvicorn_worker.UvicornWorker
+#   benchmark_api --base-url http://localhost:8000 --concurrency 32 --async-routes --baseline sync.json
+ASYNC_ROUTES = [
+    (re.compile(r'^/api/(diamonds|settings)/(\d+/)?(?=\?|$)'), r'/api/async/\1/\2'),
+    (re.compile(r'^/api/reviews/product_reviews/'), '/api/async/reviews/product_reviews/'),
+]
+
+# Compared against a baseline; throughput is compared for the whole run only
+COMPARED_PERCENTILES = ['p50_ms', 'p95_ms']
+
+
+def sample_ids(rng, size):
+    """Random ids to fill the scenario paths with, read once before the run"""
+    def sample(queryset, field='pk'):
+        values = list(queryset.order_by().values_list(field, flat=True).distinct()[:size * 20])
+        return rng.sample(values, min(size, len(values)))
+
+    ids = {
+        'diamonds': sample(Diamond.objects.filter(is_available=True)),
+        'settings': sample(Setting.objects.filter(is_available=True)),
+        'reviewed_diamonds': sample(Review.objects.filter(diamond_id__isnull=False), 'diamond_id'),
+        'reviewed_settings': sample(Review.objects.filter(setting_id__isnull=False), 'setting_id'),
+        'users': sample(Order.objects.filter(user_id__isnull=False), 'user_id') or sample(User.objects.all()),
+        'orders': sample(Order.objects.all()),
+    }
+    missing = [name for name, values in ids.items() if not values]
+    if missing:
+        raise CommandError(f'No rows to sample for: {", ".join(missing)} (run seed_benchmark_data first)')
+    return ids
+
+
+def async_route(path):
+    """The async variant of a request path, or the path itself if there is none"""
+    for pattern, replacement in ASYNC_ROUTES:
+        if pattern.match(path):
+            return pattern.sub(replacement, path, count=1)
+    return path
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    rank = max(int(round(percent / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(latencies, errors, elapsed):
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(values) / count * 1000, 3) if count else None,
+        'p50_ms': round(percentile(values, 50) * 1000, 3) if count else None,
+        'p95_ms': round(percentile(values, 95) * 1000, 3) if count else None,
+        'p99_ms': round(percentile(values, 99) * 1000, 3) if count else None,
+    }
+
+
+def compare(result, baseline, max_regression):
+    """Lines describing every figure that got worse than baseline by more than max_regression percent"""
+    regressions = []
+
+    def check(label, current, previous, higher_is_better=False):
+        if not current or not previous:
+            return
+        change = (previous - current if higher_is_better else current - previous) / previous * 100
+        if change > max_regression:
+            regressions.append(f'{label}: {previous} -> {current} ({change:+.1f}% worse)')
+
+    check('total throughput_rps', result['total']['throughput_rps'], baseline['total']['throughput_rps'], True)
+    for name, figures in result['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        for field in COMPARED_PERCENTILES:
+            check(f'{name} {field}', figures[field], previous[field])
+        if figures['errors'] and not previous['errors']:
+            regressions.append(f'{name}: {figures["errors"]} errors (baseline had none)')
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a weighted, frontend-shaped mix of read requests against the '
+        'rings API and report throughput and p50/p95/p99 latency per endpoint '
+        'as JSON. Requests run in-process through the Django test client, or '
+        'over HTTP against --base-url. With --baseline the run fails when any '
+        'endpoint regressed by more than --max-regression percent.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Measured requests (default 2000)')
+        parser.add_argument('--warmup', type=int, default=200, help='Unmeasured requests first (default 200)')
+        parser.add_argument('--seed', type=int, default=42, help='Seed for the request sequence (default 42)')
+        parser.add_argument('--sample-size', type=int, default=500, help='Ids sampled per kind (default 500)')
+        parser.add_argument('--base-url', help='Run over HTTP against a server, e.g. http://localhost:8000')
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads in --base-url mode (default 1)')
+        parser.add_argument('--only', help='Comma separated scenario names to run')
+        parser.add_argument(
+            '--async-routes', action='store_true',
+            help='Request the async variants of the catalog and review endpoints where they exist',
+        )
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--baseline', help='JSON report of an earlier run to compare against')
+        parser.add_argument('--max-regression', type=float, default=10.0, help='Allowed regression in percent (default 10)')
+
+    def handle(self, *args, **options):
+        scenarios = SCENARIOS
+        if options['only']:
+            names = {name.strip() for name in options['only'].split(',')}
+            scenarios = [scenario for scenario in SCENARIOS if scenario[0] in names]
+            if not scenarios:
+                raise CommandError(f'No scenarios match --only; choose from {", ".join(s[0] for s in SCENARIOS)}')
+        if options['concurrency'] > 1 and not options['base_url']:
+            raise CommandError('--concurrency needs --base-url (the test client runs in this process)')
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read baseline: {exc}')
+
+        # The same seed gives the same ids and the same request sequence
+        rng = random.Random(options['seed'])
+        ids = sample_ids(rng, options['sample_size'])
+        names = [name for name, _, _ in scenarios]
+        weights = [weight for _, weight, _ in scenarios]
+        builders = {name: build for name, _, build in scenarios}
+        plan = [
+            (name, builders[name](ids, rng))
+            for name in rng.choices(names, weights, k=options['warmup'] + options['requests'])
+        ]
+        if options['async_routes']:
+            plan = [(name, async_route(path)) for name, path in plan]
+
+        fetch = self.http_fetcher(options['base_url']) if options['base_url'] else self.client_fetcher()
+        for name, path in plan[:options['warmup']]:
+            fetch(path)
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+
+        def run(item):
+            name, path = item
+            started = time.perf_counter()
+            ok = fetch(path)
+            duration = time.perf_counter() - started
+            with lock:
+                latencies[name].append(duration)
+                if not ok:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        measured = plan[options['warmup']:]
+        if options['concurrency'] > 1:
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                list(pool.map(run, measured))
+        else:
+            for item in measured:
+                run(item)
+        elapsed = time.perf_counter() - started
+
+        result = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'target': options['base_url'] or 'in-process',
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'seed': options['seed'],
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'concurrency': options['concurrency'],
+                'async_routes': options['async_routes'],
+                'rows': {
+                    'diamonds': Diamond.objects.count(),
+                    'settings': Setting.objects.count(),
+                    'orders': Order.objects.count(),
+                },
+            },
+            'total': summarize([d for values in latencies.values() for d in values], sum(errors.values()), elapsed),
+            'endpoints': {name: summarize(latencies[name], errors[name], elapsed) for name in names if latencies[name]},
+        }
+
+        report = json.dumps(result, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(report + '\n')
+            self.stderr.write(f'Report written to {options["output"]}')
+        else:
+            self.stdout.write(report)
+
+        if result['total']['errors']:
+            self.stderr.write(self.style.WARNING(f'{result["total"]["errors"]} requests failed'))
+        if baseline is not None:
+            regressions = compare(result, baseline, options['max_regression'])
+            if regressions:
+                raise CommandError(
+                    f'Regressed more than {options["max_regression"]}% against {options["baseline"]}:\n  '
+                    + '\n  '.join(regressions)
+                )
+            self.stderr.write(self.style.SUCCESS(f'Within {options["max_regression"]}% of {options["baseline"]}'))
+
+    def client_fetcher(self):
+        # SERVER_NAME must pass ALLOWED_HOSTS; errors are counted, not raised
+        client = Client(raise_request_exception=False, SERVER_NAME='localhost')
+
+        def fetch(path):
+            response = client.get(path)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response.status_code < 400
+        return fetch
+
+    def http_fetcher(self, base_url):
+        base_url = base_url.rstrip('/')
+
+        def fetch(path):
+            try:
+                with urllib.request.urlopen(base_url + path, timeout=30) as response:
+                    response.read()
+                    return response.status < 400
+            except (urllib.error.URLError, OSError):
+                return False
+        return fetch
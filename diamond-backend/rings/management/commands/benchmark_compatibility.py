@@ -0,0 +1,90 @@
+# rings/management/commands/benchmark_compatibility.py
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Exists, OuterRef, Q
+
+from rings.compatibility import filter_diamonds_for_setting, filter_settings_for_diamond
+from rings.models import Diamond, Setting
+
+
+PAGE_SIZE = 20
+
+
+def naive_settings_for_diamond(diamond):
+    """What the index replaces: LIKE on the free-text shapes"""
+    return Setting.objects.filter(
+        Q(min_carat__isnull=True) | Q(min_carat__lte=diamond.carat),
+        Q(max_carat__isnull=True) | Q(max_carat__gte=diamond.carat),
+        is_available=True, compatible_shapes__icontains=diamond.shape,
+    )
+
+
+def naive_diamonds_for_setting(setting_id):
+    """Diamonds joined to the setting's text with a LIKE per row"""
+    matches = Setting.objects.filter(
+        Q(min_carat__isnull=True) | Q(min_carat__lte=OuterRef('carat')),
+        Q(max_carat__isnull=True) | Q(max_carat__gte=OuterRef('carat')),
+        pk=setting_id, compatible_shapes__icontains=OuterRef('shape'),
+    )
+    return Diamond.objects.filter(Exists(matches), is_available=True)
+
+
+def run_page(queryset, ordering):
+    """What a list request costs: COUNT(*) plus the first page"""
+    return queryset.count(), list(queryset.order_by(ordering).values_list('pk', flat=True)[:PAGE_SIZE])
+
+
+class Command(BaseCommand):
+    help = (
+        'Time compatible_with_diamond / compatible_with_setting lookups through '
+        'the setting_compatibility index against LIKE matching on '
+        'settings.compatible_shapes. Seed first, e.g. seed_benchmark_data '
+        '--diamonds 50000 --ring-settings 2000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookups', type=int, default=200, help='Lookups per direction (default 200)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        diamonds = list(Diamond.objects.filter(is_available=True).order_by().only('shape', 'carat')[:5000])
+        setting_ids = list(Setting.objects.filter(is_available=True).order_by().values_list('pk', flat=True)[:5000])
+        if not diamonds or not setting_ids:
+            raise CommandError('No diamonds or settings to look up (run seed_benchmark_data first)')
+        diamonds = [rng.choice(diamonds) for _ in range(options['lookups'])]
+        setting_ids = [rng.choice(setting_ids) for _ in range(options['lookups'])]
+        available_settings = Setting.objects.filter(is_available=True)
+        available_diamonds = Diamond.objects.filter(is_available=True)
+
+        cases = [
+            ('settings for diamond', 'index', diamonds,
+             lambda diamond: filter_settings_for_diamond(available_settings, diamond), '-popularity_score'),
+            ('settings for diamond', 'LIKE', diamonds, naive_settings_for_diamond, '-popularity_score'),
+            ('diamonds for setting', 'index', setting_ids,
+             lambda setting_id: filter_diamonds_for_setting(available_diamonds, setting_id), '-created_at'),
+            ('diamonds for setting', 'LIKE', setting_ids, naive_diamonds_for_setting, '-created_at'),
+        ]
+        self.stdout.write(
+            f'{Diamond.objects.count()} diamonds, {Setting.objects.count()} settings, '
+            f'{options["lookups"]} lookups per case'
+        )
+        for label, method, keys, build, ordering in cases:
+            run_page(build(keys[0]), ordering)
+            timings = []
+            matched = 0
+            for key in keys:
+                started = time.perf_counter()
+                count, _ = run_page(build(key), ordering)
+                timings.append((time.perf_counter() - started) * 1000)
+                matched += count
+            timings.sort()
+            self.stdout.write(
+                f'{label:<22} {method:<6} mean {statistics.mean(timings):8.2f} ms  '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms  avg matches {matched / len(keys):9.1f}'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,65 @@
+# rings/management/commands/benchmark_conditional_get.py
+
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from rings.models import Diamond, Setting
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the CPU time a catalog request costs when it is rendered in '
+        'full, served from the response cache, and answered 304 through '
+        'If-None-Match (rings/caching.py ConditionalCatalogMixin).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=200, help='Requests per URL and mode (default 200)')
+
+    def handle(self, *args, **options):
+        diamond = Diamond.objects.filter(is_available=True).order_by('pk').first()
+        setting = Setting.objects.filter(is_available=True).order_by('pk').first()
+        if diamond is None or setting is None:
+            raise CommandError('No diamonds or settings (run seed_benchmark_data first)')
+        urls = [
+            '/api/diamonds/?ordering=-created_at',
+            '/api/diamonds/?shape=Round&ordering=base_price',
+            f'/api/diamonds/{diamond.pk}/',
+            '/api/settings/?ordering=-popularity_score',
+            f'/api/settings/{setting.pk}/',
+        ]
+        # SERVER_NAME must pass ALLOWED_HOSTS
+        client = Client(SERVER_NAME='localhost')
+
+        def measure(url, headers=None, expected=200):
+            cpu, wall = [], []
+            for _ in range(options['rounds']):
+                started_cpu, started = time.process_time(), time.perf_counter()
+                response = client.get(url, headers=headers)
+                cpu.append((time.process_time() - started_cpu) * 1000)
+                wall.append((time.perf_counter() - started) * 1000)
+                if response.status_code != expected:
+                    raise CommandError(f'{url} answered {response.status_code}, expected {expected}')
+            return statistics.mean(cpu), statistics.median(wall), response
+
+        self.stdout.write('CPU ms per request (mean), wall ms in brackets (median)')
+        for url in urls:
+            with override_settings(RESPONSE_CACHE_MAX_PAGE=0):
+                full_cpu, full_wall, response = measure(url)
+            not_modified_cpu, not_modified_wall, _ = measure(url, {'If-None-Match': response['ETag']}, expected=304)
+            line = (
+                f'  rendered {full_cpu:7.3f} ({full_wall:7.3f})  304 {not_modified_cpu:7.3f} ({not_modified_wall:7.3f})  '
+                f'saved per 304 {full_cpu - not_modified_cpu:7.3f}'
+            )
+            # Only list pages go through the response cache
+            if '?' in url:
+                cache.clear()
+                client.get(url)
+                cached_cpu, cached_wall, _ = measure(url)
+                line += f'  | cached 200 {cached_cpu:7.3f} ({cached_wall:7.3f})  saved {cached_cpu - not_modified_cpu:7.3f}'
+            self.stdout.write(f'{url} ({len(response.content)} bytes)\n{line}')
+        self.stdout.write(self.style.SUCCESS('Done'))
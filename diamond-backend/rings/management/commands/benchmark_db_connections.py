@@ -0,0 +1,70 @@
+# rings/management/commands/benchmark_db_connections.py
+
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+from rings.dbpool import get_pool_mode, get_pool_stats
+from rings.models import Diamond
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-request database latency under the current DB_POOL_MODE. '
+        'Each simulated request runs one catalog query between the same '
+        'request_started/request_finished signals Django sends, so connection '
+        'open/close costs are included. Compare modes by re-running with '
+        'DB_POOL_MODE=none, persistent or pool against a local PostgreSQL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per thread (default 500)')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent threads (default 4)')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['threads'] < 1:
+            raise CommandError('--requests and --threads must be at least 1')
+
+        latencies = []
+        lock = threading.Lock()
+
+        def worker():
+            timings = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                list(Diamond.objects.filter(is_available=True).values_list('pk', flat=True)[:20])
+                request_finished.send(sender=self.__class__)
+                timings.append((time.perf_counter() - started) * 1000)
+            connection.close()
+            with lock:
+                latencies.extend(timings)
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        stats = get_pool_stats()
+        self.stdout.write(f'mode:        {get_pool_mode()}')
+        self.stdout.write(f'requests:    {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f}/s)')
+        self.stdout.write(
+            f'latency ms:  mean {statistics.mean(latencies):.2f}  p50 {percentile(latencies, 0.50):.2f}  '
+            f'p95 {percentile(latencies, 0.95):.2f}  p99 {percentile(latencies, 0.99):.2f}'
+        )
+        self.stdout.write(f'connections: {stats["connections_opened"]} opened')
+        if 'wait_ms' in stats:
+            self.stdout.write(f'pool:        {stats["waits"]} waits, {stats["wait_ms"]} ms waiting')
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,81 @@
+# rings/management/commands/benchmark_exports.py
+
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from rings.models import Order, UserInteraction
+
+
+EXPORTS = [
+    ('interactions', '/api/interactions/export/', UserInteraction),
+    ('orders', '/api/orders/export/', Order),
+]
+
+
+def current_rss_mb():
+    """Resident set size of this process, from /proc where available"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream the orders and interactions exports (rings/exports.py) end to '
+        'end in CSV and NDJSON and report rows/s, bytes and resident memory '
+        'as the export progresses. Seed first, e.g. seed_benchmark_data '
+        '--interactions 5000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exports', default='interactions,orders',
+            help='Comma separated exports to run (default interactions,orders)',
+        )
+        parser.add_argument('--formats', default='csv,ndjson', help='Comma separated formats (default csv,ndjson)')
+        parser.add_argument(
+            '--sample-mib', type=int, default=100, help='Sample memory every this many MiB of output (default 100)',
+        )
+
+    def handle(self, *args, **options):
+        exports = [export for export in EXPORTS if export[0] in options['exports'].split(',')]
+        if not exports:
+            raise CommandError('--exports must name interactions and/or orders')
+        # SERVER_NAME must pass ALLOWED_HOSTS
+        client = Client(SERVER_NAME='localhost')
+        sample_bytes = options['sample_mib'] * 2**20
+
+        for name, url, model in exports:
+            rows = model.objects.count()
+            for export_format in options['formats'].split(','):
+                rss_before = current_rss_mb()
+                rss_peak = rss_before
+                started = time.perf_counter()
+                response = client.get(url, {'export_format': export_format})
+                if response.status_code != 200:
+                    raise CommandError(f'{url} answered {response.status_code}')
+                size = lines = 0
+                next_sample = sample_bytes
+                for block in response.streaming_content:
+                    size += len(block)
+                    lines += block.count(b'\n')
+                    if size >= next_sample:
+                        next_sample += sample_bytes
+                        rss_peak = max(rss_peak, current_rss_mb())
+                        self.stdout.write(
+                            f'  {name} {export_format}: {lines} lines, {size / 2**20:.0f} MiB, '
+                            f'RSS {rss_peak:.0f} MiB', ending='\r',
+                        )
+                elapsed = time.perf_counter() - started
+                rss_peak = max(rss_peak, current_rss_mb())
+                self.stdout.write(
+                    f'{name:<12} {export_format:<6} {rows} rows  {lines} lines  {size / 2**20:8.1f} MiB  '
+                    f'{elapsed:7.1f} s  {rows / elapsed:9.0f} rows/s  '
+                    f'RSS {rss_before:.0f} -> peak {rss_peak:.0f} MiB'
+                )
+        self.stdout.write(self.style.SUCCESS('Done'))
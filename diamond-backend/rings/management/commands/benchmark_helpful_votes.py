@@ -0,0 +1,74 @@
+# rings/management/commands/benchmark_helpful_votes.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.utils import timezone
+
+from rings.models import Review, ReviewHelpfulVote
+from rings.votes import get_helpful_count, record_helpful_vote
+
+
+def read_modify_write_vote(review_id, voter_key):
+    """What mark_helpful did before votes were appended: += 1 and a full save()"""
+    review = Review.objects.get(pk=review_id)
+    review.helpful_count = (review.helpful_count or 0) + 1
+    review.save()
+    return True
+
+
+def append_vote(review_id, voter_key):
+    return record_helpful_vote(Review(pk=review_id), voter_key)
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent helpful votes at one review through the old '
+        'read-modify-write save() and through the append-only vote table '
+        '(rings/votes.py). Reports votes/s and votes lost. Works on a '
+        'scratch review that is deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votes', type=int, default=5000, help='Distinct voters per path (default 5000)')
+        parser.add_argument('--threads', type=int, default=32, help='Concurrent voters (default 32)')
+
+    def handle(self, *args, **options):
+        votes, threads = options['votes'], options['threads']
+        if connections['default'].vendor == 'sqlite':
+            raise CommandError('SQLite serializes writers; run this against PostgreSQL')
+
+        for label, cast in (('read-modify-write', read_modify_write_vote), ('append-only', append_vote)):
+            review = Review.objects.create(rating=5, helpful_count=0, is_approved=True, created_at=timezone.now())
+            start = threading.Barrier(threads)
+            errors = []
+
+            def voter(number):
+                try:
+                    if number < threads:
+                        start.wait()
+                    cast(review.pk, f'bench:{number}')
+                except OperationalError as exc:
+                    errors.append(exc)
+
+            try:
+                started = time.perf_counter()
+                # Each worker thread keeps its own connection for the whole run
+                with ThreadPoolExecutor(threads) as pool:
+                    list(pool.map(voter, range(votes)))
+                    list(pool.map(lambda _: connections.close_all(), range(threads)))
+                elapsed = time.perf_counter() - started
+                review.refresh_from_db()
+                counted = get_helpful_count(review)
+                self.stdout.write(
+                    f'{label:<18} {votes} votes, {threads} threads  {elapsed:6.2f} s  '
+                    f'{votes / elapsed:8.0f} votes/s  counted {counted}  lost {votes - counted}  '
+                    f'errors {len(errors)}'
+                )
+            finally:
+                ReviewHelpfulVote.objects.filter(review=review).delete()
+                review.delete()
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,78 @@
+# rings/management/commands/benchmark_keyset_pagination.py
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from rings.models import Diamond, UserInteraction
+from rings.pagination import KeysetPagination
+
+
+# (label, list url, model, filter the list applies, ordering field)
+LISTS = [
+    ('diamonds -created_at', '/api/diamonds/', Diamond, {'is_available': True}, '-created_at'),
+    ('diamonds carat', '/api/diamonds/', Diamond, {'is_available': True}, 'carat'),
+    ('interactions -created_at', '/api/interactions/', UserInteraction, {}, '-created_at'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time list pages at increasing depth through ?page=N (OFFSET) and '
+        'through ?cursor= (keyset seek) on a seeded database. The response '
+        'cache is bypassed so every request reaches the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=20, help='Rows per page (default 20)')
+        parser.add_argument(
+            '--depths', default='1,10,100,1000,5000',
+            help='Comma separated page numbers to time (default 1,10,100,1000,5000)',
+        )
+        parser.add_argument('--rounds', type=int, default=20, help='Requests per page and mode (default 20)')
+
+    def handle(self, *args, **options):
+        try:
+            depths = sorted({int(depth) for depth in options['depths'].split(',')})
+        except ValueError:
+            raise CommandError('--depths must be a comma separated list of page numbers')
+        page_size = options['page_size']
+        # SERVER_NAME must pass ALLOWED_HOSTS
+        client = Client(SERVER_NAME='localhost')
+        paginator = KeysetPagination()
+
+        def timed(url, params):
+            timings = []
+            for _ in range(options['rounds']):
+                started = time.perf_counter()
+                response = client.get(url, params)
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} {params} answered {response.status_code}')
+            return statistics.median(timings)
+
+        with override_settings(RESPONSE_CACHE_MAX_PAGE=0):
+            for label, url, model, filters, ordering in LISTS:
+                field = ordering.lstrip('-')
+                direction = '-' if ordering.startswith('-') else ''
+                rows = model.objects.filter(**filters).order_by(ordering, f'{direction}pk')
+                total = rows.count()
+                self.stdout.write(f'{label} ({total} rows)')
+                for depth in depths:
+                    offset = (depth - 1) * page_size
+                    if offset >= total:
+                        break
+                    params = {'ordering': ordering, 'page_size': page_size}
+                    offset_ms = timed(url, {**params, 'page': depth})
+                    cursor = ''
+                    if offset:
+                        # The cursor the previous page's "next" link would carry
+                        cursor = paginator._encode_cursor(rows.values_list(field, 'pk')[offset - 1])
+                    keyset_ms = timed(url, {**params, 'cursor': cursor})
+                    self.stdout.write(
+                        f'  page {depth:>6}  offset {offset_ms:8.2f} ms  cursor {keyset_ms:8.2f} ms  '
+                        f'x{offset_ms / keyset_ms:.1f}'
+                    )
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,76 @@
+# rings/management/commands/benchmark_list_serialization.py
+
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from rings.fastpath import get_row_encoder
+from rings.models import Diamond, RingConfiguration, Setting
+from rings.serializers import DiamondListSerializer, RingConfigurationListSerializer, SettingListSerializer
+
+
+LISTS = {
+    'diamonds': (lambda: Diamond.objects.all(), DiamondListSerializer),
+    'settings': (lambda: Setting.objects.all(), SettingListSerializer),
+    'configurations': (lambda: RingConfiguration.objects.select_related('diamond', 'setting'), RingConfigurationListSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare list-page serialization through the DRF serializers and the '
+        'values() fast path (rings/fastpath.py): rows/sec, allocated memory, '
+        'and whether the rendered JSON is byte-identical.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='Rows per page (default 100)')
+        parser.add_argument('--rounds', type=int, default=50, help='Pages rendered per path (default 50)')
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        page_size, rounds = options['page_size'], options['rounds']
+        mismatches = []
+
+        for name, (get_queryset, serializer_class) in LISTS.items():
+            encoder = get_row_encoder(serializer_class)
+            if encoder is None:
+                raise CommandError(f'{serializer_class.__name__} has no fast path')
+
+            def serializer_page():
+                rows = list(get_queryset()[:page_size])
+                return len(rows), renderer.render(serializer_class(rows, many=True).data)
+
+            def fast_page():
+                rows = list(get_queryset().values(*encoder.lookups)[:page_size])
+                return len(rows), renderer.render([encoder.encode(row) for row in rows])
+
+            results = {}
+            for path, render_page in (('serializer', serializer_page), ('fast', fast_page)):
+                count, body = render_page()
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    render_page()
+                elapsed = time.perf_counter() - started
+                tracemalloc.start()
+                render_page()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results[path] = (body, count * rounds / elapsed, peak)
+
+            identical = results['serializer'][0] == results['fast'][0]
+            if not identical:
+                mismatches.append(name)
+            speedup = results['fast'][1] / results['serializer'][1]
+            self.stdout.write(
+                f"{name:<15} serializer {results['serializer'][1]:>9.0f} rows/s "
+                f"{results['serializer'][2] / 1024:>7.0f} KiB | fast {results['fast'][1]:>9.0f} rows/s "
+                f"{results['fast'][2] / 1024:>7.0f} KiB | x{speedup:.1f} | "
+                f"{'identical' if identical else 'DIFFERENT'} ({count} rows)"
+            )
+
+        if mismatches:
+            raise CommandError(f'Fast path output differs for: {", ".join(mismatches)}')
+        self.stdout.write(self.style.SUCCESS('Fast path output is byte-identical'))
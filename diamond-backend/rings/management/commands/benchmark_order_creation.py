@@ -0,0 +1,111 @@
+# rings/management/commands/benchmark_order_creation.py
+
+import itertools
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import serializers
+
+from rings.models import Diamond, Order, OrderItem, RingConfiguration, Setting
+from rings.serializers import OrderCreateSerializer
+
+
+class PerItemOrderSerializer(OrderCreateSerializer):
+    """What OrderCreateSerializer replaced: a lookup and an INSERT per item, client prices"""
+
+    def to_internal_value(self, data):
+        return serializers.ModelSerializer.to_internal_value(self, data)
+
+    def create(self, validated_data):
+        items_data = validated_data.pop('items')
+        # Prices are read-only on the real serializer; the baseline trusted the client's
+        for item_data, raw in zip(items_data, self.initial_data['items']):
+            item_data['item_total'] = Decimal(raw['item_total'])
+        validated_data['subtotal'] = validated_data['total_amount'] = sum(
+            (item['item_total'] for item in items_data), Decimal('0')
+        )
+        order = Order.objects.create(**validated_data)
+        for item_data in items_data:
+            OrderItem.objects.create(order=order, **item_data)
+        return order
+
+
+class Command(BaseCommand):
+    help = (
+        'Time order creation with 1, 10 and 100 items through '
+        'OrderCreateSerializer (locked bulk reads, server prices, one bulk '
+        'INSERT) against a per-item baseline. Half the items are saved '
+        'configurations, half loose diamond + setting SKUs, each on fresh '
+        'stones. Everything runs in one transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,10,100', help='Items per order (default 1,10,100)')
+        parser.add_argument('--rounds', type=int, default=20, help='Orders per size and path (default 20)')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of item counts')
+        setting = Setting.objects.filter(is_available=True).order_by('pk').first()
+        if setting is None:
+            raise CommandError('No settings to order (run seed_benchmark_data first)')
+        numbers = itertools.count()
+
+        def fresh_items(size):
+            now = timezone.now()
+            run = next(numbers)
+            diamonds = Diamond.objects.bulk_create([
+                Diamond(
+                    sku=f'BENCH-ORDER-{run}-{index}', carat=Decimal('1.00'), cut='Excellent', color='F',
+                    clarity='VS1', shape='Round', base_price=Decimal('4000.00'), is_available=True,
+                    created_at=now, updated_at=now,
+                )
+                for index in range(size)
+            ])
+            items = []
+            for index, diamond in enumerate(diamonds):
+                if index % 2:
+                    items.append({
+                        'diamond_sku': diamond.sku, 'setting_sku': setting.sku,
+                        'diamond_price': '4000.00', 'setting_price': str(setting.base_price),
+                        'item_total': str(diamond.base_price + setting.base_price),
+                    })
+                else:
+                    config = RingConfiguration.objects.create(
+                        diamond=diamond, setting=setting, total_price=diamond.base_price + setting.base_price,
+                        created_at=now,
+                    )
+                    items.append({'config': config.pk, 'item_total': str(config.total_price)})
+            return {
+                'order_number': f'BENCH-ORDER-{run}', 'customer_email': 'bench@example.com', 'items': items,
+            }
+
+        with transaction.atomic():
+            for size in sizes:
+                self.stdout.write(f'{size} item(s)')
+                for label, serializer_class in (
+                    ('per item', PerItemOrderSerializer), ('bulk', OrderCreateSerializer),
+                ):
+                    timings, query_counts = [], []
+                    for _ in range(options['rounds']):
+                        payload = fresh_items(size)
+                        with CaptureQueriesContext(connection) as queries:
+                            started = time.perf_counter()
+                            serializer = serializer_class(data=payload)
+                            serializer.is_valid(raise_exception=True)
+                            serializer.save()
+                            timings.append((time.perf_counter() - started) * 1000)
+                        query_counts.append(len(queries))
+                    self.stdout.write(
+                        f'  {label:<9} median {statistics.median(timings):8.2f} ms  '
+                        f'queries {statistics.median(query_counts):5.0f}'
+                    )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Done'))
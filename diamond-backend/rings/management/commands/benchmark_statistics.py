@@ -0,0 +1,98 @@
+# rings/management/commands/benchmark_statistics.py
+
+import random
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+
+from rings.models import Diamond
+from rings.statistics import compute_diamond_statistics, get_diamond_statistics
+
+
+SHAPES = ['Round', 'Princess', 'Oval', 'Cushion', 'Emerald', 'Pear']
+CUTS = ['Ideal', 'Excellent', 'Very Good']
+CARAT_RANGES = [('0.5', '1.0'), ('1.0', '1.5'), ('1.5', '2.5'), ('0.3', '0.7')]
+
+
+def per_field_statistics(queryset):
+    """What the statistics queries replaced: the old view's COUNT, exists(), first() and GROUP BYs"""
+    return {
+        'total_count': queryset.count(),
+        'carat_range': {
+            'min': queryset.order_by('carat').first().carat if queryset.exists() else 0,
+            'max': queryset.order_by('-carat').first().carat if queryset.exists() else 0,
+        },
+        'price_range': {
+            'min': queryset.order_by('base_price').first().base_price if queryset.exists() else 0,
+            'max': queryset.order_by('-base_price').first().base_price if queryset.exists() else 0,
+        },
+        'shapes': list(queryset.values('shape').annotate(count=Count('shape'))),
+        'cuts': list(queryset.values('cut').annotate(count=Count('cut'))),
+    }
+
+
+def sample_filters(rng):
+    """A sidebar filter set, as query params and as queryset filters"""
+    params = {}
+    if rng.random() < 0.7:
+        params['shape'] = rng.choice(SHAPES)
+    if rng.random() < 0.5:
+        params['cut'] = rng.choice(CUTS)
+    if rng.random() < 0.5:
+        params['min_carat'], params['max_carat'] = rng.choice(CARAT_RANGES)
+    queryset = Diamond.objects.filter(is_available=True)
+    for name in ('shape', 'cut'):
+        if name in params:
+            queryset = queryset.filter(**{name: params[name]})
+    if 'min_carat' in params:
+        queryset = queryset.filter(carat__gte=params['min_carat'], carat__lte=params['max_carat'])
+    query_params = QueryDict(mutable=True)
+    query_params.update(params)
+    return queryset, query_params
+
+
+class Command(BaseCommand):
+    help = (
+        'Time /diamonds/statistics/ figures through the old per-field queries, '
+        'the two statistics queries (rings/statistics.py) and their cache, with '
+        'query counts and p95 latency over random sidebar filter sets.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Filter sets per path (default 200)')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not Diamond.objects.exists():
+            raise CommandError('No diamonds (run seed_benchmark_data first)')
+        rng = random.Random(options['seed'])
+        samples = [sample_filters(rng) for _ in range(options['requests'])]
+        # Filter sets repeat in real traffic; the cached path sees each one warm
+        cache.clear()
+        for queryset, query_params in samples:
+            get_diamond_statistics(queryset, query_params, ['diamond'])
+
+        paths = [
+            ('per field', lambda queryset, query_params: per_field_statistics(queryset)),
+            ('two pass', lambda queryset, query_params: compute_diamond_statistics(queryset)),
+            ('cached', lambda queryset, query_params: get_diamond_statistics(queryset, query_params, ['diamond'])),
+        ]
+        self.stdout.write(f'{Diamond.objects.count()} diamonds, {len(samples)} filter sets per path')
+        for label, compute in paths:
+            timings = []
+            with CaptureQueriesContext(connection) as queries:
+                for queryset, query_params in samples:
+                    started = time.perf_counter()
+                    compute(queryset, query_params)
+                    timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{label:<10} queries/call {len(queries) / len(samples):5.1f}  '
+                f'p50 {timings[len(timings) // 2]:8.2f} ms  p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms'
+            )
+        self.stdout.write(self.style.SUCCESS('Done'))
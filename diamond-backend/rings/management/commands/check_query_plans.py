@@ -0,0 +1,40 @@
+# rings/management/commands/check_query_plans.py
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from rings.queryplans import PLAN_CHECKS, explain_check
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN the queries behind the main list endpoints (page-number and '
+        'cursor pages) and fail if any of them reads a table with a sequential '
+        'scan or sorts every row of the listed table. Run it against a seeded '
+        'database after changing filters, orderings or indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--show-plans', action='store_true',
+            help='Print the full plan for every query',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'Unsupported database backend: {connection.vendor}')
+
+        failures = []
+        for label, viewset_class, action, params, filters in PLAN_CHECKS:
+            plan, problems = explain_check(viewset_class, action, params, filters)
+            if problems:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f'FAIL  {label}: {", ".join(problems)}'))
+            else:
+                self.stdout.write(f'ok    {label}')
+            if options['show_plans'] or problems:
+                self.stdout.write(plan + '\n')
+
+        if failures:
+            raise CommandError(f'{len(failures)} query plan(s) scan or sort a whole table')
+        self.stdout.write(self.style.SUCCESS(f'All {len(PLAN_CHECKS)} query plans use indexes'))
@@ -0,0 +1,31 @@
+# rings/management/commands/expire_reservations.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from rings.reservations import expire_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        'Remove lapsed diamond reservations so the stones are listed again. '
+        'Runs once, or continuously with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Keep running and sweep every N seconds',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            expired = expire_reservations()
+            if expired or not options['interval']:
+                self.stdout.write(f'Expired {expired} reservation(s)')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,79 @@
+# rings/management/commands/import_diamonds.py
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rings.feeds import FEED_FORMATS, import_diamond_feed, read_feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Import a supplier diamond feed (CSV or newline-delimited JSON). '
+        'Stones are upserted by sku in batches; available stones missing '
+        'from the feed are marked unavailable. Stones listed in rows that '
+        'fail validation are left as they are.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file path')
+        parser.add_argument(
+            '--format', choices=FEED_FORMATS,
+            help='Feed format (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per INSERT ... ON CONFLICT statement (default 1000)',
+        )
+        parser.add_argument(
+            '--keep-missing', action='store_true',
+            help='Do not mark stones missing from the feed as unavailable (partial feeds)',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Validate the feed without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        feed_format = options['format']
+        if feed_format is None:
+            extension = os.path.splitext(path)[1].lower().lstrip('.')
+            feed_format = 'ndjson' if extension in ('ndjson', 'jsonl') else extension
+        if feed_format not in FEED_FORMATS:
+            raise CommandError(f'Cannot tell the feed format of {path}; pass --format')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.monotonic()
+
+        def progress(stats):
+            if options['verbosity'] > 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"{stats['read']} rows read ({stats['read'] / elapsed:.0f} rows/s)")
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as stream:
+                stats = import_diamond_feed(
+                    read_feed(stream, feed_format),
+                    batch_size=options['batch_size'],
+                    deactivate=not options['keep_missing'],
+                    dry_run=options['dry_run'],
+                    progress=progress,
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for line_number, sku, errors in stats['errors']:
+            self.stderr.write(f'Row {line_number} ({sku or "no sku"}): {errors}')
+
+        elapsed = time.monotonic() - started
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {stats['imported']} diamond(s), {stats['invalid']} invalid row(s), "
+            f"{stats['deactivated']} unlisted, in {elapsed:.1f}s "
+            f"({stats['read'] / elapsed if elapsed else 0:.0f} rows/s)"
+        ))
+        if stats['catalog_version'] is not None:
+            self.stdout.write(f"Diamond catalog version is now {stats['catalog_version']}")
@@ -0,0 +1,13 @@
+# rings/management/commands/rebuild_compatibility.py
+
+from django.core.management.base import BaseCommand
+
+from rings.compatibility import rebuild_compatibility
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the setting_compatibility index from settings.compatible_shapes'
+
+    def handle(self, *args, **options):
+        count = rebuild_compatibility()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} setting(s)'))
@@ -0,0 +1,13 @@
+# rings/management/commands/rebuild_rating_summaries.py
+
+from django.core.management.base import BaseCommand
+
+from rings.ratings import rebuild_rating_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute product_rating_summaries from approved reviews (after bulk review changes)'
+
+    def handle(self, *args, **options):
+        count = rebuild_rating_summaries()
+        self.stdout.write(self.style.SUCCESS(f'Summarized {count} product(s)'))
@@ -0,0 +1,22 @@
+# rings/management/commands/refresh_value_scores.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from rings.valuation import refresh_value_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Refit the price model over available diamonds and rewrite '
+        'diamond_value_scores (after migrating, or from cron when the '
+        'background refresher is disabled)'
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = refresh_value_scores()
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {count} diamond(s) in {time.monotonic() - started:.1f}s'
+        ))
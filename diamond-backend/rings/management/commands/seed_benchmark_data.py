@@ -0,0 +1,167 @@
+# rings/management/commands/seed_benchmark_data.py
+
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rings.catalog import bump_catalog_version
+from rings.compatibility import rebuild_compatibility
+from rings.models import Diamond, Order, OrderItem, Review, Setting, User, UserInteraction
+from rings.ratings import rebuild_rating_summaries
+from rings.valuation import refresh_value_scores
+
+
+SHAPES = ['Round', 'Princess', 'Oval', 'Cushion', 'Emerald', 'Pear', 'Marquise', 'Radiant', 'Asscher', 'Heart']
+SHAPE_WEIGHTS = [40, 10, 12, 8, 6, 6, 4, 6, 4, 4]
+CUTS = ['Ideal', 'Excellent', 'Very Good', 'Good', 'Fair']
+COLORS = list('DEFGHIJK')
+CLARITIES = ['FL', 'IF', 'VVS1', 'VVS2', 'VS1', 'VS2', 'SI1', 'SI2']
+STYLES = ['Solitaire', 'Halo', 'Three-Stone', 'Pave', 'Vintage', 'Bezel']
+METALS = ['Platinum', '18K White Gold', '18K Yellow Gold', '14K Rose Gold']
+INTERACTIONS = ['view', 'click', 'add_to_cart', 'favorite', 'search']
+DEVICES = ['mobile', 'desktop', 'tablet']
+STATUSES = ['pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled']
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed an EMPTY local database with a realistic catalog for '
+        'benchmark_api (defaults: 500k diamonds, 5k settings, 1M '
+        'interactions, 100k orders). Deterministic for a given --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--diamonds', type=int, default=500_000)
+        parser.add_argument('--ring-settings', type=int, default=5_000, help='Setting rows (--settings is taken by Django)')
+        parser.add_argument('--users', type=int, default=20_000)
+        parser.add_argument('--interactions', type=int, default=1_000_000)
+        parser.add_argument('--orders', type=int, default=100_000)
+        parser.add_argument('--reviews', type=int, default=50_000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5_000)
+
+    def handle(self, *args, **options):
+        if Diamond.objects.exists() or Setting.objects.exists() or Order.objects.exists():
+            raise CommandError('The database already has catalog data; seed_benchmark_data only runs on an empty one')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now().replace(microsecond=0)
+
+        self.seed('users', User, options['users'], self.make_user)
+        self.seed('diamonds', Diamond, options['diamonds'], self.make_diamond)
+        self.seed('settings', Setting, options['ring_settings'], self.make_setting)
+
+        self.user_ids = list(User.objects.values_list('pk', flat=True))
+        self.diamond_ids = list(Diamond.objects.values_list('pk', flat=True))
+        self.setting_ids = list(Setting.objects.values_list('pk', flat=True))
+
+        self.seed('reviews', Review, options['reviews'], self.make_review)
+        self.seed('interactions', UserInteraction, options['interactions'], self.make_interaction)
+        self.seed('orders', Order, options['orders'], self.make_order)
+        self.seed_order_items()
+
+        rebuild_compatibility()
+        rebuild_rating_summaries()
+        refresh_value_scores()
+        bump_catalog_version('diamond')
+        bump_catalog_version('setting')
+        self.stdout.write(self.style.SUCCESS('Benchmark data seeded'))
+
+    def seed(self, label, model, count, make):
+        started = time.monotonic()
+        for offset in range(0, count, self.batch_size):
+            model.objects.bulk_create(
+                [make(index) for index in range(offset, min(offset + self.batch_size, count))],
+                batch_size=self.batch_size,
+            )
+        self.stdout.write(f'{label}: {count} rows in {time.monotonic() - started:.1f}s')
+
+    def past(self, days):
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def make_user(self, index):
+        return User(
+            email=f'bench{index}@example.com', password_hash='!', first_name=f'User{index}',
+            last_name='Bench', is_active=True, created_at=self.past(365),
+        )
+
+    def make_diamond(self, index):
+        rng = self.rng
+        carat = round(min(rng.lognormvariate(0, 0.45), 9.99), 2)
+        base = 1800 * carat ** 1.9 * (1 + (7 - COLORS.index(rng.choice(COLORS))) * 0.06)
+        return Diamond(
+            sku=f'BD{index:07d}', carat=Decimal(f'{max(carat, 0.2):.2f}'),
+            cut=rng.choice(CUTS), color=rng.choice(COLORS), clarity=rng.choice(CLARITIES),
+            shape=rng.choices(SHAPES, SHAPE_WEIGHTS)[0],
+            base_price=Decimal(f'{base * rng.uniform(0.8, 1.25):.2f}'),
+            table_percent=Decimal(f'{rng.uniform(53, 64):.1f}'), depth_percent=Decimal(f'{rng.uniform(58, 66):.1f}'),
+            polish=rng.choice(CUTS[:4]), symmetry=rng.choice(CUTS[:4]), fluorescence=rng.choice(['None', 'Faint', 'Medium']),
+            certificate_type='IGI', certificate_number=f'LG{index:09d}',
+            is_available=rng.random() > 0.05, created_at=self.past(365), updated_at=self.now,
+        )
+
+    def make_setting(self, index):
+        rng = self.rng
+        shapes = rng.sample(SHAPES, rng.randint(1, 4))
+        return Setting(
+            sku=f'BS{index:05d}', name=f'{rng.choice(STYLES)} {index}', style_type=rng.choice(STYLES),
+            metal_type=rng.choice(METALS), base_price=Decimal(f'{rng.uniform(600, 6000):.2f}'),
+            compatible_shapes=', '.join(shapes), min_carat=Decimal('0.30'), max_carat=Decimal(rng.choice(['2.00', '3.00', '5.00'])),
+            is_available=True, popularity_score=rng.randint(0, 1000), created_at=self.past(365), updated_at=self.now,
+        )
+
+    def make_review(self, index):
+        rng = self.rng
+        on_setting = rng.random() < 0.6
+        return Review(
+            user_id=rng.choice(self.user_ids),
+            # Popular products get most reviews
+            diamond_id=None if on_setting else self.diamond_ids[int(rng.paretovariate(1.2)) % len(self.diamond_ids)],
+            setting_id=self.setting_ids[int(rng.paretovariate(1.2)) % len(self.setting_ids)] if on_setting else None,
+            rating=rng.choices([1, 2, 3, 4, 5], [3, 4, 10, 33, 50])[0], title='Benchmark review',
+            review_text='Lorem ipsum dolor sit amet.', is_verified_purchase=rng.random() < 0.7,
+            helpful_count=0, is_approved=rng.random() < 0.9, created_at=self.past(365),
+        )
+
+    def make_interaction(self, index):
+        rng = self.rng
+        return UserInteraction(
+            user_id=rng.choice(self.user_ids) if rng.random() < 0.3 else None,
+            session_id=f'bench-session-{rng.randrange(200_000)}', interaction_type=rng.choice(INTERACTIONS),
+            diamond_id=rng.choice(self.diamond_ids) if rng.random() < 0.6 else None,
+            device_type=rng.choice(DEVICES), created_at=self.past(90),
+        )
+
+    def make_order(self, index):
+        rng = self.rng
+        subtotal = Decimal(f'{rng.uniform(1500, 40000):.2f}')
+        return Order(
+            user_id=rng.choice(self.user_ids), order_number=f'BENCH-{index:07d}',
+            customer_email=f'bench{index}@example.com', subtotal=subtotal, tax_amount=Decimal('0.00'),
+            shipping_cost=Decimal('0.00'), total_amount=subtotal, status=rng.choice(STATUSES),
+            payment_status=rng.choice(['pending', 'paid']), created_at=self.past(365),
+        )
+
+    def seed_order_items(self):
+        started = time.monotonic()
+        count = 0
+        items = []
+        for order_id, subtotal in Order.objects.order_by('pk').values_list('pk', 'subtotal').iterator(chunk_size=self.batch_size):
+            for _ in range(self.rng.choice([1, 1, 1, 2])):
+                items.append(OrderItem(
+                    order_id=order_id, diamond_sku=f'BD{self.rng.randrange(len(self.diamond_ids)):07d}',
+                    setting_sku=f'BS{self.rng.randrange(len(self.setting_ids)):05d}', ring_size='6',
+                    item_total=subtotal, quantity=1, created_at=self.now,
+                ))
+            if len(items) >= self.batch_size:
+                OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+                count += len(items)
+                items = []
+        OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+        count += len(items)
+        self.stdout.write(f'order items: {count} rows in {time.monotonic() - started:.1f}s')
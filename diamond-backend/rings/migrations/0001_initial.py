@@ -0,0 +1,249 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Diamond',
+            fields=[
+                ('diamond_id', models.AutoField(primary_key=True, serialize=False)),
+                ('sku', models.CharField(max_length=50, unique=True)),
+                ('carat', models.DecimalField(decimal_places=2, max_digits=4)),
+                ('cut', models.CharField(max_length=20)),
+                ('color', models.CharField(max_length=5)),
+                ('clarity', models.CharField(max_length=10)),
+                ('shape', models.CharField(max_length=20)),
+                ('length_mm', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('width_mm', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('depth_mm', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('table_percent', models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True)),
+                ('depth_percent', models.DecimalField(blank=True, decimal_places=1, max_digits=4, null=True)),
+                ('base_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('certificate_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('certificate_number', models.CharField(blank=True, max_length=100, null=True)),
+                ('polish', models.CharField(blank=True, max_length=20, null=True)),
+                ('symmetry', models.CharField(blank=True, max_length=20, null=True)),
+                ('fluorescence', models.CharField(blank=True, max_length=20, null=True)),
+                ('image_url', models.CharField(blank=True, max_length=500, null=True)),
+                ('video_url', models.CharField(blank=True, max_length=500, null=True)),
+                ('is_available', models.BooleanField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'diamonds',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Favorite',
+            fields=[
+                ('favorite_id', models.AutoField(primary_key=True, serialize=False)),
+                ('user_notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'favorites',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('order_id', models.AutoField(primary_key=True, serialize=False)),
+                ('order_number', models.CharField(max_length=50, unique=True)),
+                ('customer_email', models.CharField(max_length=255)),
+                ('customer_first_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('customer_last_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('customer_phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('shipping_address_line1', models.CharField(blank=True, max_length=255, null=True)),
+                ('shipping_address_line2', models.CharField(blank=True, max_length=255, null=True)),
+                ('shipping_city', models.CharField(blank=True, max_length=100, null=True)),
+                ('shipping_state', models.CharField(blank=True, max_length=100, null=True)),
+                ('shipping_postal_code', models.CharField(blank=True, max_length=20, null=True)),
+                ('shipping_country', models.CharField(blank=True, max_length=100, null=True)),
+                ('billing_address_line1', models.CharField(blank=True, max_length=255, null=True)),
+                ('billing_address_line2', models.CharField(blank=True, max_length=255, null=True)),
+                ('billing_city', models.CharField(blank=True, max_length=100, null=True)),
+                ('billing_state', models.CharField(blank=True, max_length=100, null=True)),
+                ('billing_postal_code', models.CharField(blank=True, max_length=20, null=True)),
+                ('billing_country', models.CharField(blank=True, max_length=100, null=True)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('tax_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('shipping_cost', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('payment_method', models.CharField(blank=True, max_length=50, null=True)),
+                ('payment_status', models.CharField(blank=True, max_length=50, null=True)),
+                ('special_instructions', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('shipped_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'orders',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('order_item_id', models.AutoField(primary_key=True, serialize=False)),
+                ('diamond_sku', models.CharField(blank=True, max_length=50, null=True)),
+                ('setting_sku', models.CharField(blank=True, max_length=50, null=True)),
+                ('ring_size', models.CharField(blank=True, max_length=10, null=True)),
+                ('diamond_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('setting_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('item_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item_description', models.TextField(blank=True, null=True)),
+                ('quantity', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'order_items',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('review_id', models.AutoField(primary_key=True, serialize=False)),
+                ('rating', models.IntegerField()),
+                ('title', models.CharField(blank=True, max_length=200, null=True)),
+                ('review_text', models.TextField(blank=True, null=True)),
+                ('is_verified_purchase', models.BooleanField(blank=True, null=True)),
+                ('helpful_count', models.IntegerField(blank=True, null=True)),
+                ('is_approved', models.BooleanField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'reviews',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RingConfiguration',
+            fields=[
+                ('config_id', models.AutoField(primary_key=True, serialize=False)),
+                ('ring_size', models.CharField(blank=True, max_length=10, null=True)),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('diamond_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('setting_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('config_name', models.CharField(blank=True, max_length=200, null=True)),
+                ('is_saved', models.BooleanField(blank=True, null=True)),
+                ('is_ordered', models.BooleanField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'ring_configurations',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Setting',
+            fields=[
+                ('setting_id', models.AutoField(primary_key=True, serialize=False)),
+                ('sku', models.CharField(max_length=50, unique=True)),
+                ('name', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('style_type', models.CharField(max_length=50)),
+                ('metal_type', models.CharField(max_length=30)),
+                ('base_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('compatible_shapes', models.TextField(blank=True, null=True)),
+                ('min_carat', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('max_carat', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('image_url', models.CharField(blank=True, max_length=500, null=True)),
+                ('thumbnail_url', models.CharField(blank=True, max_length=500, null=True)),
+                ('is_available', models.BooleanField(blank=True, null=True)),
+                ('popularity_score', models.IntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'settings',
+                'ordering': ['-popularity_score'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('user_id', models.AutoField(primary_key=True, serialize=False)),
+                ('email', models.CharField(max_length=255, unique=True)),
+                ('password_hash', models.CharField(max_length=255)),
+                ('first_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('last_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_login', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'users',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserInteraction',
+            fields=[
+                ('interaction_id', models.AutoField(primary_key=True, serialize=False)),
+                ('session_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('interaction_type', models.CharField(max_length=50)),
+                ('interaction_data', models.JSONField(blank=True, null=True)),
+                ('page_url', models.CharField(blank=True, max_length=500, null=True)),
+                ('device_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('browser', models.CharField(blank=True, max_length=50, null=True)),
+                ('created_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'user_interactions',
+                'ordering': ['-created_at'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='InteractionRollup',
+            fields=[
+                ('rollup_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('interaction_type', models.CharField(max_length=50)),
+                ('device_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('diamond_id', models.IntegerField(blank=True, null=True)),
+                ('setting_id', models.IntegerField(blank=True, null=True)),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'interaction_rollups',
+                'indexes': [models.Index(fields=['granularity', 'bucket_start'], name='interaction_rollup_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='InteractionSessionSketch',
+            fields=[
+                ('sketch_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('sketch', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'interaction_session_sketches',
+                'unique_together': {('granularity', 'bucket_start')},
+            },
+        ),
+    ]
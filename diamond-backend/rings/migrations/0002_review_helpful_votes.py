@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewHelpfulVote',
+            fields=[
+                ('vote_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('voter_key', models.CharField(max_length=120)),
+                ('is_aggregated', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('review', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='helpful_votes', to='rings.review')),
+            ],
+            options={
+                'db_table': 'review_helpful_votes',
+                'indexes': [models.Index(fields=['is_aggregated', 'review'], name='helpful_vote_pending')],
+                'unique_together': {('review', 'voter_key')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0002_review_helpful_votes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiamondReservation',
+            fields=[
+                ('reservation_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('holder_key', models.CharField(max_length=120)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('config', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to='rings.ringconfiguration')),
+                ('diamond', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reservation', to='rings.diamond')),
+            ],
+            options={
+                'db_table': 'diamond_reservations',
+                'indexes': [models.Index(fields=['expires_at'], name='diamond_reservation_expiry')],
+            },
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:18
+
+import json
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+ANY_SHAPE = '*'
+ANY_SHAPE_WORDS = {'all', 'any', 'all shapes', 'any shape'}
+
+
+def parse_compatible_shapes(text):
+    """rings.compatibility.parse_compatible_shapes as of this migration"""
+    if text is None or not text.strip():
+        return [ANY_SHAPE]
+    text = text.strip()
+    values = None
+    if text.startswith('['):
+        try:
+            values = json.loads(text)
+        except ValueError:
+            values = None
+    if values is None:
+        if text.startswith('{') and text.endswith('}'):
+            text = text[1:-1]
+        values = re.split(r'[,;|/]', text)
+    shapes = []
+    for value in values:
+        shape = str(value).strip().strip('"\'').strip()
+        if not shape:
+            continue
+        if shape.lower() in ANY_SHAPE_WORDS:
+            return [ANY_SHAPE]
+        shape = shape.title()
+        if shape not in shapes:
+            shapes.append(shape)
+    return shapes or [ANY_SHAPE]
+
+
+def build_compatibility(apps, schema_editor):
+    # Existing settings get their rows now; without them every
+    # compatible_with_* filter would match nothing until a manual rebuild.
+    # Uses the historical models so later model changes can't break it.
+    Setting = apps.get_model('rings', 'Setting')
+    SettingCompatibility = apps.get_model('rings', 'SettingCompatibility')
+    rows = []
+    settings = Setting.objects.only('setting_id', 'compatible_shapes', 'min_carat', 'max_carat')
+    for setting in settings.iterator():
+        for shape in parse_compatible_shapes(setting.compatible_shapes):
+            rows.append(SettingCompatibility(
+                setting_id=setting.pk,
+                shape=shape[:20],
+                min_carat=setting.min_carat,
+                max_carat=setting.max_carat,
+            ))
+    SettingCompatibility.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0003_diamond_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SettingCompatibility',
+            fields=[
+                ('compatibility_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('shape', models.CharField(max_length=20)),
+                ('min_carat', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('max_carat', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True)),
+                ('setting', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='compatibility', to='rings.setting')),
+            ],
+            options={
+                'db_table': 'setting_compatibility',
+                'indexes': [models.Index(fields=['shape', 'min_carat', 'max_carat'], name='setting_compat_shape')],
+                'unique_together': {('setting', 'shape')},
+            },
+        ),
+        migrations.RunPython(build_compatibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,111 @@
+# Indexes for the unmanaged tables, matched to the API's query shapes.
+#
+# Django never creates indexes for managed=False models, so they are added
+# here with raw SQL. Partial indexes use the same predicate the viewsets
+# filter on (is_available / is_approved), so they stay small and only hold
+# rows the API can return. IF NOT EXISTS keeps this safe to run against a
+# database where some of them were already created by hand.
+#
+# These tables are live, so on PostgreSQL the indexes are built with
+# CREATE INDEX CONCURRENTLY, which doesn't block writes while it runs. That
+# can't happen inside a transaction, hence atomic = False. A concurrent
+# build that fails leaves an INVALID index behind, which IF NOT EXISTS
+# would then skip, so one is dropped before it is built again.
+
+from django.db import migrations
+
+
+# The (created_at DESC, pk DESC) indexes are exactly the order keyset
+# pages read in: created_at is NOT NULL since migration 0010, so NULLS
+# FIRST/LAST makes no difference and the cursor seek
+# (created_at, pk) < (%s, %s) is an index range.
+INDEXES = [
+    # Diamond list: default ordering and keyset pagination, 4C filters,
+    # carat/price ranges and orderings
+    ('diamonds_available_created_idx', 'diamonds',
+     '(created_at DESC, diamond_id DESC) WHERE is_available'),
+    ('diamonds_available_4c_idx', 'diamonds',
+     '(shape, cut, color, clarity) WHERE is_available'),
+    ('diamonds_available_carat_idx', 'diamonds',
+     '(carat, diamond_id) WHERE is_available'),
+    ('diamonds_available_price_idx', 'diamonds',
+     '(base_price, diamond_id) WHERE is_available'),
+
+    # Setting list: default ordering, style/metal filters, price ranges
+    ('settings_available_popularity_idx', 'settings',
+     '(popularity_score DESC, setting_id) WHERE is_available'),
+    ('settings_available_style_metal_idx', 'settings',
+     '(style_type, metal_type) WHERE is_available'),
+    ('settings_available_price_idx', 'settings',
+     '(base_price, setting_id) WHERE is_available'),
+
+    # my_configurations / my_favorites / my_orders
+    ('ring_configurations_user_created_idx', 'ring_configurations',
+     '(user_id, created_at DESC)'),
+    ('favorites_user_created_idx', 'favorites',
+     '(user_id, created_at DESC)'),
+    ('orders_user_created_idx', 'orders',
+     '(user_id, created_at DESC)'),
+    ('orders_status_created_idx', 'orders',
+     '(status, created_at DESC)'),
+    ('order_items_order_idx', 'order_items',
+     '(order_id)'),
+
+    # product_reviews and the review list filters
+    ('reviews_approved_diamond_idx', 'reviews',
+     '(diamond_id, created_at DESC) WHERE is_approved'),
+    ('reviews_approved_setting_idx', 'reviews',
+     '(setting_id, created_at DESC) WHERE is_approved'),
+    ('reviews_approved_created_idx', 'reviews',
+     '(created_at DESC) WHERE is_approved'),
+
+    # Interaction list filters with date ranges, and rollup scans
+    ('user_interactions_user_created_idx', 'user_interactions',
+     '(user_id, created_at DESC)'),
+    ('user_interactions_type_created_idx', 'user_interactions',
+     '(interaction_type, created_at DESC)'),
+    ('user_interactions_created_idx', 'user_interactions',
+     '(created_at DESC, interaction_id DESC)'),
+]
+
+
+def drop_invalid_index(schema_editor, name):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid '
+            'WHERE pg_class.relname = %s AND NOT pg_index.indisvalid',
+            [name],
+        )
+        invalid = cursor.fetchone() is not None
+    if invalid:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+def create_indexes(apps, schema_editor):
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for name, table, definition in INDEXES:
+        if concurrently:
+            drop_invalid_index(schema_editor, name)
+        schema_editor.execute(
+            f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS {name} ON {table} {definition}'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX {"CONCURRENTLY " if concurrently else ""}IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('rings', '0004_setting_compatibility'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes, atomic=False),
+    ]
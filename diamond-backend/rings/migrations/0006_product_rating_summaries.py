@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:24
+
+from django.db import migrations, models
+
+
+def build_summaries(apps, schema_editor):
+    # product_reviews reads only the summaries, so existing reviews must
+    # be counted now rather than after a manual rebuild. The historical
+    # Review model (unmanaged, from 0001) has no product columns, so the
+    # reviews are read with SQL against the table as it stood then.
+    ProductRatingSummary = apps.get_model('rings', 'ProductRatingSummary')
+    connection = schema_editor.connection
+    reviews = connection.ops.quote_name('reviews')
+    summaries = {}
+    with connection.cursor() as cursor:
+        for product_type, column in [('diamond', 'diamond_id'), ('setting', 'setting_id')]:
+            cursor.execute(
+                f'SELECT {column}, rating, COUNT(*) FROM {reviews} '
+                f'WHERE is_approved AND rating BETWEEN 1 AND 5 AND {column} IS NOT NULL '
+                f'GROUP BY {column}, rating'
+            )
+            for product_id, rating, total in cursor.fetchall():
+                summary = summaries.setdefault(
+                    (product_type, product_id), ProductRatingSummary(product_type=product_type, product_id=product_id),
+                )
+                summary.review_count += total
+                summary.rating_total += rating * total
+                setattr(summary, f'stars_{rating}', total)
+    ProductRatingSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0005_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductRatingSummary',
+            fields=[
+                ('summary_id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('product_type', models.CharField(choices=[('diamond', 'Diamond'), ('setting', 'Setting')], max_length=10)),
+                ('product_id', models.IntegerField()),
+                ('review_count', models.IntegerField(default=0)),
+                ('rating_total', models.IntegerField(default=0)),
+                ('stars_1', models.IntegerField(default=0)),
+                ('stars_2', models.IntegerField(default=0)),
+                ('stars_3', models.IntegerField(default=0)),
+                ('stars_4', models.IntegerField(default=0)),
+                ('stars_5', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'product_rating_summaries',
+                'unique_together': {('product_type', 'product_id')},
+            },
+        ),
+        migrations.RunPython(build_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0006_product_rating_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiamondValueScore',
+            fields=[
+                ('diamond', models.OneToOneField(db_column='diamond_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='valuation', serialize=False, to='rings.diamond')),
+                ('predicted_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('value_score', models.FloatField()),
+                ('scored_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'diamond_value_scores',
+                'indexes': [models.Index(fields=['value_score'], name='diamond_value_score')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0007_diamond_value_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'catalog_versions',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0008_catalog_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiamondValueScoreFit',
+            fields=[
+                ('fit_id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=255)),
+                ('diamonds_scored', models.IntegerField()),
+                ('fitted_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'diamond_value_score_fits',
+            },
+        ),
+    ]
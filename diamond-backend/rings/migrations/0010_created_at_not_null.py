@@ -0,0 +1,62 @@
+# diamonds.created_at and user_interactions.created_at become NOT NULL.
+#
+# Keyset pages (rings/pagination.py) seek with created_at <= %s AND
+# (created_at < %s OR (created_at = %s AND pk < %s)), which PostgreSQL
+# answers with a range scan on the (created_at DESC, pk DESC) indexes from
+# migration 0005. That never matches a NULL, so the column must not hold
+# any.
+#
+# Rows without a date get the epoch: they used to sort last under
+# "-created_at NULLS LAST", and as the oldest rows they still do. New rows
+# get now() from the column default (and timezone.now from the models).
+#
+# SET NOT NULL on its own scans the table under an exclusive lock. A
+# NOT VALID check constraint is added first and validated separately,
+# which only needs a lock that lets reads and writes carry on; PostgreSQL
+# 12+ then uses it to skip that scan.
+
+from django.db import migrations
+
+
+TABLES = ['diamonds', 'user_interactions']
+
+
+def set_not_null(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        check = f'{table}_created_at_not_null'
+        schema_editor.execute(
+            f"UPDATE {table} SET created_at = 'epoch'::timestamptz WHERE created_at IS NULL"
+        )
+        schema_editor.execute(f'ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT now()')
+        schema_editor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check}')
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD CONSTRAINT {check} CHECK (created_at IS NOT NULL) NOT VALID'
+        )
+        schema_editor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {check}')
+        schema_editor.execute(f'ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL')
+        schema_editor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {check}')
+
+
+def drop_not_null(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in TABLES:
+        schema_editor.execute(f'ALTER TABLE {table} ALTER COLUMN created_at DROP NOT NULL')
+        schema_editor.execute(f'ALTER TABLE {table} ALTER COLUMN created_at DROP DEFAULT')
+
+
+class Migration(migrations.Migration):
+
+    # Each statement commits on its own, so the exclusive locks above are
+    # held only for as long as the statement that needs them
+    atomic = False
+
+    dependencies = [
+        ('rings', '0009_diamond_value_score_fits'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_not_null, drop_not_null, atomic=False),
+    ]
@@ -0,0 +1,20 @@
+# Hourly sketches record the highest interaction id that existed when they
+# were built. refresh_rollups (rings/rollups.py) looks for rows inserted
+# after that into hours it has already rolled up, and rebuilds those hours.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rings', '0010_created_at_not_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interactionsessionsketch',
+            name='last_interaction_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -2,6 +2,7 @@
 # Cleaned up models from inspectdb
 
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
@@ -48,7 +49,8 @@ class Diamond(models.Model):
     image_url = models.CharField(max_length=500, blank=True, null=True)
     video_url = models.CharField(max_length=500, blank=True, null=True)
     is_available = models.BooleanField(blank=True, null=True)
-    created_at = models.DateTimeField(blank=True, null=True)
+    # NOT NULL since migration 0010: keyset pages seek on it
+    created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
@@ -235,7 +237,8 @@ class UserInteraction(models.Model):
     page_url = models.CharField(max_length=500, blank=True, null=True)
     device_type = models.CharField(max_length=50, blank=True, null=True)
     browser = models.CharField(max_length=50, blank=True, null=True)
-    created_at = models.DateTimeField(blank=True, null=True)
+    # NOT NULL since migration 0010: keyset pages seek on it
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         managed = False
@@ -243,4 +246,212 @@ class UserInteraction(models.Model):
         ordering = ['-created_at']
 
     def __str__(self):
-        return f"{self.interaction_type} - {self.interaction_id}"
\ No newline at end of file
+        return f"{self.interaction_type} - {self.interaction_id}"
+
+# ============================================
+# ANALYTICS ROLLUPS (managed by Django)
+# ============================================
+
+class InteractionRollup(models.Model):
+    """Interaction counts per hour/day bucket, type, device and product"""
+    GRANULARITY_CHOICES = [('hour', 'Hour'), ('day', 'Day')]
+
+    rollup_id = models.BigAutoField(primary_key=True)
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    interaction_type = models.CharField(max_length=50)
+    device_type = models.CharField(max_length=50, blank=True, null=True)
+    diamond_id = models.IntegerField(blank=True, null=True)
+    setting_id = models.IntegerField(blank=True, null=True)
+    count = models.IntegerField()
+
+    class Meta:
+        db_table = 'interaction_rollups'
+        indexes = [
+            models.Index(fields=['granularity', 'bucket_start'], name='interaction_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start} {self.interaction_type}: {self.count}"
+
+
+class InteractionSessionSketch(models.Model):
+    """HyperLogLog of session ids seen in an hour/day bucket"""
+    sketch_id = models.BigAutoField(primary_key=True)
+    granularity = models.CharField(max_length=4, choices=InteractionRollup.GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()
+    sketch = models.BinaryField()
+    # Highest user_interactions id that existed when the bucket was built
+    last_interaction_id = models.BigIntegerField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'interaction_session_sketches'
+        unique_together = [('granularity', 'bucket_start')]
+
+    def __str__(self):
+        return f"{self.granularity} sketch {self.bucket_start}"
+
+
+# ============================================
+# REVIEW VOTES (managed by Django)
+# ============================================
+
+class ReviewHelpfulVote(models.Model):
+    """One helpful vote per review and voter, folded into Review.helpful_count later"""
+    vote_id = models.BigAutoField(primary_key=True)
+    review = models.ForeignKey(Review, models.DO_NOTHING, db_constraint=False, related_name='helpful_votes')
+    voter_key = models.CharField(max_length=120)
+    is_aggregated = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'review_helpful_votes'
+        unique_together = [('review', 'voter_key')]
+        indexes = [
+            models.Index(fields=['is_aggregated', 'review'], name='helpful_vote_pending'),
+        ]
+
+    def __str__(self):
+        return f"Vote {self.vote_id} on review {self.review_id}"
+
+
+# ============================================
+# INVENTORY RESERVATIONS (managed by Django)
+# ============================================
+
+class DiamondReservation(models.Model):
+    """Time-limited checkout hold on a diamond; at most one per stone"""
+    reservation_id = models.BigAutoField(primary_key=True)
+    diamond = models.OneToOneField(Diamond, models.DO_NOTHING, db_constraint=False, related_name='reservation')
+    config = models.ForeignKey(RingConfiguration, models.DO_NOTHING, db_constraint=False, blank=True, null=True)
+    holder_key = models.CharField(max_length=120)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'diamond_reservations'
+        indexes = [
+            models.Index(fields=['expires_at'], name='diamond_reservation_expiry'),
+        ]
+
+    def __str__(self):
+        return f"Hold on diamond {self.diamond_id} until {self.expires_at}"
+
+
+# ============================================
+# SETTING COMPATIBILITY INDEX (managed by Django)
+# ============================================
+
+class SettingCompatibility(models.Model):
+    """
+    One row per setting and compatible shape, parsed from
+    Setting.compatible_shapes. shape '*' means any shape.
+    """
+    compatibility_id = models.BigAutoField(primary_key=True)
+    setting = models.ForeignKey(Setting, models.DO_NOTHING, db_constraint=False, related_name='compatibility')
+    shape = models.CharField(max_length=20)
+    min_carat = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True)
+    max_carat = models.DecimalField(max_digits=4, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        db_table = 'setting_compatibility'
+        unique_together = [('setting', 'shape')]
+        indexes = [
+            models.Index(fields=['shape', 'min_carat', 'max_carat'], name='setting_compat_shape'),
+        ]
+
+    def __str__(self):
+        return f"Setting {self.setting_id} fits {self.shape}"
+
+
+# ============================================
+# RATING SUMMARIES (managed by Django)
+# ============================================
+
+class ProductRatingSummary(models.Model):
+    """Approved-review count, rating total and star histogram for one diamond or setting"""
+    PRODUCT_TYPES = [('diamond', 'Diamond'), ('setting', 'Setting')]
+
+    summary_id = models.BigAutoField(primary_key=True)
+    product_type = models.CharField(max_length=10, choices=PRODUCT_TYPES)
+    product_id = models.IntegerField()
+    review_count = models.IntegerField(default=0)
+    rating_total = models.IntegerField(default=0)
+    stars_1 = models.IntegerField(default=0)
+    stars_2 = models.IntegerField(default=0)
+    stars_3 = models.IntegerField(default=0)
+    stars_4 = models.IntegerField(default=0)
+    stars_5 = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'product_rating_summaries'
+        unique_together = [('product_type', 'product_id')]
+
+    def __str__(self):
+        return f"{self.product_type} {self.product_id}: {self.review_count} reviews"
+
+
+# ============================================
+# DIAMOND VALUE SCORES (managed by Django)
+# ============================================
+
+class DiamondValueScore(models.Model):
+    """
+    Model price and value score of one available diamond (rings/valuation.py).
+    value_score is the percentage the stone is priced below (positive) or
+    above (negative) the price fitted over the whole inventory.
+    """
+    diamond = models.OneToOneField(
+        Diamond, models.DO_NOTHING, primary_key=True, db_constraint=False,
+        related_name='valuation', db_column='diamond_id',
+    )
+    predicted_price = models.DecimalField(max_digits=12, decimal_places=2)
+    value_score = models.FloatField()
+    scored_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'diamond_value_scores'
+        indexes = [
+            models.Index(fields=['value_score'], name='diamond_value_score'),
+        ]
+
+    def __str__(self):
+        return f"Diamond {self.diamond_id}: value score {self.value_score}"
+
+
+class DiamondValueScoreFit(models.Model):
+    """
+    The one fit the stored value scores come from. `fingerprint` summarizes
+    the inventory it was fitted on, so every worker can tell whether a
+    refit is due without refitting itself.
+    """
+    fit_id = models.PositiveSmallIntegerField(primary_key=True, default=1)
+    fingerprint = models.CharField(max_length=255)
+    diamonds_scored = models.IntegerField()
+    fitted_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'diamond_value_score_fits'
+
+    def __str__(self):
+        return f"Value score fit of {self.fitted_at}: {self.diamonds_scored} diamonds"
+
+
+# ============================================
+# CATALOG VERSIONS (managed by Django)
+# ============================================
+
+class CatalogVersion(models.Model):
+    """
+    Generation counter of one catalog table (rings/catalog.py). Kept in the
+    database so a bump made by any process is seen by every worker.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.BigIntegerField(default=1)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'catalog_versions'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
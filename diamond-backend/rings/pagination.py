@@ -0,0 +1,198 @@
+# rings/pagination.py
+
+import base64
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# ============================================
+# KEYSET PAGINATION
+# ============================================
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Plain ?page=N requests behave exactly as before. Passing ?cursor= (an
+    empty value starts at the first page) switches to keyset mode: the
+    page is found by seeking on (ordering field, primary key) instead of
+    OFFSET, and the total is an approximate, cached count rather than a
+    COUNT(*) per page. On NOT NULL columns the seek is bounded by a range
+    on the ordering field that an index on (field, pk) answers directly;
+    nullable fields (the value_score annotation) fall back to an OR that
+    also walks the NULLs.
+    """
+    cursor_query_param = 'cursor'
+    approximate_count_timeout = 60
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.keyset = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        keyset_queryset = self.get_keyset_queryset(queryset, request, view)
+        self.approximate_count = self._get_approximate_count(queryset)
+        queryset = keyset_queryset
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        self.next_position = None
+        if self.has_next:
+            last = rows[-1]
+            if isinstance(last, dict):
+                # values() rows (see rings/fastpath.py)
+                self.next_position = (last[self.field], last[queryset.model._meta.pk.attname])
+            else:
+                self.next_position = (getattr(last, self.field), last.pk)
+        return rows
+
+    def get_keyset_queryset(self, queryset, request, view=None):
+        """The queryset ordered for keyset paging and seeked past ?cursor="""
+        self.pk_name = queryset.model._meta.pk.name
+        self.field, self.descending = self._get_ordering(queryset, request, view)
+        self.nullable = self._is_nullable(queryset)
+
+        position = self._decode_cursor(request.query_params.get(self.cursor_query_param), queryset)
+        queryset = queryset.order_by(*self._order_by())
+        if position is not None:
+            queryset = queryset.filter(self._seek(*position))
+        return queryset
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'approximate_count': self.approximate_count,
+            'next': self.get_next_link(),
+            'previous': None,
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self._encode_cursor(self.next_position))
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        return None
+
+    def _get_ordering(self, queryset, request, view):
+        """Use the first ordering term chosen by OrderingFilter, else the pk"""
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        if not ordering:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+        term = ordering[0] if ordering else '-' + self.pk_name
+        if not isinstance(term, str):
+            raise NotFound('Keyset pagination needs a plain field ordering.')
+        return term.lstrip('-'), term.startswith('-')
+
+    def _is_nullable(self, queryset):
+        # Annotations (value_score) come from LEFT JOINs, so any of them
+        # can be NULL whatever their output field says
+        if self.field in queryset.query.annotations:
+            return True
+        return self._ordering_field(queryset).null
+
+    def _order_by(self):
+        if self.nullable:
+            # NULLs sort last in both directions so the seek condition
+            # below can treat them as a single trailing group
+            if self.descending:
+                return [F(self.field).desc(nulls_last=True), F(self.pk_name).desc()]
+            return [F(self.field).asc(nulls_last=True), F(self.pk_name).asc()]
+        # Exactly the column order of the (field, pk) indexes, so the page
+        # is read off the index instead of sorted
+        if self.descending:
+            return [F(self.field).desc(), F(self.pk_name).desc()]
+        return [F(self.field).asc(), F(self.pk_name).asc()]
+
+    def _seek(self, value, pk):
+        """Rows strictly after (value, pk) in the current ordering"""
+        after = 'lt' if self.descending else 'gt'
+        pk_after = Q(**{f'{self.pk_name}__{after}': pk})
+        if not self.nullable:
+            # field > value OR (field = value AND pk > pk), plus the
+            # redundant field >= value, which the (field, pk) index reads
+            # as a range condition however deep the page
+            return Q(**{f'{self.field}__{after}e': value}) & (
+                Q(**{f'{self.field}__{after}': value}) | (Q(**{self.field: value}) & pk_after)
+            )
+        if value is None:
+            return Q(**{f'{self.field}__isnull': True}) & pk_after
+        return (
+            Q(**{f'{self.field}__{after}': value})
+            | (Q(**{self.field: value}) & pk_after)
+            | Q(**{f'{self.field}__isnull': True})
+        )
+
+    def _encode_cursor(self, position):
+        value, pk = position
+        if isinstance(value, datetime):
+            value = {'dt': value.isoformat()}
+        elif isinstance(value, Decimal):
+            value = {'dec': str(value)}
+        payload = json.dumps([value, pk], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def _ordering_field(self, queryset):
+        """Model field (or annotation output field) the page is ordered by"""
+        annotation = queryset.query.annotations.get(self.field)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(self.field)
+
+    def _decode_cursor(self, cursor, queryset):
+        """
+        (value, pk) from a cursor, converted to the ordering and pk fields'
+        types so a tampered cursor is a 404 rather than a database error
+        """
+        if not cursor:
+            return None
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            if isinstance(value, dict):
+                value = value['dt'] if 'dt' in value else value['dec']
+            value = self._ordering_field(queryset).to_python(value)
+            pk = queryset.model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound('Invalid cursor')
+        if pk is None:
+            raise NotFound('Invalid cursor')
+        return value, pk
+
+    def _get_approximate_count(self, queryset):
+        """COUNT(*) for this filter set, cached for a short while"""
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+        key = f'rings:approximate-count:{digest}'
+        count = cache.get(key)
+        if count is None:
+            count = queryset.order_by().count()
+            timeout = getattr(settings, 'APPROXIMATE_COUNT_TIMEOUT', self.approximate_count_timeout)
+            cache.set(key, count, timeout)
+        return count
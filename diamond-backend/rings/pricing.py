@@ -0,0 +1,110 @@
+# rings/pricing.py
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog import get_catalog_version
+from .models import Diamond, Setting
+from .reservations import holder_key_for_config, reservation_holders
+
+
+# ============================================
+# CONFIGURATION PRICING
+# ============================================
+#
+# A ring is priced as diamond base price + setting base price. Price
+# components (sku, base_price, is_available) are cached per row under the
+# table's catalog version, so any price update or sale invalidates them,
+# and cache misses for a whole batch are loaded with one query per table.
+# Holds change too often to cache; they are read with one query per batch.
+# Sold stones and stones held by another shopper can't be priced, the same
+# as OrderCreateSerializer refuses to sell them.
+
+PRICED_MODELS = {
+    'diamond': Diamond,
+    'setting': Setting,
+}
+
+
+def get_price_components(name, ids):
+    """{id: (sku, base_price, is_available)} for the given diamond or setting ids"""
+    ids = set(ids)
+    if not ids:
+        return {}
+    version = get_catalog_version(name)
+    keys = {f'rings:price-components:{name}:{version}:{pk}': pk for pk in ids}
+    cached = cache.get_many(list(keys))
+    components = {keys[key]: value for key, value in cached.items()}
+
+    missing = ids - set(components)
+    if missing:
+        rows = PRICED_MODELS[name].objects.filter(pk__in=missing).values_list(
+            'pk', 'sku', 'base_price', 'is_available'
+        )
+        loaded = {pk: (sku, base_price, is_available) for pk, sku, base_price, is_available in rows}
+        cache.set_many(
+            {f'rings:price-components:{name}:{version}:{pk}': value for pk, value in loaded.items()},
+            getattr(settings, 'PRICE_CACHE_TIMEOUT', 3600),
+        )
+        components.update(loaded)
+    return components
+
+
+def price_configuration(diamond_price, setting_price):
+    return (diamond_price or Decimal('0')) + (setting_price or Decimal('0'))
+
+
+def price_order(subtotal):
+    """(tax_amount, shipping_cost, total_amount) for an order subtotal"""
+    tax = (subtotal * settings.ORDER_TAX_RATE).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    shipping = settings.ORDER_SHIPPING_COST if subtotal else Decimal('0.00')
+    return tax, shipping, subtotal + tax + shipping
+
+
+def quote_configurations(requests):
+    """
+    Price many (diamond_id, setting_id, ring_size) requests at once.
+
+    `requests` is a list of dicts; each result echoes the request with
+    component prices and a total, or carries an `error`. A request's
+    optional `config_id` names the configuration holding its diamond, so
+    the shopper holding a stone can still price it.
+    """
+    diamonds = get_price_components('diamond', [r['diamond_id'] for r in requests if r.get('diamond_id')])
+    settings_ = get_price_components('setting', [r['setting_id'] for r in requests if r.get('setting_id')])
+    held = reservation_holders(list(diamonds)) if diamonds else {}
+
+    quotes = []
+    for request in requests:
+        diamond_id = request.get('diamond_id')
+        setting_id = request.get('setting_id')
+        config_id = request.get('config_id')
+        holder = holder_key_for_config(config_id) if config_id else None
+        quote = {
+            'diamond_id': diamond_id,
+            'setting_id': setting_id,
+            'ring_size': request.get('ring_size'),
+            'config_id': config_id,
+        }
+        diamond = diamonds.get(diamond_id) if diamond_id else None
+        setting = settings_.get(setting_id) if setting_id else None
+        if diamond_id and diamond is None:
+            quote['error'] = 'Unknown diamond.'
+        elif setting_id and setting is None:
+            quote['error'] = 'Unknown setting.'
+        elif diamond is not None and diamond[2] is False:
+            quote['error'] = 'This diamond is no longer available.'
+        elif setting is not None and setting[2] is False:
+            quote['error'] = 'This setting is no longer available.'
+        elif diamond_id in held and held[diamond_id] != holder:
+            quote['error'] = 'This diamond is reserved by another shopper.'
+        else:
+            quote['diamond_sku'] = diamond[0] if diamond else None
+            quote['setting_sku'] = setting[0] if setting else None
+            quote['diamond_price'] = diamond[1] if diamond else None
+            quote['setting_price'] = setting[1] if setting else None
+            quote['total_price'] = price_configuration(quote['diamond_price'], quote['setting_price'])
+        quotes.append(quote)
+    return quotes
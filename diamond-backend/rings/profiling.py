@@ -0,0 +1,228 @@
+# rings/profiling.py
+
+import contextvars
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# REQUEST PROFILING
+# ============================================
+#
+# A sampled fraction of requests (settings.REQUEST_PROFILING['SAMPLE_RATE'])
+# is profiled: SQL queries are counted, timed and fingerprinted through a
+# connection execute_wrapper, serializer time is measured around top-level
+# to_representation calls, and the figures are folded into per-route
+# aggregates served as Prometheus text at /api/ops/metrics/. Unsampled
+# requests only pay for one random() call. Aggregates are per worker
+# process, like the other /ops/ counters.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current = contextvars.ContextVar('rings_request_profile', default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+
+
+def get_profiling_options():
+    return getattr(settings, 'REQUEST_PROFILING', {})
+
+
+def fingerprint(sql):
+    """SQL with literals and IN-lists collapsed, so repeats of one query shape match"""
+    return _IN_LISTS.sub('IN (...)', _LITERALS.sub('?', sql))
+
+
+class RequestProfile:
+    """Figures collected for one sampled request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.serialize_depth = 0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+
+@contextmanager
+def timed_serialization():
+    """Count the enclosed block as serializer time of the current profile"""
+    profile = _current.get()
+    if profile is None or profile.serialize_depth:
+        # Not profiling, or nested inside an already timed block
+        yield
+        return
+    profile.serialize_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serialize_seconds += time.perf_counter() - started
+        profile.serialize_depth -= 1
+
+
+def install_serializer_timing():
+    """Time Serializer/ListSerializer.to_representation (called once at startup)"""
+    from rest_framework import serializers
+
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if getattr(cls.to_representation, 'profiled', False):
+            continue
+        original = cls.to_representation
+
+        def to_representation(self, instance, _original=original):
+            with timed_serialization():
+                return _original(self, instance)
+
+        to_representation.profiled = True
+        cls.to_representation = to_representation
+
+
+# ============================================
+# AGGREGATES
+# ============================================
+
+class RouteMetrics:
+    """Per-route sums and a latency histogram over sampled requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes = {}
+
+    def record(self, route, method, duration, profile, response_bytes, duplicated):
+        with self._lock:
+            entry = self.routes.get((route, method))
+            if entry is None:
+                entry = self.routes[(route, method)] = {
+                    'requests': 0, 'seconds': 0.0, 'queries': 0, 'sql_seconds': 0.0,
+                    'serialize_seconds': 0.0, 'response_bytes': 0, 'duplicate_queries': 0,
+                    'buckets': [0] * len(DURATION_BUCKETS),
+                }
+            entry['requests'] += 1
+            entry['seconds'] += duration
+            entry['queries'] += profile.queries
+            entry['sql_seconds'] += profile.sql_seconds
+            entry['serialize_seconds'] += profile.serialize_seconds
+            entry['response_bytes'] += response_bytes
+            entry['duplicate_queries'] += bool(duplicated)
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    entry['buckets'][index] += 1
+
+    def render_prometheus(self):
+        with self._lock:
+            routes = {key: dict(value, buckets=list(value['buckets'])) for key, value in self.routes.items()}
+
+        lines = []
+
+        def metric(name, kind, help_text, field):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (route, method), entry in sorted(routes.items()):
+                lines.append(f'{name}{{route="{route}",method="{method}"}} {entry[field]}')
+
+        metric('rings_sampled_requests_total', 'counter', 'Profiled (sampled) requests.', 'requests')
+        metric('rings_request_sql_queries_total', 'counter', 'SQL queries run by sampled requests.', 'queries')
+        metric('rings_request_sql_seconds_total', 'counter', 'SQL time of sampled requests.', 'sql_seconds')
+        metric('rings_request_serialize_seconds_total', 'counter', 'Serializer time of sampled requests.', 'serialize_seconds')
+        metric('rings_response_bytes_total', 'counter', 'Response body bytes of sampled requests.', 'response_bytes')
+        metric(
+            'rings_request_duplicate_queries_total', 'counter',
+            'Sampled requests that repeated one query shape (likely N+1).', 'duplicate_queries',
+        )
+
+        name = 'rings_request_duration_seconds'
+        lines.append(f'# HELP {name} Wall time of sampled requests.')
+        lines.append(f'# TYPE {name} histogram')
+        for (route, method), entry in sorted(routes.items()):
+            labels = f'route="{route}",method="{method}"'
+            for bound, count in zip(DURATION_BUCKETS, entry['buckets']):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {entry["requests"]}')
+            lines.append(f'{name}_sum{{{labels}}} {entry["seconds"]}')
+            lines.append(f'{name}_count{{{labels}}} {entry["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+
+route_metrics = RouteMetrics()
+
+
+def get_route(request):
+    """URL name (e.g. 'diamond-list', 'review-product-reviews') of a resolved request"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+class RequestProfilingMiddleware:
+    """Profile a random sample of requests; see the module comment"""
+
+    def __init__(self, get_response):
+        options = get_profiling_options()
+        if not options.get('ENABLED'):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = options.get('SAMPLE_RATE', 0.01)
+        self.slow_seconds = options.get('SLOW_REQUEST_MS', 1000) / 1000
+        self.duplicate_threshold = options.get('DUPLICATE_QUERY_THRESHOLD', 5)
+        install_serializer_timing()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with connections['default'].execute_wrapper(profile):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        response_bytes = 0 if response.streaming else len(response.content)
+        repeated = [(sql, count) for sql, count in profile.fingerprints.most_common(3) if count >= self.duplicate_threshold]
+        route = get_route(request)
+        route_metrics.record(route, request.method, duration, profile, response_bytes, repeated)
+
+        if repeated:
+            logger.warning(
+                'Repeated query shape on %s %s (likely N+1): %s',
+                request.method, route, '; '.join(f'{count}x {sql[:200]}' for sql, count in repeated),
+            )
+        if duration >= self.slow_seconds:
+            logger.warning(
+                'Slow request %s %s: %.0f ms, %d queries (%.0f ms SQL), %.0f ms serializing, %d bytes',
+                request.method, request.get_full_path(), duration * 1000, profile.queries,
+                profile.sql_seconds * 1000, profile.serialize_seconds * 1000, response_bytes,
+            )
+        return response
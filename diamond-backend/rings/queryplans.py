@@ -0,0 +1,145 @@
+# rings/queryplans.py
+
+import json
+import re
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.test import RequestFactory
+
+from .pagination import KeysetPagination
+from .views import (
+    DiamondViewSet, SettingViewSet, RingConfigurationViewSet,
+    FavoriteViewSet, ReviewViewSet, OrderViewSet, UserInteractionViewSet
+)
+
+
+# ============================================
+# QUERY PLAN CHECKS
+# ============================================
+#
+# The queries behind the main list endpoints, EXPLAINed to make sure each
+# one is answered from an index (migration 0005): no sequential scan, no
+# sort over every row of the listed table (an index scan with no condition
+# under a Sort would otherwise pass), and for cursor pages no sort at all.
+# Used by the
+# check_query_plans command against a seeded database and by the test
+# suite as a regression test.
+
+PAGE_SIZE = 20
+
+
+def keyset_cursor(value, pk):
+    """?cursor= value for a page starting after (value, pk)"""
+    return KeysetPagination()._encode_cursor((value, pk))
+
+
+DEEP_CREATED_AT = keyset_cursor(datetime(2026, 1, 1, tzinfo=dt_timezone.utc), 100000)
+
+# (label, viewset, action, query params, extra filters the action applies)
+PLAN_CHECKS = [
+    ('diamonds: default list', DiamondViewSet, 'list', {}, {}),
+    ('diamonds: 4C filter', DiamondViewSet, 'list', {'shape': 'Round', 'cut': 'Excellent', 'color': 'F', 'clarity': 'VS1'}, {}),
+    ('diamonds: carat range', DiamondViewSet, 'list', {'min_carat': '1.00', 'max_carat': '1.50', 'ordering': 'carat'}, {}),
+    ('diamonds: price range', DiamondViewSet, 'list', {'min_price': '1000', 'max_price': '5000', 'ordering': 'base_price'}, {}),
+    ('diamonds: cursor, first page', DiamondViewSet, 'list', {'cursor': ''}, {}),
+    ('diamonds: cursor, deep page', DiamondViewSet, 'list', {'cursor': DEEP_CREATED_AT}, {}),
+    ('diamonds: cursor by carat, deep page', DiamondViewSet, 'list',
+     {'ordering': 'carat', 'cursor': keyset_cursor(Decimal('1.50'), 100000)}, {}),
+    ('diamonds: cursor by price, deep page', DiamondViewSet, 'list',
+     {'ordering': '-base_price', 'cursor': keyset_cursor(Decimal('5000.00'), 100000)}, {}),
+    ('settings: default list', SettingViewSet, 'list', {}, {}),
+    ('settings: style/metal filter', SettingViewSet, 'list', {'style_type': 'Halo', 'metal_type': 'Platinum'}, {}),
+    ('configurations: my_configurations', RingConfigurationViewSet, 'my_configurations', {}, {'user_id': 1}),
+    ('favorites: my_favorites', FavoriteViewSet, 'my_favorites', {}, {'user_id': 1}),
+    ('reviews: product_reviews (diamond)', ReviewViewSet, 'product_reviews', {}, {'diamond_id': 1}),
+    ('reviews: product_reviews (setting)', ReviewViewSet, 'product_reviews', {}, {'setting_id': 1}),
+    ('orders: my_orders', OrderViewSet, 'my_orders', {}, {'user_id': 1}),
+    ('orders: status filter', OrderViewSet, 'list', {'status': 'pending'}, {}),
+    ('interactions: by user', UserInteractionViewSet, 'list', {'user': '1'}, {}),
+    ('interactions: by type', UserInteractionViewSet, 'list', {'interaction_type': 'view'}, {}),
+    ('interactions: cursor, first page', UserInteractionViewSet, 'list', {'cursor': ''}, {}),
+    ('interactions: cursor, deep page', UserInteractionViewSet, 'list', {'cursor': DEEP_CREATED_AT}, {}),
+]
+
+
+def build_queryset(viewset_class, action, params, filters):
+    """The first page queryset a viewset action would run for these params"""
+    view = viewset_class(action_map={'get': action}, format_kwarg=None, args=(), kwargs={})
+    view.request = view.initialize_request(RequestFactory().get('/', params))
+    queryset = view.filter_queryset(view.get_queryset()).filter(**filters)
+    if 'cursor' in params:
+        # Keyset mode orders and seeks in the paginator
+        return view.paginator.get_keyset_queryset(queryset, view.request, view)[:PAGE_SIZE + 1]
+    return queryset[:PAGE_SIZE]
+
+
+# Plan nodes that read a table, and the keys holding their index condition
+SCAN_NODES = {
+    'Seq Scan': (), 'Index Scan': ('Index Cond',), 'Index Only Scan': ('Index Cond',),
+    'Bitmap Heap Scan': ('Recheck Cond',),
+}
+
+
+def table_scans(node, table):
+    """
+    (node type, narrowed) for each read of `table` at or below a JSON plan
+    node; narrowed is False when no index condition limits the rows read
+    """
+    found = []
+    if node.get('Relation Name') == table and node['Node Type'] in SCAN_NODES:
+        found.append((node['Node Type'], any(key in node for key in SCAN_NODES[node['Node Type']])))
+    for child in node.get('Plans', []):
+        found.extend(table_scans(child, table))
+    return found
+
+
+def find_plan_problems(node, table, keyset=False):
+    """
+    Sequential scans and sorts over `table` in a JSON plan. A page-number
+    query may sort the rows its filters narrowed down, but not the whole
+    table; a keyset page must come off the index in order, so any sort of
+    the table is a problem.
+    """
+    problems = []
+    if node['Node Type'] == 'Seq Scan':
+        problems.append(f'Seq Scan on {node["Relation Name"]}')
+    if node['Node Type'] == 'Sort':
+        scans = table_scans(node, table)
+        if scans and (keyset or not all(narrowed for _, narrowed in scans)):
+            problems.append(f'Sort over {table}')
+    for child in node.get('Plans', []):
+        problems.extend(find_plan_problems(child, table, keyset))
+    return problems
+
+
+def find_sqlite_problems(plan, table, keyset=False):
+    # "SCAN diamonds" is a table scan, "SCAN diamonds USING INDEX ..." a
+    # full index scan; either under a temp B-tree is a full sort
+    problems = [f'Seq Scan on {name}' for name in re.findall(r'\bSCAN (\w+)\s*$', plan, re.MULTILINE)]
+    if 'USE TEMP B-TREE FOR ORDER BY' in plan and (keyset or re.search(rf'\bSCAN {table}\b', plan)):
+        problems.append(f'Sort over {table}')
+    return problems
+
+
+def explain_check(viewset_class, action, params, filters):
+    """(plan, problems found in it) for one PLAN_CHECKS entry"""
+    queryset = build_queryset(viewset_class, action, params, filters)
+    table = queryset.model._meta.db_table
+    keyset = 'cursor' in params
+    with transaction.atomic():
+        if connection.vendor != 'postgresql':
+            plan = queryset.explain()
+            return plan, find_sqlite_problems(plan, table, keyset)
+        # Small seeded tables are cheaper to scan (and sort) than to read
+        # through an index, so make the planner pick an index whenever a
+        # usable one exists. A keyset page that still sorts has no index
+        # in its order.
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            if keyset:
+                cursor.execute('SET LOCAL enable_sort = off')
+        plan = queryset.explain()
+        tree = json.loads(queryset.explain(format='json'))[0]['Plan']
+    return plan, find_plan_problems(tree, table, keyset)
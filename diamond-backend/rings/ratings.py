@@ -0,0 +1,128 @@
+# rings/ratings.py
+
+from django.db import transaction
+from django.db.models import Avg, Count, F, Q
+
+from .models import ProductRatingSummary, Review
+
+
+# ============================================
+# RATING SUMMARIES
+# ============================================
+#
+# One ProductRatingSummary row per diamond/setting with approved reviews,
+# kept current by the Review signals: a save subtracts the review's old
+# contribution (if it was approved) and adds the new one, so approving,
+# un-approving, re-rating or moving a review costs two small UPDATEs.
+# Migration 0006 builds them from the existing reviews. Queryset updates
+# skip signals; run `manage.py rebuild_rating_summaries` after any bulk
+# change to reviews.
+
+STARS = range(1, 6)
+PRODUCT_FIELDS = {'diamond': 'diamond_id', 'setting': 'setting_id'}
+
+
+def review_contributions(diamond_id, setting_id, rating, is_approved):
+    """(product_type, product_id, rating) entries a review counts towards"""
+    if not is_approved or rating not in STARS:
+        return []
+    products = [('diamond', diamond_id), ('setting', setting_id)]
+    return [(product_type, product_id, rating) for product_type, product_id in products if product_id]
+
+
+def apply_contributions(contributions, sign):
+    """Add (sign=1) or remove (sign=-1) review contributions from summaries"""
+    for product_type, product_id, rating in contributions:
+        with transaction.atomic():
+            ProductRatingSummary.objects.get_or_create(product_type=product_type, product_id=product_id)
+            ProductRatingSummary.objects.filter(product_type=product_type, product_id=product_id).update(**{
+                'review_count': F('review_count') + sign,
+                'rating_total': F('rating_total') + sign * rating,
+                f'stars_{rating}': F(f'stars_{rating}') + sign,
+            })
+
+
+def rebuild_rating_summaries():
+    """Recompute every summary from the reviews table; returns the row count"""
+    summaries = {}
+    for product_type, field in PRODUCT_FIELDS.items():
+        rows = (
+            Review.objects.filter(is_approved=True, rating__in=STARS, **{f'{field}__isnull': False})
+            .order_by().values(field, 'rating').annotate(total=Count('pk'))
+        )
+        for row in rows:
+            key = (product_type, row[field])
+            summary = summaries.setdefault(key, ProductRatingSummary(product_type=product_type, product_id=row[field]))
+            summary.review_count += row['total']
+            summary.rating_total += row['rating'] * row['total']
+            setattr(summary, f"stars_{row['rating']}", row['total'])
+
+    with transaction.atomic():
+        ProductRatingSummary.objects.all().delete()
+        ProductRatingSummary.objects.bulk_create(summaries.values(), batch_size=1000)
+    return len(summaries)
+
+
+def format_summary(review_count, rating_total, histogram):
+    return {
+        'average_rating': round(rating_total / review_count, 1) if review_count else 0,
+        'total_reviews': review_count,
+        'histogram': {str(star): histogram.get(star, 0) for star in STARS},
+    }
+
+
+def _single_product(diamond_id, setting_id):
+    """(product_type, product_id) when exactly one product is asked for"""
+    if bool(diamond_id) != bool(setting_id):
+        return ('diamond', diamond_id) if diamond_id else ('setting', setting_id)
+    return None
+
+
+def _summary_from_row(summary):
+    if summary is None:
+        return format_summary(0, 0, {})
+    histogram = {star: getattr(summary, f'stars_{star}') for star in STARS}
+    return format_summary(summary.review_count, summary.rating_total, histogram)
+
+
+def _live_reviews(diamond_id, setting_id):
+    queryset = Review.objects.filter(is_approved=True, rating__in=STARS)
+    if diamond_id:
+        queryset = queryset.filter(diamond_id=diamond_id)
+    if setting_id:
+        queryset = queryset.filter(setting_id=setting_id)
+    return queryset
+
+
+LIVE_FIGURES = {
+    'count': Count('pk'), 'average': Avg('rating'),
+    **{f'stars_{star}': Count('pk', filter=Q(rating=star)) for star in STARS},
+}
+
+
+def _summary_from_figures(figures):
+    histogram = {star: figures[f'stars_{star}'] for star in STARS}
+    return format_summary(figures['count'], round((figures['average'] or 0) * figures['count']), histogram)
+
+
+def get_rating_summary(diamond_id=None, setting_id=None):
+    """
+    Rating figures for product_reviews. A single product is answered from
+    its summary row; a diamond+setting pair (rare) is aggregated live.
+    """
+    product = _single_product(diamond_id, setting_id)
+    if product is not None:
+        product_type, product_id = product
+        summary = ProductRatingSummary.objects.filter(product_type=product_type, product_id=product_id).first()
+        return _summary_from_row(summary)
+    return _summary_from_figures(_live_reviews(diamond_id, setting_id).aggregate(**LIVE_FIGURES))
+
+
+async def aget_rating_summary(diamond_id=None, setting_id=None):
+    """get_rating_summary() on the async ORM"""
+    product = _single_product(diamond_id, setting_id)
+    if product is not None:
+        product_type, product_id = product
+        summary = await ProductRatingSummary.objects.filter(product_type=product_type, product_id=product_id).afirst()
+        return _summary_from_row(summary)
+    return _summary_from_figures(await _live_reviews(diamond_id, setting_id).aaggregate(**LIVE_FIGURES))
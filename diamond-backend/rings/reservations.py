@@ -0,0 +1,178 @@
+# rings/reservations.py
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, Min, OuterRef
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .catalog import bump_catalog_version
+from .models import Diamond, DiamondReservation
+
+
+# ============================================
+# DIAMOND RESERVATIONS
+# ============================================
+#
+# Every diamond is a unique stone, so checkout takes a time-limited hold on
+# it. A hold is taken with a single INSERT ... ON CONFLICT statement that
+# only succeeds if the stone is still available and is either unheld, held
+# by an expired reservation, or already held by the same holder. Expired
+# holds are ignored everywhere, so the sweeper only tidies up the table and
+# tells caches that those stones are listed again.
+#
+# Listings that hide held stones are cached and ETag'd on the 'reservation'
+# version, so a lapsed hold must bump it as soon as the stone is listed
+# again, not on the sweeper's next run. Those views call
+# expire_lapsed_reservations() first: each process looks up the earliest
+# expiry at most every CATALOG_VERSION_TTL seconds and sweeps once it has
+# passed.
+
+def get_reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'DIAMOND_RESERVATION_TTL', 15 * 60))
+
+
+def config_holder_key(config):
+    return holder_key_for_config(config.pk)
+
+
+def holder_key_for_config(config_id):
+    """Holds are taken by checkout on behalf of a configuration"""
+    return f'config:{config_id}'
+
+
+def active_reservations():
+    return DiamondReservation.objects.filter(expires_at__gt=Now())
+
+
+def reservation_holders(diamond_ids):
+    """{diamond id: holder key} of the active holds on the given stones"""
+    return dict(
+        active_reservations().filter(diamond_id__in=diamond_ids).values_list('diamond_id', 'holder_key')
+    )
+
+
+def reserved_diamond_ids():
+    """Ids of the stones under an active hold (a small set at any time)"""
+    return set(active_reservations().values_list('diamond_id', flat=True))
+
+
+def exclude_reserved(queryset):
+    """Drop diamonds under an active hold, as one anti-join subquery"""
+    return queryset.filter(
+        ~Exists(active_reservations().filter(diamond_id=OuterRef('pk')))
+    )
+
+
+def reserve_diamond(diamond, holder_key, config=None):
+    """
+    Take or refresh a hold on a diamond.
+
+    Returns the new expiry time, or None if the stone is sold or held by
+    someone else.
+    """
+    now = timezone.now()
+    expires_at = now + get_reservation_ttl()
+    qn = connection.ops.quote_name
+    reservations = qn(DiamondReservation._meta.db_table)
+    diamonds = qn(Diamond._meta.db_table)
+
+    sql = f"""
+        INSERT INTO {reservations} (diamond_id, config_id, holder_key, expires_at, created_at)
+        SELECT %s, %s, %s, %s, %s
+        WHERE EXISTS (
+            SELECT 1 FROM {diamonds} WHERE diamond_id = %s AND is_available = %s
+        )
+        ON CONFLICT (diamond_id) DO UPDATE SET
+            config_id = excluded.config_id,
+            holder_key = excluded.holder_key,
+            expires_at = excluded.expires_at,
+            created_at = excluded.created_at
+        WHERE {reservations}.expires_at <= %s OR {reservations}.holder_key = excluded.holder_key
+        RETURNING reservation_id
+    """
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [
+        diamond.pk, config.pk if config else None, holder_key, adapt(expires_at), adapt(now),
+        diamond.pk, True, adapt(now),
+    ]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            acquired = cursor.fetchone() is not None
+    if not acquired:
+        return None
+    transaction.on_commit(lambda: bump_catalog_version('reservation'))
+    return expires_at
+
+
+def release_reservation(diamond, holder_key):
+    deleted, _ = DiamondReservation.objects.filter(diamond=diamond, holder_key=holder_key).delete()
+    if deleted:
+        transaction.on_commit(lambda: bump_catalog_version('reservation'))
+    return bool(deleted)
+
+
+def expire_reservations():
+    """Delete lapsed holds; returns how many were removed"""
+    deleted, _ = DiamondReservation.objects.filter(expires_at__lte=timezone.now()).delete()
+    if deleted:
+        bump_catalog_version('reservation')
+    return deleted
+
+
+_next_expiry = None
+_expiry_checked_at = None
+
+
+def expire_lapsed_reservations():
+    """Sweep now if a hold has lapsed (see the module comment)"""
+    global _next_expiry, _expiry_checked_at
+    ttl = getattr(settings, 'CATALOG_VERSION_TTL', 1.0)
+    if _expiry_checked_at is None or time.monotonic() - _expiry_checked_at >= ttl:
+        _next_expiry = DiamondReservation.objects.aggregate(next=Min('expires_at'))['next']
+        _expiry_checked_at = time.monotonic()
+    if _next_expiry is not None and _next_expiry <= timezone.now():
+        expire_reservations()
+        # Look the next expiry up again on the next call
+        _expiry_checked_at = None
+
+
+def sell_diamonds(diamonds, holder_keys):
+    """
+    Mark stones sold inside the caller's order transaction.
+
+    `holder_keys` maps diamond id to the holder allowed to buy it (None for
+    loose stones bought without a configuration). Returns {diamond id:
+    error message} for stones that can't be sold; nothing is written then.
+    """
+    errors = {}
+    ids = [diamond.pk for diamond in diamonds]
+    available = set(
+        Diamond.objects.select_for_update()
+        .filter(pk__in=ids, is_available=True)
+        .values_list('pk', flat=True)
+    )
+    held = reservation_holders(ids)
+    for diamond_id in ids:
+        holder = held.get(diamond_id)
+        if diamond_id not in available:
+            errors[diamond_id] = 'This diamond is no longer available.'
+        elif holder is not None and holder != holder_keys.get(diamond_id):
+            errors[diamond_id] = 'This diamond is reserved by another shopper.'
+    if errors:
+        return errors
+
+    # Conditional UPDATE as a last guard on backends without row locks
+    sold = Diamond.objects.filter(pk__in=ids, is_available=True).update(
+        is_available=False, updated_at=timezone.now()
+    )
+    if sold != len(ids):
+        return {diamond_id: 'This diamond is no longer available.' for diamond_id in ids}
+
+    DiamondReservation.objects.filter(diamond_id__in=ids).delete()
+    transaction.on_commit(lambda: bump_catalog_version('diamond'))
+    return {}
@@ -0,0 +1,314 @@
+# rings/rollups.py
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .hll import HyperLogLog
+from .models import InteractionRollup, InteractionSessionSketch, UserInteraction
+
+
+# ============================================
+# INTERACTION ROLLUPS
+# ============================================
+#
+# Hourly rollups are built from raw user_interactions rows; daily rollups
+# are built by merging 24 hourly ones. Both cover a contiguous span of
+# time (empty hours still get a sketch row), so a date range can be split
+# into: whole days from daily rollups, whole hours from hourly rollups,
+# and raw rows only for the edges the rollups don't cover yet.
+#
+# Rows can arrive with a created_at inside hours that are already rolled
+# up (buffered or retried ingest). Hourly sketches record the highest
+# interaction id that existed when they were built, so each refresh finds
+# rows inserted since into covered hours and rebuilds those hours and
+# their days.
+
+HOUR = timedelta(hours=1)
+DAY = timedelta(days=1)
+DIMENSIONS = ['interaction_type', 'device_type', 'diamond_id', 'setting_id']
+
+
+def floor_hour(value):
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value):
+    floored = floor_hour(value)
+    return floored if floored == value else floored + HOUR
+
+
+def floor_day(value):
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_day(value):
+    floored = floor_day(value)
+    return floored if floored == value else floored + DAY
+
+
+def parse_bound(value):
+    """Parse a start/end query param (date or datetime) to an aware datetime"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value}')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def get_coverage(granularity):
+    """[start, end) span covered by rollups of a granularity, or (None, None)"""
+    bounds = InteractionSessionSketch.objects.filter(granularity=granularity).aggregate(
+        low=Min('bucket_start'), high=Max('bucket_start')
+    )
+    if bounds['low'] is None:
+        return None, None
+    step = HOUR if granularity == 'hour' else DAY
+    return bounds['low'], bounds['high'] + step
+
+
+# ============================================
+# BUILDING
+# ============================================
+
+def rollup_hours(start, end, last_id=None):
+    """
+    (Re)build hourly rollups for the hour-aligned span [start, end).
+    `last_id` is the highest interaction id that existed before the rows
+    were read, recorded on the sketches.
+    """
+    raw = UserInteraction.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    by_hour = raw.annotate(bucket=TruncHour('created_at'))
+
+    rollups = [
+        InteractionRollup(granularity='hour', bucket_start=row.pop('bucket'), **row)
+        for row in by_hour.values('bucket', *DIMENSIONS).annotate(count=Count('pk'))
+    ]
+
+    sketches = {}
+    hour = start
+    while hour < end:
+        sketches[hour] = HyperLogLog()
+        hour += HOUR
+    for bucket, session_id in by_hour.values_list('bucket', 'session_id').distinct().iterator():
+        sketches[bucket].add(session_id)
+
+    with transaction.atomic():
+        InteractionRollup.objects.filter(
+            granularity='hour', bucket_start__gte=start, bucket_start__lt=end
+        ).delete()
+        InteractionSessionSketch.objects.filter(
+            granularity='hour', bucket_start__gte=start, bucket_start__lt=end
+        ).delete()
+        InteractionRollup.objects.bulk_create(rollups, batch_size=1000)
+        InteractionSessionSketch.objects.bulk_create([
+            InteractionSessionSketch(
+                granularity='hour', bucket_start=bucket, sketch=sketch.to_bytes(), last_interaction_id=last_id,
+            )
+            for bucket, sketch in sketches.items()
+        ], batch_size=1000)
+    return len(sketches)
+
+
+def rollup_days(start, end):
+    """(Re)build daily rollups for the day-aligned span [start, end) from hourly ones"""
+    hourly = InteractionRollup.objects.filter(
+        granularity='hour', bucket_start__gte=start, bucket_start__lt=end
+    ).order_by()
+    rollups = [
+        InteractionRollup(granularity='day', bucket_start=row.pop('bucket'), **row)
+        for row in hourly.annotate(bucket=TruncDay('bucket_start'))
+        .values('bucket', *DIMENSIONS).annotate(count=Sum('count'))
+    ]
+
+    sketches = {}
+    hour_sketches = InteractionSessionSketch.objects.filter(
+        granularity='hour', bucket_start__gte=start, bucket_start__lt=end
+    ).values_list('bucket_start', 'sketch')
+    for bucket, data in hour_sketches.iterator():
+        day = floor_day(timezone.localtime(bucket))
+        sketches.setdefault(day, HyperLogLog()).merge(HyperLogLog.from_bytes(bytes(data)))
+
+    with transaction.atomic():
+        InteractionRollup.objects.filter(
+            granularity='day', bucket_start__gte=start, bucket_start__lt=end
+        ).delete()
+        InteractionSessionSketch.objects.filter(
+            granularity='day', bucket_start__gte=start, bucket_start__lt=end
+        ).delete()
+        InteractionRollup.objects.bulk_create(rollups, batch_size=1000)
+        InteractionSessionSketch.objects.bulk_create([
+            InteractionSessionSketch(granularity='day', bucket_start=bucket, sketch=sketch.to_bytes())
+            for bucket, sketch in sketches.items()
+        ], batch_size=1000)
+    return len(sketches)
+
+
+def find_late_hours(before):
+    """
+    Hours before `before` that already have hourly rollups but have gained
+    rows since they were built
+    """
+    low, high = get_coverage('hour')
+    built_up_to = InteractionSessionSketch.objects.filter(granularity='hour').aggregate(
+        last_id=Max('last_interaction_id')
+    )['last_id']
+    if low is None or built_up_to is None:
+        return []
+    late = UserInteraction.objects.filter(
+        pk__gt=built_up_to, created_at__gte=low, created_at__lt=min(high, before),
+    ).order_by()
+    return sorted(
+        timezone.localtime(hour)
+        for hour in late.annotate(hour=TruncHour('created_at')).values_list('hour', flat=True).distinct()
+    )
+
+
+def refresh_rollups(since=None, now=None, lag=timedelta(minutes=5), chunk=DAY, progress=None):
+    """
+    Roll up every complete hour after the current watermark (or from
+    `since`, but never past the watermark), in chunks, then rebuild the daily rollups those hours belong to.
+    Covered hours that rows have arrived late for are rebuilt first.
+
+    `lag` leaves recent hours to the raw fallback so that events still
+    sitting in an ingestion buffer are not missed.
+    """
+    now = timezone.localtime(now or timezone.now())
+    end = floor_hour(now - lag)
+    # Read before any rows are, so a row inserted during this run is
+    # looked at again by the next one
+    last_id = UserInteraction.objects.aggregate(last_id=Max('pk'))['last_id']
+
+    low, high = get_coverage('hour')
+    if since is not None:
+        start = floor_hour(timezone.localtime(since))
+        # Coverage is read as one span, so the hours between the watermark
+        # and a later `since` must not be skipped
+        if high is not None and start > high:
+            start = timezone.localtime(high)
+    else:
+        if high is not None:
+            start = timezone.localtime(high)
+        else:
+            first = UserInteraction.objects.aggregate(first=Min('created_at'))['first']
+            if first is None:
+                return 0
+            start = floor_hour(timezone.localtime(first))
+
+    hours = 0
+    late_hours = find_late_hours(before=start)
+    for hour in late_hours:
+        hours += rollup_hours(hour, hour + HOUR, last_id)
+        if progress:
+            progress(hour, hour + HOUR)
+
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + chunk, end)
+        hours += rollup_hours(chunk_start, chunk_end, last_id)
+        if progress:
+            progress(chunk_start, chunk_end)
+        chunk_start = chunk_end
+
+    low, high = get_coverage('hour')
+    if low is not None:
+        first_day = ceil_day(timezone.localtime(low))
+        day_start = max(first_day, floor_day(start))
+        day_end = floor_day(timezone.localtime(high))
+        if day_start < day_end:
+            rollup_days(day_start, day_end)
+        for day in sorted({floor_day(hour) for hour in late_hours}):
+            if first_day <= day < min(day_start, day_end):
+                rollup_days(day, day + DAY)
+    return hours
+
+
+# ============================================
+# READING
+# ============================================
+
+def summarize_interactions(start=None, end=None):
+    """
+    analytics_summary figures for [start, end] (either bound optional),
+    answered from rollups wherever they cover the range
+    """
+    type_counts = {}
+    device_counts = {}
+
+    def add_counts(rows):
+        for row in rows:
+            type_counts[row['interaction_type']] = type_counts.get(row['interaction_type'], 0) + row['total']
+            device_counts[row['device_type']] = device_counts.get(row['device_type'], 0) + row['total']
+
+    raw = UserInteraction.objects.order_by()
+    if start:
+        raw = raw.filter(created_at__gte=start)
+    if end:
+        raw = raw.filter(created_at__lte=end)
+
+    sketch = None
+    low, high = get_coverage('hour')
+    if low is not None:
+        # Whole hours of the range that hourly rollups cover
+        rollup_start = max(ceil_hour(start), low) if start else low
+        rollup_end = min(floor_hour(end), high) if end else high
+        if rollup_start < rollup_end:
+            spans = [('hour', rollup_start, rollup_end)]
+            day_low, day_high = get_coverage('day')
+            if day_low is not None:
+                days_start = max(ceil_day(timezone.localtime(rollup_start)), day_low)
+                days_end = min(floor_day(timezone.localtime(rollup_end)), day_high)
+                if days_start < days_end:
+                    spans = [
+                        ('hour', rollup_start, days_start),
+                        ('day', days_start, days_end),
+                        ('hour', days_end, rollup_end),
+                    ]
+
+            buckets = Q()
+            for granularity, span_start, span_end in spans:
+                if span_start < span_end:
+                    buckets |= Q(granularity=granularity, bucket_start__gte=span_start, bucket_start__lt=span_end)
+
+            add_counts(
+                InteractionRollup.objects.filter(buckets).order_by()
+                .values('interaction_type', 'device_type').annotate(total=Sum('count'))
+            )
+            sketch = HyperLogLog()
+            for data in InteractionSessionSketch.objects.filter(buckets).values_list('sketch', flat=True):
+                sketch.merge(HyperLogLog.from_bytes(bytes(data)))
+
+            raw = raw.filter(
+                Q(created_at__lt=rollup_start) | Q(created_at__gte=rollup_end) | Q(created_at__isnull=True)
+            )
+
+    add_counts(raw.values('interaction_type', 'device_type').annotate(total=Count('pk')))
+    raw_sessions = raw.values_list('session_id', flat=True).distinct()
+    if sketch is None:
+        unique_sessions = raw_sessions.count()
+    else:
+        sketch.update(raw_sessions.iterator())
+        unique_sessions = sketch.count()
+
+    return {
+        'total_interactions': sum(type_counts.values()),
+        'by_type': [
+            {'interaction_type': key, 'count': count}
+            for key, count in sorted(type_counts.items(), key=lambda item: str(item[0]))
+        ],
+        'by_device': [
+            {'device_type': key, 'count': count}
+            for key, count in sorted(device_counts.items(), key=lambda item: str(item[0]))
+        ],
+        'unique_sessions': unique_sessions,
+    }
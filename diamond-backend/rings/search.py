@@ -0,0 +1,309 @@
+# rings/search.py
+
+import logging
+import threading
+from bisect import bisect_right
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+
+from .catalog import get_catalog_version
+from .models import Diamond
+
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# FACETED DIAMOND SEARCH
+# ============================================
+#
+# The index keeps every available diamond as a bit position (in default
+# `-created_at` order) and one bitmap per facet value, stored as Python
+# ints. Filtering is a handful of big-int ANDs and a facet count is a
+# popcount, so a filter change costs the same whether the catalog has a
+# thousand stones or half a million. Only the page of results itself is
+# read from the database. Stones held by a checkout stay in the index and
+# are masked out per query, so holds never force a rebuild.
+#
+# After a catalog change the index is rebuilt by a background thread while
+# requests keep being answered from the previous one, so a rebuild never
+# stalls search. Until it is swapped in, counts can be off by the stones
+# that changed; the page itself is re-checked against the database. Only a
+# worker's very first search builds the index on the request path.
+
+FACET_FIELDS = ['shape', 'cut', 'color', 'clarity']
+
+# Histogram edges, matching CARAT_RANGES / PRICE_RANGES in the frontend
+CARAT_EDGES = [0, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0]
+PRICE_EDGES = [0, 2000, 5000, 10000, 20000]
+
+# Rows per range bucket used to answer min/max filters
+RANGE_BUCKET_SIZE = 4096
+
+ORDERINGS = ['created_at', '-created_at', 'carat', '-carat', 'base_price', '-base_price']
+
+
+def bitmap_from_positions(positions, size):
+    """Build a bitmap int in one go (OR-ing bits one by one is quadratic)"""
+    buffer = bytearray((size + 7) // 8)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+class RangeColumn:
+    """
+    Numeric column bucketed by value for fast range masks. Unknown (None)
+    values match no range and, as NULLs do in PostgreSQL, sort last.
+    """
+
+    def __init__(self, values, edges):
+        self.values = values
+        self.size = size = len(values)
+        known = sorted((pos for pos in range(size) if values[pos] is not None), key=values.__getitem__)
+        self.order = known + [pos for pos in range(size) if values[pos] is None]
+
+        # Contiguous runs of the sorted order, each with its own bitmap
+        self.buckets = []
+        for start in range(0, len(known), RANGE_BUCKET_SIZE):
+            positions = known[start:start + RANGE_BUCKET_SIZE]
+            self.buckets.append((
+                values[positions[0]], values[positions[-1]],
+                positions, bitmap_from_positions(positions, size),
+            ))
+
+        # Histogram bitmaps; the last bucket is open-ended
+        self.edges = edges
+        histogram = [[] for _ in edges]
+        for pos in known:
+            histogram[max(bisect_right(edges, values[pos]) - 1, 0)].append(pos)
+        self.histogram = [bitmap_from_positions(positions, size) for positions in histogram]
+
+    def mask(self, low=None, high=None):
+        """Bitmap of rows with low <= value <= high"""
+        low = float('-inf') if low is None else low
+        high = float('inf') if high is None else high
+        result = 0
+        partial = []
+        for first, last, positions, bitmap in self.buckets:
+            if last < low or first > high:
+                continue
+            if first >= low and last <= high:
+                result |= bitmap
+                continue
+            values = self.values
+            partial.extend(pos for pos in positions if low <= values[pos] <= high)
+        if partial:
+            result |= bitmap_from_positions(partial, self.size)
+        return result
+
+    def counts(self, mask):
+        buckets = []
+        for i, bitmap in enumerate(self.histogram):
+            buckets.append({
+                'min': self.edges[i],
+                'max': self.edges[i + 1] if i + 1 < len(self.edges) else None,
+                'count': (mask & bitmap).bit_count(),
+            })
+        return buckets
+
+
+class DiamondSearchIndex:
+    """In-process bitmap index over available diamonds"""
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        self.ids = []
+        self.id_positions = {}
+        positions = {field: {} for field in FACET_FIELDS}
+        carats = []
+        prices = []
+
+        for pos, row in enumerate(rows):
+            diamond_id, shape, cut, color, clarity, carat, price = row
+            self.ids.append(diamond_id)
+            self.id_positions[diamond_id] = pos
+            for field, value in zip(FACET_FIELDS, (shape, cut, color, clarity)):
+                positions[field].setdefault(value, []).append(pos)
+            carats.append(None if carat is None else float(carat))
+            prices.append(None if price is None else float(price))
+
+        self.size = len(self.ids)
+        self.facets = {
+            field: {
+                value: bitmap_from_positions(members, self.size)
+                for value, members in values.items()
+            }
+            for field, values in positions.items()
+        }
+        self.all = (1 << self.size) - 1
+        self.carat = RangeColumn(carats, CARAT_EDGES)
+        self.price = RangeColumn(prices, PRICE_EDGES)
+        self.orderings = {
+            'carat': self.carat.order,
+            'base_price': self.price.order,
+        }
+
+    @classmethod
+    def build(cls, version=None):
+        rows = (
+            Diamond.objects.filter(is_available=True)
+            .order_by('-created_at', '-diamond_id')
+            .values_list(
+                'diamond_id', 'shape', 'cut', 'color', 'clarity',
+                'carat', 'base_price',
+            )
+        )
+        return cls(rows.iterator(chunk_size=5000), version=version)
+
+    def _dimension_masks(self, filters):
+        masks = {}
+        for field in FACET_FIELDS:
+            values = filters.get(field)
+            if values:
+                bitmaps = self.facets[field]
+                mask = 0
+                for value in values:
+                    mask |= bitmaps.get(value, 0)
+                masks[field] = mask
+        if filters.get('min_carat') is not None or filters.get('max_carat') is not None:
+            masks['carat'] = self.carat.mask(filters.get('min_carat'), filters.get('max_carat'))
+        if filters.get('min_price') is not None or filters.get('max_price') is not None:
+            masks['price'] = self.price.mask(filters.get('min_price'), filters.get('max_price'))
+        return masks
+
+    def _combine(self, masks, exclude=None):
+        result = self.all
+        for name, mask in masks.items():
+            if name != exclude:
+                result &= mask
+        return result
+
+    def positions(self, mask, ordering='-created_at'):
+        """Yield matching positions in the requested order"""
+        bits = bin(mask)[:1:-1]
+        if ordering == '-created_at':
+            pos = bits.find('1')
+            while pos != -1:
+                yield pos
+                pos = bits.find('1', pos + 1)
+            return
+
+        field = ordering.lstrip('-')
+        if field == 'created_at':
+            order = range(self.size - 1, -1, -1)
+        elif ordering.startswith('-'):
+            order = reversed(self.orderings[field])
+        else:
+            order = self.orderings[field]
+        limit = len(bits)
+        for pos in order:
+            if pos < limit and bits[pos] == '1':
+                yield pos
+
+    def search(self, filters, ordering='-created_at', offset=0, limit=20, hidden_ids=()):
+        """
+        Return (count, page of diamond ids, facet counts, histograms), leaving
+        out `hidden_ids` everywhere
+        """
+        masks = self._dimension_masks(filters)
+        hidden = [self.id_positions[pk] for pk in hidden_ids if pk in self.id_positions]
+        if hidden:
+            masks['hidden'] = self.all & ~bitmap_from_positions(hidden, self.size)
+        matched = self._combine(masks)
+
+        facets = {}
+        for field in FACET_FIELDS:
+            # Each facet ignores its own selection, so the sidebar keeps
+            # showing the alternatives to what is currently ticked
+            base = self._combine(masks, exclude=field)
+            facets[field] = {
+                value: (base & bitmap).bit_count()
+                for value, bitmap in sorted(self.facets[field].items(), key=lambda item: str(item[0]))
+            }
+        histograms = {
+            'carat': self.carat.counts(self._combine(masks, exclude='carat')),
+            'price': self.price.counts(self._combine(masks, exclude='price')),
+        }
+
+        page = []
+        for i, pos in enumerate(self.positions(matched, ordering)):
+            if i >= offset + limit:
+                break
+            if i >= offset:
+                page.append(self.ids[pos])
+
+        return matched.bit_count(), page, facets, histograms
+
+
+_index = None
+_index_lock = threading.Lock()
+_rebuild_thread = None
+
+
+def _rebuild(version):
+    global _index
+    try:
+        index = DiamondSearchIndex.build(version=version)
+        with _index_lock:
+            _index = index
+    except Exception:
+        # The previous index keeps serving; the next search tries again
+        logger.exception('Search index rebuild failed')
+    finally:
+        connection.close()
+
+
+def get_search_index():
+    """
+    Return the process-wide index. After a catalog change this is still the
+    previous index until the background rebuild has finished.
+    """
+    global _index, _rebuild_thread
+    version = get_catalog_version('diamond')
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None:
+            _index = DiamondSearchIndex.build(version=version)
+        elif _index.version != version and (_rebuild_thread is None or not _rebuild_thread.is_alive()):
+            _rebuild_thread = threading.Thread(
+                target=_rebuild, args=(version,), name='search-index-rebuild', daemon=True,
+            )
+            _rebuild_thread.start()
+        return _index
+
+
+def _parse_number(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    # NaN would make every range comparison false, infinity every one true
+    if number is None or not number.is_finite():
+        raise ValidationError({name: 'A valid number is required.'})
+    return float(number)
+
+
+def parse_search_filters(query_params):
+    """Read facet selections (comma separated or repeated) and ranges"""
+    filters = {}
+    for field in FACET_FIELDS:
+        values = []
+        for raw in query_params.getlist(field):
+            values.extend(v.strip() for v in raw.split(',') if v.strip())
+        if values:
+            filters[field] = values
+    for name in ['min_carat', 'max_carat', 'min_price', 'max_price']:
+        filters[name] = _parse_number(query_params, name)
+
+    ordering = query_params.get('ordering') or '-created_at'
+    if ordering not in ORDERINGS:
+        raise ValidationError({'ordering': f'Must be one of: {", ".join(ORDERINGS)}.'})
+    return filters, ordering
@@ -1,10 +1,65 @@
 # rings/serializers.py
 
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q
 from rest_framework import serializers
+
 from .models import (
     User, Diamond, Setting, RingConfiguration, 
     Favorite, Review, Order, OrderItem, UserInteraction
 )
+from .pricing import price_configuration, price_order
+from .reservations import config_holder_key, reservation_holders, sell_diamonds
+
+
+# ============================================
+# RELATED FIELDS
+# ============================================
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves ids from `context['prefetched']`
+    ({Model: {pk: instance}}) when present, so validating a large batch
+    costs one query per model instead of one per row
+    """
+    
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched')
+        if prefetched is None or self.queryset.model not in prefetched:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = prefetched[self.queryset.model].get(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+def prefetch_primary_keys(rows, relations):
+    """
+    Load every object referenced by a batch of raw input rows with one query
+    per model. `relations` maps field name to model; the result is meant for
+    `context['prefetched']`.
+    """
+    prefetched = {}
+    for field, model in relations.items():
+        ids = set()
+        for row in rows:
+            value = row.get(field) if isinstance(row, dict) else None
+            if value in (None, ''):
+                continue
+            try:
+                ids.add(int(value))
+            except (TypeError, ValueError):
+                continue
+        prefetched[model] = model.objects.only('pk').in_bulk(ids) if ids else {}
+    return prefetched
 
 
 # ============================================
@@ -46,6 +101,16 @@ class DiamondDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class DiamondImportSerializer(serializers.ModelSerializer):
+    """Validates one supplier feed row; rows are upserted by sku"""
+    
+    class Meta:
+        model = Diamond
+        exclude = ['diamond_id', 'is_available', 'created_at', 'updated_at']
+        # sku uniqueness is handled by the upsert, not by a query per row
+        extra_kwargs = {'sku': {'validators': []}}
+
+
 # ============================================
 # SETTING SERIALIZERS
 # ============================================
@@ -104,10 +169,52 @@ class RingConfigurationCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = RingConfiguration
         fields = [
-            'user', 'diamond', 'setting', 'ring_size', 
+            'config_id', 'user', 'diamond', 'setting', 'ring_size', 
             'config_name', 'total_price', 'diamond_price', 
             'setting_price', 'is_saved'
         ]
+        # Prices are always computed server-side; client values are ignored
+        read_only_fields = ['total_price', 'diamond_price', 'setting_price']
+    
+    def validate(self, attrs):
+        diamond = attrs.get('diamond', getattr(self.instance, 'diamond', None))
+        setting = attrs.get('setting', getattr(self.instance, 'setting', None))
+        # Only a newly picked stone or setting is checked, so a saved design
+        # can still be renamed after its diamond sold
+        if diamond is not None and diamond.pk != getattr(self.instance, 'diamond_id', None):
+            if diamond.is_available is False:
+                raise serializers.ValidationError({'diamond': 'This diamond is no longer available.'})
+            holder = reservation_holders([diamond.pk]).get(diamond.pk)
+            if holder is not None and holder != (config_holder_key(self.instance) if self.instance else None):
+                raise serializers.ValidationError({'diamond': 'This diamond is reserved by another shopper.'})
+        if setting is not None and setting.pk != getattr(self.instance, 'setting_id', None):
+            if setting.is_available is False:
+                raise serializers.ValidationError({'setting': 'This setting is no longer available.'})
+        attrs['diamond_price'] = diamond.base_price if diamond else None
+        attrs['setting_price'] = setting.base_price if setting else None
+        attrs['total_price'] = price_configuration(attrs['diamond_price'], attrs['setting_price'])
+        return attrs
+
+
+class ConfigurationQuoteSerializer(serializers.Serializer):
+    """One (diamond, setting, ring size) combination to price"""
+    
+    diamond_id = serializers.IntegerField(required=False, allow_null=True)
+    setting_id = serializers.IntegerField(required=False, allow_null=True)
+    ring_size = serializers.CharField(max_length=10, required=False, allow_blank=True, allow_null=True)
+    # The configuration the shopper's checkout holds the diamond for, if any
+    config_id = serializers.IntegerField(required=False, allow_null=True)
+    diamond_sku = serializers.CharField(read_only=True)
+    setting_sku = serializers.CharField(read_only=True)
+    diamond_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    setting_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    error = serializers.CharField(read_only=True)
+    
+    def validate(self, attrs):
+        if not attrs.get('diamond_id') and not attrs.get('setting_id'):
+            raise serializers.ValidationError('A diamond_id or setting_id is required.')
+        return attrs
 
 
 # ============================================
@@ -177,6 +284,8 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
 class OrderItemSerializer(serializers.ModelSerializer):
     """Serializer for order items"""
     
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+    
     class Meta:
         model = OrderItem
         fields = [
@@ -184,6 +293,8 @@ class OrderItemSerializer(serializers.ModelSerializer):
             'ring_size', 'diamond_price', 'setting_price', 
             'item_total', 'quantity', 'item_description'
         ]
+        # Priced from the catalog by OrderCreateSerializer; client values are ignored
+        read_only_fields = ['diamond_price', 'setting_price', 'item_total']
 
 
 class OrderListSerializer(serializers.ModelSerializer):
@@ -207,6 +318,16 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+def lock_rows(model, ids, skus):
+    """{pk: row} for the rows matching either ids or skus, locked FOR UPDATE in pk order"""
+    if not ids and not skus:
+        return {}
+    rows = model.objects.select_for_update().filter(
+        Q(pk__in=ids) | Q(sku__in=skus)
+    ).order_by('pk')
+    return {row.pk: row for row in rows}
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating orders"""
     
@@ -224,15 +345,132 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             'shipping_cost', 'total_amount', 'payment_method', 'special_instructions',
             'items'
         ]
+        # Totals are computed from catalog prices in create(); client values are ignored
+        read_only_fields = ['subtotal', 'tax_amount', 'shipping_cost', 'total_amount']
+    
+    def to_internal_value(self, data):
+        # Resolve every item's config with one query instead of one per item
+        items = data.get('items') if hasattr(data, 'get') else None
+        if isinstance(items, list):
+            self.context['prefetched'] = prefetch_primary_keys(items, {'config': RingConfiguration})
+        return super().to_internal_value(data)
     
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
         
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        with transaction.atomic():
+            self.prepare_items(items_data)
+            subtotal = sum((item['item_total'] for item in items_data), Decimal('0'))
+            validated_data['subtotal'] = subtotal
+            (
+                validated_data['tax_amount'],
+                validated_data['shipping_cost'],
+                validated_data['total_amount'],
+            ) = price_order(subtotal)
+            
+            order = Order.objects.create(**validated_data)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, **item_data) for item_data in items_data
+            ])
         
         return order
+    
+    def prepare_items(self, items_data):
+        """
+        Replace client-sent prices with current catalog prices and mark the
+        ordered diamonds sold.
+        
+        Configurations, then the diamonds and settings referenced by the
+        order (directly or through a configuration) are locked and read with
+        one query per table, always in that order and by primary key so two
+        orders can't deadlock, and prices can't change between checking
+        them and writing the order. Diamonds are unique stones: each can
+        appear once, must not be held by another shopper's reservation, and
+        is taken off sale in the same transaction.
+        """
+        config_ids = {item['config'].pk for item in items_data if item.get('config')}
+        diamond_skus = {item['diamond_sku'] for item in items_data if not item.get('config') and item.get('diamond_sku')}
+        setting_skus = {item['setting_sku'] for item in items_data if not item.get('config') and item.get('setting_sku')}
+        
+        configs = {}
+        if config_ids:
+            # The rows a configuration points at are locked below with the
+            # rest; FOR UPDATE can't reach them through the nullable joins
+            configs = {
+                config.pk: config
+                for config in RingConfiguration.objects.select_for_update().filter(pk__in=config_ids).order_by('pk')
+            }
+        diamond_ids = {config.diamond_id for config in configs.values() if config.diamond_id}
+        setting_ids = {config.setting_id for config in configs.values() if config.setting_id}
+        
+        diamonds = lock_rows(Diamond, diamond_ids, diamond_skus)
+        settings_ = lock_rows(Setting, setting_ids, setting_skus)
+        diamonds_by_sku = {diamond.sku: diamond for diamond in diamonds.values()}
+        settings_by_sku = {setting.sku: setting for setting in settings_.values()}
+        
+        errors = []
+        sold = {}
+        for item in items_data:
+            item_errors = {}
+            config = None
+            if item.get('config'):
+                config = configs.get(item['config'].pk)
+                if config is None:
+                    # Deleted since the order was validated
+                    errors.append({'config': ['This configuration no longer exists.']})
+                    continue
+                item['config'] = config
+                diamond = diamonds.get(config.diamond_id)
+                setting = settings_.get(config.setting_id)
+            else:
+                diamond = diamonds_by_sku.get(item.get('diamond_sku'))
+                setting = settings_by_sku.get(item.get('setting_sku'))
+                if item.get('diamond_sku') and diamond is None:
+                    item_errors['diamond_sku'] = ['Unknown diamond.']
+                if item.get('setting_sku') and setting is None:
+                    item_errors['setting_sku'] = ['Unknown setting.']
+            
+            if diamond is None and setting is None and not item_errors:
+                item_errors['non_field_errors'] = ['Item must reference a configuration, diamond or setting.']
+            if diamond is not None and diamond.is_available is False:
+                item_errors['diamond_sku'] = ['This diamond is no longer available.']
+            if setting is not None and setting.is_available is False:
+                item_errors['setting_sku'] = ['This setting is no longer available.']
+            if diamond is not None:
+                if diamond.pk in sold:
+                    item_errors['diamond_sku'] = ['This diamond appears more than once in the order.']
+                elif (item.get('quantity') or 1) != 1:
+                    item_errors['quantity'] = ['A diamond can only be ordered once.']
+                else:
+                    sold[diamond.pk] = (diamond, config_holder_key(config) if config else None)
+            errors.append(item_errors)
+            if item_errors:
+                continue
+            
+            quantity = item.get('quantity') or 1
+            item['quantity'] = quantity
+            item['diamond_sku'] = diamond.sku if diamond else None
+            item['setting_sku'] = setting.sku if setting else None
+            item['diamond_price'] = diamond.base_price if diamond else None
+            item['setting_price'] = setting.base_price if setting else None
+            item['item_total'] = price_configuration(item['diamond_price'], item['setting_price']) * quantity
+        
+        if any(errors):
+            raise serializers.ValidationError({'items': errors})
+        
+        if sold:
+            sale_errors = sell_diamonds(
+                [diamond for diamond, _ in sold.values()],
+                {diamond_id: holder for diamond_id, (_, holder) in sold.items()},
+            )
+            if sale_errors:
+                for item, item_errors in zip(items_data, errors):
+                    diamond_id = item['config'].diamond_id if item.get('config') else None
+                    if diamond_id is None and item.get('diamond_sku') in diamonds_by_sku:
+                        diamond_id = diamonds_by_sku[item['diamond_sku']].pk
+                    if diamond_id in sale_errors:
+                        item_errors['diamond_sku'] = [sale_errors[diamond_id]]
+                raise serializers.ValidationError({'items': errors})
 
 
 # ============================================
@@ -250,6 +488,8 @@ class UserInteractionSerializer(serializers.ModelSerializer):
 class UserInteractionCreateSerializer(serializers.ModelSerializer):
     """Serializer for creating user interactions"""
     
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+    
     class Meta:
         model = UserInteraction
         fields = [
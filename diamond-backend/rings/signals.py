@@ -0,0 +1,83 @@
+# rings/signals.py
+
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .compatibility import rebuild_compatibility
+from .dbpool import connection_stats
+from .models import Diamond, Review, Setting, SettingCompatibility
+from .ratings import apply_contributions, review_contributions
+
+
+# ============================================
+# CATALOG INVALIDATION
+# ============================================
+# Note: queryset.update() and bulk_create() do not send these signals, so
+# code doing bulk writes must call bump_catalog_version() itself.
+
+@receiver([post_save, post_delete], sender=Diamond)
+def diamond_changed(sender, **kwargs):
+    bump_catalog_version('diamond')
+
+
+@receiver([post_save, post_delete], sender=Setting)
+def setting_changed(sender, **kwargs):
+    bump_catalog_version('setting')
+
+
+# ============================================
+# COMPATIBILITY INDEX
+# ============================================
+
+@receiver(post_save, sender=Setting)
+def setting_saved(sender, instance, **kwargs):
+    rebuild_compatibility(Setting.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Setting)
+def setting_deleted(sender, instance, **kwargs):
+    SettingCompatibility.objects.filter(setting_id=instance.pk).delete()
+
+
+# ============================================
+# RATING SUMMARIES
+# ============================================
+
+def review_state(review):
+    return review_contributions(review.diamond_id, review.setting_id, review.rating, review.is_approved)
+
+
+@receiver(pre_save, sender=Review)
+def review_saving(sender, instance, **kwargs):
+    # Remember what the stored row counted towards before it changes
+    previous = None
+    if instance.pk is not None:
+        previous = Review.objects.filter(pk=instance.pk).values(
+            'diamond_id', 'setting_id', 'rating', 'is_approved'
+        ).first()
+    instance._rating_contributions = review_contributions(**previous) if previous else []
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, **kwargs):
+    previous = getattr(instance, '_rating_contributions', [])
+    current = review_state(instance)
+    if previous != current:
+        apply_contributions(previous, -1)
+        apply_contributions(current, 1)
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_contributions(review_state(instance), -1)
+
+
+# ============================================
+# CONNECTION STATS
+# ============================================
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    connection_stats.incr('connections_opened')
@@ -0,0 +1,277 @@
+# rings/similarity.py
+
+import copy
+import logging
+import math
+import threading
+import time
+import warnings
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .catalog import get_catalog_version
+from .models import Diamond
+
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# SIMILAR DIAMONDS
+# ============================================
+#
+# Every diamond is one row of a float32 matrix of encoded attributes:
+# carat, ordinal cut/color/clarity, table and depth percent, length/width
+# ratio and log price. Columns are standardized over the catalog and
+# scaled by the square root of their weight, so the weighted squared
+# distance between two stones is the plain squared distance between their
+# rows. Neighbours of one stone are found with a single matrix-vector
+# product over precomputed row norms:
+#     |a - q|^2 = |a|^2 - 2 a.q + |q|^2
+# followed by argpartition, without a per-stone Python loop. The product
+# runs over a contiguous copy of the available stones of the query's shape,
+# built on first use for each index version.
+#
+# On a catalog version bump only rows changed since the last sync (by
+# updated_at, plus new ids) are re-encoded and patched into a copy of the
+# arrays, which then replaces the shared index. Deletions and writes that
+# don't touch updated_at are picked up by a full rebuild when the row count
+# no longer matches, or after SIMILAR_DIAMONDS_FULL_REBUILD_SECONDS.
+#
+# Syncs and rebuilds run in a background thread, as the search index's do
+# (rings/search.py); requests keep being answered from the previous index
+# until the new one is swapped in. Only a worker's very first lookup
+# builds the index on the request path.
+
+CUT_GRADES = ['Fair', 'Good', 'Very Good', 'Premium', 'Excellent', 'Ideal']
+COLOR_GRADES = list('MLKJIHGFED')
+CLARITY_GRADES = ['I3', 'I2', 'I1', 'SI2', 'SI1', 'VS2', 'VS1', 'VVS2', 'VVS1', 'IF', 'FL']
+
+FEATURES = ['carat', 'cut', 'color', 'clarity', 'table_percent', 'depth_percent', 'ratio', 'price']
+FEATURE_WEIGHTS = {
+    'carat': 3.0,
+    'cut': 1.0,
+    'color': 1.5,
+    'clarity': 1.5,
+    'table_percent': 0.5,
+    'depth_percent': 0.5,
+    'ratio': 1.0,
+    'price': 2.0,
+}
+
+COLUMNS = [
+    'diamond_id', 'shape', 'is_available', 'updated_at', 'carat', 'cut', 'color', 'clarity',
+    'table_percent', 'depth_percent', 'length_mm', 'width_mm', 'base_price',
+]
+
+
+def _grade(grades):
+    ranks = {grade.lower(): rank for rank, grade in enumerate(grades)}
+    return lambda value: ranks.get((value or '').strip().lower(), math.nan)
+
+
+def _number(value):
+    return math.nan if value is None else float(value)
+
+
+grade_cut = _grade(CUT_GRADES)
+grade_color = _grade(COLOR_GRADES)
+grade_clarity = _grade(CLARITY_GRADES)
+
+
+def encode_row(row):
+    """Raw feature values of one COLUMNS row (NaN where unknown)"""
+    (_, _, _, _, carat, cut, color, clarity, table_percent, depth_percent,
+     length_mm, width_mm, base_price) = row
+    ratio = math.nan
+    if length_mm and width_mm:
+        ratio = float(max(length_mm, width_mm) / min(length_mm, width_mm))
+    price = math.log(float(base_price)) if base_price and base_price > 0 else math.nan
+    return (
+        _number(carat), grade_cut(cut), grade_color(color), grade_clarity(clarity),
+        _number(table_percent), _number(depth_percent), ratio, price,
+    )
+
+
+class SimilarityIndex:
+    """Process-wide matrix of encoded diamonds; see the module comment"""
+
+    def __init__(self, rows, version=None):
+        rows = list(rows)
+        self.version = version
+        self.built_at = time.monotonic()
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.positions = {diamond_id: pos for pos, diamond_id in enumerate(self.ids.tolist())}
+        self.shape_codes = {}
+        self.shapes = np.array([self.shape_code(row[1]) for row in rows], dtype=np.int32)
+        self.available = np.array([bool(row[2]) for row in rows], dtype=bool)
+        self.synced_at = max((row[3] for row in rows if row[3] is not None), default=None)
+        self.max_id = max(self.positions, default=0)
+
+        raw = np.array([encode_row(row) for row in rows], dtype=np.float64).reshape(len(rows), len(FEATURES))
+        # Unknown values sit at the column median, so they neither attract
+        # nor repel; standardizing makes the weights comparable
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            center = np.nanmedian(raw, axis=0) if len(rows) else np.zeros(len(FEATURES))
+            spread = np.nanstd(raw, axis=0) if len(rows) else np.ones(len(FEATURES))
+        self.center = np.nan_to_num(center)
+        spread = np.nan_to_num(spread)
+        spread[spread == 0] = 1.0
+        weights = np.array([FEATURE_WEIGHTS[name] for name in FEATURES])
+        self.scale = np.sqrt(weights) / spread
+
+        self.matrix = self.scaled(raw)
+        self.norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.groups = {}
+
+    @classmethod
+    def build(cls, version=None):
+        rows = Diamond.objects.order_by('pk').values_list(*COLUMNS)
+        return cls(rows.iterator(chunk_size=5000), version=version)
+
+    def shape_code(self, shape):
+        return self.shape_codes.setdefault((shape or '').strip().lower(), len(self.shape_codes))
+
+    def scaled(self, raw):
+        raw = np.where(np.isnan(raw), self.center, raw)
+        return ((raw - self.center) * self.scale).astype(np.float32)
+
+    def synced(self, version):
+        """
+        Copy of the index with rows changed since the last sync patched in,
+        or None if a full rebuild is needed. Readers of the current index
+        are never shown half-updated arrays.
+        """
+        changed = Q(pk__gt=self.max_id)
+        if self.synced_at is not None:
+            changed |= Q(updated_at__gte=self.synced_at)
+        rows = list(Diamond.objects.filter(changed).order_by('pk').values_list(*COLUMNS))
+
+        new_rows = [row for row in rows if row[0] not in self.positions]
+        if len(self.ids) + len(new_rows) != Diamond.objects.count():
+            return None
+
+        index = copy.copy(self)
+        index.version = version
+        if not rows:
+            return index
+        index.groups = {}
+
+        raw = np.array([encode_row(row) for row in rows], dtype=np.float64)
+        matrix = self.scaled(raw)
+        norms = np.einsum('ij,ij->i', matrix, matrix)
+        index.shape_codes = dict(self.shape_codes)
+        shapes = np.array([index.shape_code(row[1]) for row in rows], dtype=np.int32)
+        available = np.array([bool(row[2]) for row in rows], dtype=bool)
+        existing = np.array([row[0] in self.positions for row in rows], dtype=bool)
+        targets = np.array([self.positions[row[0]] for row in rows if row[0] in self.positions], dtype=np.int64)
+
+        # concatenate() copies as well, so old and new never share arrays
+        index.ids = np.concatenate([self.ids, [row[0] for row in new_rows]]).astype(np.int64)
+        index.matrix = np.concatenate([self.matrix, matrix[~existing]])
+        index.norms = np.concatenate([self.norms, norms[~existing]])
+        index.shapes = np.concatenate([self.shapes, shapes[~existing]])
+        index.available = np.concatenate([self.available, available[~existing]])
+        index.matrix[targets] = matrix[existing]
+        index.norms[targets] = norms[existing]
+        index.shapes[targets] = shapes[existing]
+        index.available[targets] = available[existing]
+
+        if new_rows:
+            index.positions = dict(self.positions)
+            for offset, row in enumerate(new_rows):
+                index.positions[row[0]] = len(self.ids) + offset
+            index.max_id = max(self.max_id, new_rows[-1][0])
+        stamps = [row[3] for row in rows if row[3] is not None]
+        if self.synced_at is not None:
+            stamps.append(self.synced_at)
+        index.synced_at = max(stamps, default=None)
+        return index
+
+    def group(self, shape_code=None):
+        """(positions, matrix, norms) of the available stones of one shape, or of all"""
+        group = self.groups.get(shape_code)
+        if group is None:
+            mask = self.available if shape_code is None else self.available & (self.shapes == shape_code)
+            positions = np.flatnonzero(mask)
+            group = self.groups[shape_code] = (positions, self.matrix[positions], self.norms[positions])
+        return group
+
+    def similar(self, diamond_id, limit=6, same_shape=True):
+        """
+        [(diamond_id, distance)] of the closest available stones, nearest
+        first, or None if the diamond isn't indexed.
+        """
+        pos = self.positions.get(diamond_id)
+        if pos is None:
+            return None
+        positions, matrix, norms = self.group(int(self.shapes[pos]) if same_shape else None)
+        query = self.matrix[pos]
+        distances = norms - 2 * (matrix @ query) + self.norms[pos]
+
+        candidates = len(positions)
+        own = np.searchsorted(positions, pos)
+        if own < candidates and positions[own] == pos:
+            distances[own] = np.inf
+            candidates -= 1
+        limit = min(limit, candidates)
+        if limit <= 0:
+            return []
+        nearest = np.argpartition(distances, limit - 1)[:limit]
+        nearest = nearest[np.argsort(distances[nearest], kind='stable')]
+        return [
+            (int(self.ids[positions[i]]), float(np.sqrt(max(distances[i], 0.0))))
+            for i in nearest
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+_refresh_thread = None
+
+
+def refreshed_index(index, version):
+    """`index` synced to `version`, or a full rebuild when a sync can't be trusted"""
+    full_after = getattr(settings, 'SIMILAR_DIAMONDS_FULL_REBUILD_SECONDS', 3600)
+    if time.monotonic() - index.built_at < full_after:
+        synced = index.synced(version)
+        if synced is not None:
+            return synced
+    return SimilarityIndex.build(version=version)
+
+
+def _refresh(index, version):
+    global _index
+    try:
+        refreshed = refreshed_index(index, version)
+        with _index_lock:
+            _index = refreshed
+    except Exception:
+        # The previous index keeps serving; the next lookup tries again
+        logger.exception('Similarity index refresh failed')
+    finally:
+        connection.close()
+
+
+def get_similarity_index():
+    """
+    Return the process-wide index. After a catalog change this is still the
+    previous index until the background sync or rebuild has finished.
+    """
+    global _index, _refresh_thread
+    version = get_catalog_version('diamond')
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None:
+            _index = SimilarityIndex.build(version=version)
+        elif _index.version != version and (_refresh_thread is None or not _refresh_thread.is_alive()):
+            _refresh_thread = threading.Thread(
+                target=_refresh, args=(_index, version), name='similarity-index-refresh', daemon=True,
+            )
+            _refresh_thread.start()
+        return _index
@@ -0,0 +1,110 @@
+# rings/statistics.py
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min, Max
+
+from .catalog import get_catalog_version
+
+
+# Facets reported by the statistics endpoint: (response key, model field)
+FACETS = [
+    ('shapes', 'shape'),
+    ('cuts', 'cut'),
+    ('colors', 'color'),
+    ('clarities', 'clarity'),
+]
+
+# Query params that change the statistics queryset
+FILTER_PARAMS = [
+    'cut', 'color', 'clarity', 'shape', 'search',
+    'min_carat', 'max_carat', 'min_price', 'max_price',
+    'compatible_with_setting', 'min_value_score',
+]
+
+
+def normalize_filters(query_params):
+    """
+    Reduce query params to a stable, hashable form so that
+    ?shape=Round&cut=Ideal and ?cut=Ideal&shape=Round share a cache entry
+    """
+    normalized = []
+    for name in FILTER_PARAMS:
+        values = sorted(v.strip() for v in query_params.getlist(name) if v.strip())
+        if values:
+            normalized.append((name, tuple(values)))
+    return tuple(normalized)
+
+
+def compute_diamond_statistics(queryset):
+    """
+    Count, carat/price ranges and facet counts in two queries.
+
+    One aggregate reads the count and the ranges; one GROUP BY over the
+    (shape, cut, color, clarity) combination counts the facets, which are
+    rolled up in Python. The fields are free text, but graded stock stays
+    within 10 shapes x 6 cuts x 23 colors (D-Z) x 11 clarities, at most
+    15,180 combinations (about 3,200 in the benchmark seed). The GROUP BY
+    only counts: tracking four extremes per group on broad filters cost
+    more than reading the ranges in their own pass.
+    """
+    queryset = queryset.order_by()
+    totals = queryset.aggregate(
+        count=Count('pk'),
+        min_carat=Min('carat'),
+        max_carat=Max('carat'),
+        min_price=Min('base_price'),
+        max_price=Max('base_price'),
+    )
+    facet_counts = {key: {} for key, _ in FACETS}
+    if totals['count']:
+        fields = [field for _, field in FACETS]
+        for group in queryset.values_list(*fields).annotate(count=Count('pk')):
+            count = group[-1]
+            for index, (key, _) in enumerate(FACETS):
+                counts = facet_counts[key]
+                counts[group[index]] = counts.get(group[index], 0) + count
+
+    min_carat, max_carat = totals['min_carat'], totals['max_carat']
+    min_price, max_price = totals['min_price'], totals['max_price']
+
+    stats = {
+        'total_count': totals['count'],
+        'carat_range': {
+            'min': min_carat if min_carat is not None else 0,
+            'max': max_carat if max_carat is not None else 0,
+        },
+        'price_range': {
+            'min': min_price if min_price is not None else 0,
+            'max': max_price if max_price is not None else 0,
+        },
+    }
+    for key, field in FACETS:
+        stats[key] = [
+            {field: value, 'count': count}
+            for value, count in sorted(facet_counts[key].items(), key=lambda item: str(item[0]))
+        ]
+    return stats
+
+
+def get_diamond_statistics(queryset, query_params, catalog_names):
+    """
+    Cached statistics for a filtered diamond queryset.
+
+    Entries are keyed on the normalized filters plus the versions of the
+    catalogs the queryset depends on (`catalog_names`, e.g. 'setting' when
+    filtering by compatibility, 'valuation' when filtering by value score),
+    so any change to those invalidates them.
+    """
+    filters = normalize_filters(query_params)
+    digest = hashlib.md5(repr(filters).encode()).hexdigest()
+    versions = ':'.join(str(get_catalog_version(name)) for name in catalog_names)
+    key = f"rings:diamond-stats:{versions}:{digest}"
+
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_diamond_statistics(queryset)
+        cache.set(key, stats, getattr(settings, 'DIAMOND_STATISTICS_CACHE_TIMEOUT', 300))
+    return stats
@@ -0,0 +1,53 @@
+# rings/testing.py
+
+from django.apps import apps
+from django.db import connections
+from django.db.models.signals import pre_migrate
+from django.test.runner import DiscoverRunner
+
+
+# ============================================
+# TEST RUNNER
+# ============================================
+#
+# The original tables (diamonds, settings, orders, ...) are managed=False:
+# they already exist in the real database, so migrations never create them
+# and a fresh test database would not have them. Migration 0005 indexes
+# those tables, so they have to exist before migrations run; the runner
+# creates them from the models just before the test database is migrated.
+# Once they exist the models are treated as managed, so TransactionTestCase
+# flushes them between tests like every other table.
+
+def unmanaged_models():
+    return [model for model in apps.get_app_config('rings').get_models() if not model._meta.managed]
+
+
+def create_unmanaged_tables(using='default', **kwargs):
+    connection = connections[using]
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in unmanaged_models():
+            if model._meta.db_table not in existing:
+                editor.create_model(model)
+
+
+class RingsTestRunner(DiscoverRunner):
+    """DiscoverRunner that also creates the unmanaged rings tables"""
+
+    def setup_databases(self, **kwargs):
+        pre_migrate.connect(
+            create_unmanaged_tables, sender=apps.get_app_config('rings'), dispatch_uid='rings-unmanaged-tables',
+        )
+        try:
+            old_config = super().setup_databases(**kwargs)
+        finally:
+            pre_migrate.disconnect(sender=apps.get_app_config('rings'), dispatch_uid='rings-unmanaged-tables')
+        self.unmanaged = unmanaged_models()
+        for model in self.unmanaged:
+            model._meta.managed = True
+        return old_config
+
+    def teardown_databases(self, old_config, **kwargs):
+        for model in getattr(self, 'unmanaged', []):
+            model._meta.managed = False
+        super().teardown_databases(old_config, **kwargs)
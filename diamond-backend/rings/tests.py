@@ -1,3 +1,1727 @@
-from django.test import TestCase
+import base64
+import csv
+import importlib
+import importlib.util
+import json
+import os
+import random
+import runpy
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import Count, Sum
+from django.db.migrations.loader import MigrationLoader
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from . import catalog, comparison, profiling, reservations, search, similarity
+from .caching import response_cache_stats
+from .compatibility import ANY_SHAPE, parse_compatible_shapes
+from .fastpath import get_row_encoder
+from .feeds import import_diamond_feed, read_feed
+from .ingest import InteractionBuffer
+from .management.commands.benchmark_api import async_route
+from .models import (
+    CatalogVersion, Diamond, DiamondReservation, DiamondValueScore, DiamondValueScoreFit, Favorite,
+    InteractionRollup, Order, OrderItem, ProductRatingSummary, Review, ReviewHelpfulVote, RingConfiguration,
+    Setting, SettingCompatibility, User, UserInteraction,
+)
+from .reservations import reserve_diamond
+from .serializers import (
+    DiamondListSerializer, OrderCreateSerializer, RingConfigurationListSerializer, ReviewSerializer,
+    SettingListSerializer,
+)
+from .statistics import compute_diamond_statistics
+from .rollups import floor_day, refresh_rollups, summarize_interactions
+from .queryplans import PLAN_CHECKS, explain_check
+from .search import DiamondSearchIndex, get_search_index
+from .similarity import get_similarity_index
+from .valuation import ValueScoreRefresher, refresh_value_scores
+from .votes import aggregate_helpful_votes, record_helpful_vote
+
+
+FEED_ROW = {
+    'sku': 'FEED-1', 'carat': '1.01', 'cut': 'Excellent', 'color': 'F',
+    'clarity': 'VS1', 'shape': 'Round', 'base_price': '4200.00',
+}
+
+
+def make_diamond(index, **fields):
+    values = {
+        'sku': f'TEST-{index}', 'carat': Decimal('1.00'), 'cut': 'Excellent', 'color': 'F',
+        'clarity': 'VS1', 'shape': 'Round', 'base_price': Decimal('4000.00'),
+        'is_available': True, 'created_at': timezone.now(), 'updated_at': timezone.now(),
+    }
+    values.update(fields)
+    return Diamond.objects.create(**values)
+
+
+def make_setting(index, **fields):
+    values = {
+        'sku': f'SET-{index}', 'name': f'Setting {index}', 'style_type': 'Solitaire',
+        'metal_type': 'Platinum', 'base_price': Decimal('1500.00'), 'compatible_shapes': 'Round',
+        'min_carat': Decimal('0.50'), 'max_carat': Decimal('2.00'), 'is_available': True,
+        'popularity_score': 0, 'created_at': timezone.now(), 'updated_at': timezone.now(),
+    }
+    values.update(fields)
+    return Setting.objects.create(**values)
+
+
+def retry_locked(func, *args, **kwargs):
+    """
+    SQLite rejects concurrent writers outright ("database table is locked")
+    where PostgreSQL would make them wait; retry so both behave alike
+    """
+    for _ in range(500):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError:
+            time.sleep(0.002)
+    raise AssertionError('Database stayed locked')
+
+
+def forget_catalog_versions():
+    """Make this process read the versions again, as a fresh worker would"""
+    catalog._loaded_at = None
+
+
+def run_data_migration(migration, function):
+    """Run a migration's RunPython function on the models as they stood after it"""
+    module = importlib.import_module(f'rings.migrations.{migration}')
+    state = MigrationLoader(connection).project_state(('rings', migration))
+    with connection.schema_editor() as schema_editor:
+        getattr(module, function)(state.apps, schema_editor)
+
+
+def reset_process_state():
+    """
+    Versions restart with every test database, so nothing keyed on them
+    (cache entries, indexes) may be carried over from another test
+    """
+    cache.clear()
+    forget_catalog_versions()
+    search._index = None
+    similarity._index = None
+    comparison._cached_comparison.cache_clear()
+    reservations._expiry_checked_at = None
+
+
+class FeedImportTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+
+    def test_import_bump_reaches_other_processes(self):
+        before = catalog.get_catalog_version('diamond')
+
+        stats = import_diamond_feed([FEED_ROW])
+
+        self.assertEqual(stats['imported'], 1)
+        self.assertTrue(Diamond.objects.filter(sku='FEED-1', is_available=True).exists())
+        self.assertEqual(stats['catalog_version'], before + 1)
+        self.assertEqual(CatalogVersion.objects.get(name='diamond').version, before + 1)
+        forget_catalog_versions()
+        self.assertEqual(catalog.get_catalog_version('diamond'), before + 1)
+
+    def test_rows_that_are_not_objects_are_counted_invalid(self):
+        lines = [json.dumps(FEED_ROW), '[1, 2]', '"FEED-2"', '42', json.dumps({**FEED_ROW, 'sku': 'FEED-3'})]
+
+        stats = import_diamond_feed(read_feed(lines, 'ndjson'))
+
+        self.assertEqual((stats['read'], stats['imported'], stats['invalid']), (5, 2, 3))
+        self.assertEqual(
+            [(line, errors['non_field_errors']) for line, _, errors in stats['errors']],
+            [(2, 'Expected an object, got list.'), (3, 'Expected an object, got str.'), (4, 'Expected an object, got int.')],
+        )
+
+    def test_invalid_rows_keep_their_stones_listed(self):
+        make_diamond(0, sku='FEED-1')
+        make_diamond(1, sku='FEED-2')
+        make_diamond(2, sku='GONE-1')
+
+        stats = import_diamond_feed([FEED_ROW, {**FEED_ROW, 'sku': 'FEED-2', 'carat': 'heavy'}])
+
+        self.assertEqual((stats['imported'], stats['invalid'], stats['deactivated']), (1, 1, 1))
+        self.assertEqual(
+            set(Diamond.objects.filter(is_available=True).values_list('sku', flat=True)), {'FEED-1', 'FEED-2'},
+        )
+
+    def test_dry_run_leaves_the_version_alone(self):
+        before = catalog.get_catalog_version('diamond')
+
+        stats = import_diamond_feed([FEED_ROW], dry_run=True)
+
+        self.assertIsNone(stats['catalog_version'])
+        forget_catalog_versions()
+        self.assertEqual(catalog.get_catalog_version('diamond'), before)
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class ReservationVisibilityTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.diamonds = [make_diamond(index) for index in range(3)]
+
+    def test_held_stone_leaves_search_without_an_index_rebuild(self):
+        index = get_search_index()
+        self.assertEqual(self.client.get('/api/diamonds/search/').data['count'], 3)
+
+        reserve_diamond(self.diamonds[0], 'buyer:1')
+
+        response = self.client.get('/api/diamonds/search/')
+        self.assertEqual(response.data['count'], 2)
+        self.assertNotIn(self.diamonds[0].pk, [row['diamond_id'] for row in response.data['results']])
+        self.assertEqual(response.data['facets']['shape'], {'Round': 2})
+        self.assertIs(get_search_index(), index)
+
+    def test_hold_changes_list_etag_but_not_detail_etag(self):
+        url = f'/api/diamonds/{self.diamonds[0].pk}/'
+        list_etag = self.client.get('/api/diamonds/')['ETag']
+        detail_etag = self.client.get(url)['ETag']
+
+        reserve_diamond(self.diamonds[0], 'buyer:1')
+        # on_commit callbacks don't run inside a TestCase transaction
+        catalog.bump_catalog_version('reservation')
+
+        self.assertNotEqual(self.client.get('/api/diamonds/')['ETag'], list_etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 304)
+
+    @override_settings(CATALOG_VERSION_TTL=0)
+    def test_lapsed_hold_is_listed_again_before_the_sweeper_runs(self):
+        reserve_diamond(self.diamonds[0], 'buyer:1')
+        catalog.bump_catalog_version('reservation')
+        held = self.client.get('/api/diamonds/')
+        self.assertEqual(held.data['count'], 2)
+        # Served from the response cache and revalidated by ETag
+        self.assertEqual(self.client.get('/api/diamonds/').data['count'], 2)
+        self.assertEqual(self.client.get('/api/diamonds/', HTTP_IF_NONE_MATCH=held['ETag']).status_code, 304)
+
+        DiamondReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        response = self.client.get('/api/diamonds/', HTTP_IF_NONE_MATCH=held['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertFalse(DiamondReservation.objects.exists())
+
+
+class RangeFilterTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        make_diamond(0, carat=Decimal('0.90'))
+        make_diamond(1, carat=Decimal('1.50'))
+        make_setting(0)
+
+    def test_non_finite_bounds_are_rejected(self):
+        for url, name in [
+            ('/api/diamonds/', 'min_carat'),
+            ('/api/diamonds/', 'max_price'),
+            ('/api/diamonds/', 'min_value_score'),
+            ('/api/diamonds/statistics/', 'max_carat'),
+            ('/api/diamonds/search/', 'min_price'),
+            ('/api/settings/', 'min_price'),
+        ]:
+            for value in ['nan', 'NaN', 'inf', '-Infinity', 'sNaN', 'heavy']:
+                with self.subTest(url=url, name=name, value=value):
+                    response = self.client.get(url, {name: value})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(name, response.data)
+
+    def test_finite_bounds_still_filter(self):
+        self.assertEqual(self.client.get('/api/diamonds/', {'min_carat': '1.2'}).data['count'], 1)
+        self.assertEqual(self.client.get('/api/diamonds/search/', {'max_carat': '1e0'}).data['count'], 1)
+        self.assertEqual(self.client.get('/api/settings/', {'max_price': '1500'}).data['count'], 1)
+
+
+class DiamondSearchTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        make_diamond(0, shape='Round', cut='Ideal', carat=Decimal('0.90'))
+        make_diamond(1, shape='Round', cut='Excellent', carat=Decimal('1.20'))
+        make_diamond(2, shape='Oval', cut='Ideal', carat=Decimal('1.40'))
+        make_diamond(3, shape='Pear', cut='Very Good', carat=Decimal('2.10'))
+
+    def test_each_facet_ignores_its_own_selection(self):
+        response = self.client.get('/api/diamonds/search/', {'shape': 'Round'})
+
+        self.assertEqual(response.data['count'], 2)
+        facets = response.data['facets']
+        # The shape facet still offers the other shapes...
+        self.assertEqual(facets['shape'], {'Oval': 1, 'Pear': 1, 'Round': 2})
+        # ...while every other facet narrows to the round stones
+        self.assertEqual(facets['cut'], {'Excellent': 1, 'Ideal': 1, 'Very Good': 0})
+        carat_counts = {bucket['min']: bucket['count'] for bucket in response.data['histograms']['carat']}
+        self.assertEqual((carat_counts[0.75], carat_counts[1.0], carat_counts[2.0]), (1, 1, 0))
+
+        response = self.client.get('/api/diamonds/search/', {'shape': 'Round', 'cut': 'Ideal'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['facets']['shape'], {'Oval': 1, 'Pear': 0, 'Round': 1})
+        self.assertEqual(response.data['facets']['cut'], {'Excellent': 1, 'Ideal': 1, 'Very Good': 0})
+
+    def test_unknown_carat_or_price_stays_out_of_ranges(self):
+        rows = [
+            (1, 'Round', 'Ideal', 'F', 'VS1', Decimal('1.00'), Decimal('4000.00')),
+            (2, 'Round', 'Ideal', 'F', 'VS1', None, Decimal('3000.00')),
+            (3, 'Oval', 'Ideal', 'F', 'VS1', Decimal('1.50'), None),
+        ]
+        index = DiamondSearchIndex(rows)
+
+        count, page, facets, _ = index.search({})
+        self.assertEqual((count, page), (3, [1, 2, 3]))
+        self.assertEqual(index.search({'min_carat': 0})[1], [1, 3])
+        self.assertEqual(index.search({'max_price': 10**6})[1], [1, 2])
+        # NULLs sort last ascending and first descending, as in PostgreSQL
+        self.assertEqual(index.search({}, ordering='carat')[1], [1, 3, 2])
+        self.assertEqual(index.search({}, ordering='-base_price')[1], [3, 1, 2])
+        self.assertEqual(sum(bucket['count'] for bucket in index.search({})[3]['carat']), 2)
+
+
+class EagerLoadingTests(TestCase):
+    """Nested serializers must not cost a query per row"""
+
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.user = User.objects.create(email='eager@example.com', password_hash='!', first_name='Ada')
+        self.order = Order.objects.create(
+            user=self.user, order_number='ORD-1', customer_email='eager@example.com',
+            subtotal=Decimal('0.00'), total_amount=Decimal('0.00'),
+        )
+        self.rows = 0
+
+    def add_rows(self, count):
+        for index in range(self.rows, self.rows + count):
+            diamond = make_diamond(index)
+            setting = make_setting(index)
+            config = RingConfiguration.objects.create(
+                user=self.user, diamond=diamond, setting=setting, total_price=Decimal('5500.00'),
+                created_at=timezone.now(),
+            )
+            Favorite.objects.create(user=self.user, diamond=diamond, created_at=timezone.now())
+            Favorite.objects.create(user=self.user, config=config, created_at=timezone.now())
+            Review.objects.create(user=self.user, diamond=diamond, rating=5, is_approved=True, created_at=timezone.now())
+            OrderItem.objects.create(order=self.order, config=config, item_total=Decimal('5500.00'))
+        self.rows += count
+
+    def query_count(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        requests = [
+            ('/api/favorites/my_favorites/', {'user_id': self.user.pk}),
+            ('/api/configurations/my_configurations/', {'user_id': self.user.pk}),
+            ('/api/reviews/', {}),
+            (f'/api/orders/{self.order.pk}/', {}),
+        ]
+        self.add_rows(2)
+        few = [self.query_count(url, params) for url, params in requests]
+        self.add_rows(6)
+        for (url, params), expected in zip(requests, few):
+            with self.subTest(url):
+                self.assertEqual(self.query_count(url, params), expected)
+
+
+def make_review(**fields):
+    values = {'rating': 5, 'helpful_count': 0, 'is_approved': True, 'created_at': timezone.now()}
+    values.update(fields)
+    return Review.objects.create(**values)
+
+
+class HelpfulVoteTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.review = make_review()
+        self.url = f'/api/reviews/{self.review.pk}/mark_helpful/'
+
+    def vote(self, client=None, payload=None, **extra):
+        return (client or self.client).post(self.url, payload or {}, format='json', **extra).data
+
+    def test_anonymous_voters_get_a_session_of_their_own(self):
+        first = self.vote(payload={'user_id': 1})
+        again = self.vote(payload={'user_id': 2, 'session_id': 'abc'}, REMOTE_ADDR='10.0.0.2')
+        # Another shopper behind the same NAT
+        neighbour = self.vote(APIClient())
+
+        self.assertEqual(first, {'helpful_count': 1, 'counted': True})
+        self.assertEqual(again, {'helpful_count': 1, 'counted': False})
+        self.assertEqual(neighbour, {'helpful_count': 2, 'counted': True})
+        session_key = self.client.cookies['sessionid'].value
+        voters = set(ReviewHelpfulVote.objects.values_list('voter_key', flat=True))
+        self.assertIn(f'session:{session_key}', voters)
+        self.assertEqual(len(voters), 2)
+        self.assertTrue(all(voter.startswith('session:') for voter in voters))
+
+    def test_users_and_sessions_count_once_each(self):
+        user = AuthUser.objects.create_user('voter', password='!')
+        signed_in = APIClient()
+        signed_in.force_authenticate(user)
+        with_session = APIClient()
+        session = with_session.session
+        session['seen'] = True
+        session.save()
+
+        results = [
+            self.vote(signed_in), self.vote(signed_in, REMOTE_ADDR='10.0.0.9'),
+            self.vote(with_session), self.vote(with_session, REMOTE_ADDR='10.0.0.9'),
+        ]
+
+        self.assertEqual([result['counted'] for result in results], [True, False, True, False])
+        self.assertEqual(
+            set(ReviewHelpfulVote.objects.values_list('voter_key', flat=True)),
+            {f'user:{user.pk}', f'session:{session.session_key}'},
+        )
+
+    @override_settings(HELPFUL_VOTE_RATE='2/minute')
+    def test_client_address_only_limits_the_rate(self):
+        forged = {'HTTP_X_FORWARDED_FOR': '203.0.113.7', 'REMOTE_ADDR': '10.0.0.1'}
+        statuses = [
+            APIClient().post(self.url, REMOTE_ADDR='10.0.0.1').status_code,
+            APIClient().post(self.url, REMOTE_ADDR='10.0.0.1').status_code,
+            # X-Forwarded-For is not trusted without proxies in front
+            APIClient().post(self.url, **forged).status_code,
+            APIClient().post(self.url, REMOTE_ADDR='10.0.0.2').status_code,
+        ]
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            statuses.append(APIClient().post(self.url, **forged).status_code)
+
+        self.assertEqual(statuses, [200, 200, 429, 200, 200])
+        self.assertEqual(ReviewHelpfulVote.objects.count(), 4)
+
+    def test_aggregation_folds_pending_votes_once(self):
+        for voter in range(5):
+            record_helpful_vote(self.review, f'user:{voter}')
+
+        self.assertEqual(aggregate_helpful_votes(batch_size=2), 5)
+        self.assertEqual(aggregate_helpful_votes(), 0)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.helpful_count, 5)
+
+        # A vote after the run is counted on top of the folded total
+        record_helpful_vote(self.review, 'user:99')
+        self.assertEqual(self.vote(), {'helpful_count': 7, 'counted': True})
+        self.assertEqual(self.vote(), {'helpful_count': 7, 'counted': False})
+
+
+class HelpfulVoteConcurrencyTests(TransactionTestCase):
+    voters = 60
+    threads = 16
+
+    def test_concurrent_votes_are_all_counted(self):
+        review = make_review()
+        start = threading.Barrier(self.threads)
+
+        def vote(number):
+            try:
+                if number < self.threads:
+                    start.wait()
+                # Every voter clicks twice
+                return [retry_locked(record_helpful_vote, review, f'user:{number}') for _ in range(2)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.threads) as pool:
+            results = list(pool.map(vote, range(self.voters)))
+
+        self.assertEqual(results, [[True, False]] * self.voters)
+        self.assertEqual(ReviewHelpfulVote.objects.filter(review=review).count(), self.voters)
+        aggregate_helpful_votes()
+        review.refresh_from_db()
+        self.assertEqual(review.helpful_count, self.voters)
+
+
+class FastListTests(TestCase):
+    """The values() fast path must render exactly what the serializers do"""
+
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        rng = random.Random(3)
+        # Unique sort keys, so both sides agree on the order
+        popularity = rng.sample(range(100), 12)
+        carats = rng.sample(range(30, 300), 12)
+        for index in range(12):
+            make_diamond(
+                index, carat=Decimal(carats[index]) / 100, base_price=Decimal(f'{rng.uniform(500, 9000):.2f}'),
+                color=rng.choice('DEFG'), is_available=index != 5,
+            )
+            make_setting(index, base_price=Decimal(f'{rng.uniform(300, 3000):.2f}'), popularity_score=popularity[index])
+        diamonds = list(Diamond.objects.order_by('pk'))
+        settings = list(Setting.objects.order_by('pk'))
+        for index in range(6):
+            RingConfiguration.objects.create(
+                diamond=diamonds[index], setting=settings[index] if index % 3 else None,
+                total_price=Decimal('4999.50'), ring_size='6.5', is_saved=index % 2 == 0,
+                created_at=timezone.now() - timedelta(minutes=index),
+            )
+
+    def test_list_pages_match_the_serializers(self):
+        cases = [
+            ('/api/diamonds/', {'ordering': 'carat'}, DiamondListSerializer,
+             Diamond.objects.filter(is_available=True).order_by('carat')),
+            ('/api/settings/', {}, SettingListSerializer, Setting.objects.order_by('-popularity_score')),
+            ('/api/configurations/', {}, RingConfigurationListSerializer,
+             RingConfiguration.objects.order_by('-created_at')),
+        ]
+        for url, params, serializer_class, queryset in cases:
+            with self.subTest(url):
+                self.assertIsNotNone(get_row_encoder(serializer_class))
+                response = self.client.get(url, params)
+                expected = serializer_class(queryset, many=True).data
+                self.assertEqual(json.loads(json.dumps(response.data['results'])), json.loads(json.dumps(expected)))
+
+    def test_method_fields_keep_the_serializer_path(self):
+        self.assertIsNone(get_row_encoder(ReviewSerializer))
+
+
+class AsyncReadPathTests(TestCase):
+    """The async routes must answer exactly like the sync ones"""
+
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        user = User.objects.create(email='async@example.com', password_hash='!', last_name='Lovelace')
+        self.diamond = make_diamond(0)
+        self.setting = make_setting(0)
+        for index in range(25):
+            make_review(
+                user=user if index % 2 else None, diamond=self.diamond, rating=index % 5 + 1,
+                setting=self.setting if index % 3 == 0 else None,
+                created_at=timezone.now() - timedelta(minutes=index),
+            )
+
+    def test_product_reviews_match_the_sync_view(self):
+        for params in [
+            {'diamond_id': self.diamond.pk},
+            {'diamond_id': self.diamond.pk, 'page': 2},
+            {'setting_id': self.setting.pk},
+            {'diamond_id': self.diamond.pk, 'setting_id': self.setting.pk},
+            {'diamond_id': 'x'},
+        ]:
+            with self.subTest(params):
+                sync = self.client.get('/api/reviews/product_reviews/', params)
+                response = self.client.get('/api/async/reviews/product_reviews/', params)
+                self.assertEqual(response.status_code, sync.status_code)
+                body = json.loads(response.content)
+                expected = json.loads(json.dumps(sync.data))
+                for link in ('next', 'previous'):
+                    if expected.get(link):
+                        expected[link] = async_route(expected[link].removeprefix('http://testserver'))
+                        body[link] = body[link].removeprefix('http://testserver')
+                self.assertEqual(body, expected)
+
+    def test_product_reviews_are_read_only(self):
+        params = {'diamond_id': self.diamond.pk}
+        for method in ('post', 'put', 'delete'):
+            with self.subTest(method):
+                sync = getattr(self.client, method)(f'/api/reviews/product_reviews/?diamond_id={self.diamond.pk}')
+                response = getattr(self.client, method)(f'/api/async/reviews/product_reviews/?diamond_id={self.diamond.pk}')
+                self.assertEqual(sync.status_code, 405)
+                self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.client.get('/api/async/reviews/product_reviews/', params).status_code, 200)
+
+    def test_migration_summarizes_existing_reviews(self):
+        ProductRatingSummary.objects.all().delete()
+        response = self.client.get('/api/reviews/product_reviews/', {'diamond_id': self.diamond.pk})
+        self.assertEqual(response.data['total_reviews'], 0)
+
+        run_data_migration('0006_product_rating_summaries', 'build_summaries')
+
+        response = self.client.get('/api/reviews/product_reviews/', {'diamond_id': self.diamond.pk})
+        self.assertEqual(response.data['total_reviews'], 25)
+        self.assertEqual(response.data['average_rating'], 3.0)
+        self.assertEqual(response.data['histogram'], {str(star): 5 for star in range(1, 6)})
+
+    def test_catalog_routes_match_the_sync_views(self):
+        for path in ['/api/diamonds/?ordering=carat', f'/api/diamonds/{self.diamond.pk}/', '/api/settings/']:
+            with self.subTest(path):
+                response = self.client.get(async_route(path))
+                self.assertEqual(json.loads(response.content), json.loads(json.dumps(self.client.get(path).data)))
+
+    def test_benchmark_maps_only_routes_with_async_variants(self):
+        self.assertEqual(async_route('/api/diamonds/?shape=Oval'), '/api/async/diamonds/?shape=Oval')
+        self.assertEqual(async_route('/api/settings/12/'), '/api/async/settings/12/')
+        self.assertEqual(
+            async_route('/api/reviews/product_reviews/?setting_id=3'), '/api/async/reviews/product_reviews/?setting_id=3',
+        )
+        self.assertEqual(async_route('/api/diamonds/statistics/'), '/api/diamonds/statistics/')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.diamond = make_diamond(0)
+
+    def test_matching_etag_answers_304_without_a_body_or_catalog_queries(self):
+        url = f'/api/diamonds/{self.diamond.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=f'"other", W/{etag}')
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse([query for query in queries if '"diamonds"' in query['sql']])
+
+    def test_stale_etag_gets_the_page(self):
+        response = self.client.get('/api/diamonds/', HTTP_IF_NONE_MATCH='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['sku'], 'TEST-0')
+
+    @override_settings(CATALOG_VERSION_TTL=0)
+    def test_catalog_bump_changes_the_etag(self):
+        url = f'/api/diamonds/{self.diamond.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        catalog.bump_catalog_version('diamond')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_renderer_and_query_string_are_part_of_the_etag(self):
+        url = f'/api/diamonds/{self.diamond.pk}/'
+        etags = {
+            'json': self.client.get(url, HTTP_ACCEPT='application/json')['ETag'],
+            'browsable': self.client.get(url, HTTP_ACCEPT='text/html')['ETag'],
+            'list': self.client.get('/api/diamonds/')['ETag'],
+            'filtered list': self.client.get('/api/diamonds/', {'shape': 'Round'})['ETag'],
+        }
+
+        self.assertEqual(len(set(etags.values())), len(etags), etags)
+        response = self.client.get(url, HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=etags['json'])
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.setting = make_setting(0)
+
+    def counted(self, params=None):
+        before = response_cache_stats.snapshot()
+        response = self.client.get('/api/settings/', params or {})
+        after = response_cache_stats.snapshot()
+        return response, {name: after[name] - before[name] for name in after}
+
+    def test_second_request_is_served_from_the_cache(self):
+        response, counts = self.counted()
+        self.assertEqual(counts['misses'], 1)
+        self.assertEqual(response.data['results'][0]['base_price'], '1500.00')
+
+        # A write that skips the signals leaves the cached page in place
+        Setting.objects.filter(pk=self.setting.pk).update(base_price=Decimal('1800.00'))
+
+        response, counts = self.counted()
+        self.assertEqual(counts['hits'], 1)
+        self.assertEqual(response.data['results'][0]['base_price'], '1500.00')
+
+    def test_catalog_change_invalidates_cached_pages(self):
+        self.counted()
+
+        self.setting.base_price = Decimal('1800.00')
+        self.setting.save()
+
+        response, counts = self.counted()
+        self.assertEqual(counts['misses'], 1)
+        self.assertEqual(response.data['results'][0]['base_price'], '1800.00')
+
+    def test_cached_page_links_follow_the_request_host(self):
+        for index in range(1, 25):
+            make_setting(index)
+        first, counts = self.counted()
+        self.assertEqual(counts['misses'], 1)
+        self.assertEqual(first.data['next'], 'http://testserver/api/settings/?page=2')
+
+        before = response_cache_stats.snapshot()['hits']
+        response = self.client.get('/api/settings/', HTTP_HOST='shop.example.com', secure=True)
+        self.assertEqual(response_cache_stats.snapshot()['hits'], before + 1)
+        self.assertEqual(response.data['next'], 'https://shop.example.com/api/settings/?page=2')
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get('/api/settings/', {'page': 2}, HTTP_HOST='shop.example.com')
+        self.assertEqual(response.data['previous'], 'http://shop.example.com/api/settings/')
+        response = self.client.get('/api/settings/', {'page': 2})
+        self.assertEqual(response_cache_stats.snapshot()['hits'], before + 1 + 1)
+        self.assertEqual(response.data['previous'], 'http://testserver/api/settings/')
+
+    def test_uncached_params_bypass_the_cache(self):
+        response, counts = self.counted({'search': 'SET'})
+        self.assertEqual(counts, {'hits': 0, 'misses': 0, 'bypasses': 1, 'waits': 0})
+        self.assertEqual(response.data['count'], 1)
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class DiamondStatisticsTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        make_diamond(0, shape='Round')
+        make_diamond(1, shape='Oval')
+        make_diamond(2, shape='Round', carat=Decimal('3.00'))
+
+    def total(self, **params):
+        return self.client.get('/api/diamonds/statistics/', params).data['total_count']
+
+    def test_compatible_with_setting_is_part_of_the_cache_key(self):
+        setting = make_setting(0)
+        self.assertEqual(self.total(), 3)
+        self.assertEqual(self.total(compatible_with_setting=setting.pk), 1)
+
+    def test_setting_change_invalidates_compatible_statistics(self):
+        setting = make_setting(0)
+        self.assertEqual(self.total(compatible_with_setting=setting.pk), 1)
+
+        setting.compatible_shapes = 'Round, Oval'
+        setting.save()
+
+        self.assertEqual(self.total(compatible_with_setting=setting.pk), 2)
+
+    def test_min_value_score_is_part_of_the_cache_key(self):
+        for score, diamond in zip([12.5, -4.0, 3.0], Diamond.objects.order_by('pk')):
+            DiamondValueScore.objects.create(
+                diamond=diamond, predicted_price=diamond.base_price, value_score=score, scored_at=timezone.now(),
+            )
+        self.assertEqual(self.total(), 3)
+        self.assertEqual(self.total(min_value_score=0), 2)
+
+        # A refit moves the scores and bumps the valuation version
+        DiamondValueScore.objects.filter(value_score__lt=0).update(value_score=8.0)
+        catalog.bump_catalog_version('valuation')
+
+        self.assertEqual(self.total(min_value_score=0), 3)
+
+
+def per_field_statistics(queryset):
+    """The figures the statistics endpoint used to compute with a query each"""
+    stats = {
+        'total_count': queryset.count(),
+        'carat_range': {
+            'min': queryset.order_by('carat').first().carat if queryset.exists() else 0,
+            'max': queryset.order_by('-carat').first().carat if queryset.exists() else 0,
+        },
+        'price_range': {
+            'min': queryset.order_by('base_price').first().base_price if queryset.exists() else 0,
+            'max': queryset.order_by('-base_price').first().base_price if queryset.exists() else 0,
+        },
+    }
+    for key, field in [('shapes', 'shape'), ('cuts', 'cut'), ('colors', 'color'), ('clarities', 'clarity')]:
+        stats[key] = sorted(
+            queryset.order_by().values(field).annotate(count=Count('pk')), key=lambda row: str(row[field]),
+        )
+    return stats
+
+
+class DiamondStatisticsRollupTests(TestCase):
+    """The facet GROUP BY rolled up in Python must match per-field aggregates"""
+
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        rng = random.Random(3)
+        for index in range(40):
+            make_diamond(
+                index, shape=rng.choice(['Round', 'Oval', 'Pear']), cut=rng.choice(['Ideal', 'Excellent']),
+                color=rng.choice(['D', 'E', 'F', 'G']), clarity=rng.choice(['VS1', 'VS2', 'SI1']),
+                carat=Decimal(f'{rng.uniform(0.3, 3):.2f}'), base_price=Decimal(f'{rng.uniform(500, 30000):.2f}'),
+                is_available=index % 7 != 0,
+            )
+        self.available = Diamond.objects.filter(is_available=True)
+
+    def test_matches_per_field_aggregates(self):
+        for label, queryset in [
+            ('all', self.available),
+            ('filtered', self.available.filter(shape='Round', carat__gte=Decimal('1.00'))),
+            ('empty', self.available.filter(shape='Heart')),
+        ]:
+            with self.subTest(label):
+                self.assertEqual(compute_diamond_statistics(queryset), per_field_statistics(queryset))
+
+    def test_endpoint_matches_per_field_aggregates_and_shares_cache_entries(self):
+        url = '/api/diamonds/statistics/'
+        expected = per_field_statistics(self.available.filter(shape='Oval', base_price__lte=Decimal('20000')))
+        first = self.client.get(url, {'shape': 'Oval', 'max_price': '20000'})
+        self.assertEqual(first.data, expected)
+
+        # Same filters in another order are served from the same entry
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url + '?max_price=20000&shape=Oval')
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([query for query in queries if 'GROUP BY' in query['sql']])
+
+        # A different filter set gets its own figures
+        other = self.client.get(url, {'shape': 'Pear'}).data
+        self.assertEqual(other['total_count'], self.available.filter(shape='Pear').count())
+
+        # An inventory change invalidates the entry
+        Diamond.objects.filter(shape='Oval').update(is_available=False)
+        catalog.bump_catalog_version('diamond')
+        forget_catalog_versions()
+        self.assertEqual(self.client.get(url, {'shape': 'Oval', 'max_price': '20000'}).data['total_count'], 0)
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class ValueScoreFitTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        rng = random.Random(7)
+        for index in range(60):
+            carat = Decimal(f'{rng.uniform(0.3, 3):.2f}')
+            make_diamond(
+                index, carat=carat, color=rng.choice('DEFGH'), clarity=rng.choice(['VS1', 'VS2', 'SI1']),
+                base_price=Decimal(f'{3000 * float(carat) ** 1.8 * rng.uniform(0.8, 1.2):.2f}'),
+            )
+
+    def test_fingerprint_is_stored_with_the_fit(self):
+        self.assertEqual(refresh_value_scores(force=False), 60)
+        self.assertEqual(DiamondValueScore.objects.count(), 60)
+        self.assertEqual(DiamondValueScoreFit.objects.get().diamonds_scored, 60)
+
+        # Another worker noticing the same change finds nothing to do
+        self.assertIsNone(refresh_value_scores(force=False))
+        self.assertIsNone(ValueScoreRefresher().check())
+
+        make_diamond(60, base_price=Decimal('2500.00'))
+        self.assertEqual(ValueScoreRefresher().check(), 61)
+
+
+def encode_cursor(value, pk):
+    return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+
+class KeysetCursorTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        # Repeated carats make the pk tie-breaker matter
+        self.diamonds = [make_diamond(index, carat=Decimal('1.00') + index % 4) for index in range(23)]
+
+    def walk(self, url, params):
+        seen = []
+        response = self.client.get(url, {**params, 'cursor': ''})
+        while True:
+            seen.extend(response.data['results'])
+            if not response.data['next']:
+                return seen
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_walks_every_row_once(self):
+        # Unscored stones have a NULL value_score, which takes the OR seek
+        for diamond in self.diamonds[::2]:
+            DiamondValueScore.objects.create(
+                diamond=diamond, predicted_price=diamond.base_price, value_score=diamond.pk % 3, scored_at=timezone.now(),
+            )
+        for ordering in ['-carat', 'carat', '-value_score', 'value_score']:
+            with self.subTest(ordering):
+                seen = [row['diamond_id'] for row in self.walk('/api/diamonds/', {'ordering': ordering, 'page_size': 4})]
+                self.assertEqual(sorted(seen), sorted(diamond.pk for diamond in self.diamonds))
+
+    def test_default_ordering_walks_in_index_order(self):
+        # Shared timestamps make pages split inside a run of equal values
+        moments = [timezone.now() - timedelta(hours=index % 3) for index in range(23)]
+        for diamond, moment in zip(self.diamonds, moments):
+            Diamond.objects.filter(pk=diamond.pk).update(created_at=moment)
+        for index, moment in enumerate(moments):
+            UserInteraction.objects.create(session_id=f's{index}', interaction_type='view', created_at=moment)
+
+        rows = self.walk('/api/diamonds/', {'page_size': 5})
+        self.assertEqual(
+            [row['diamond_id'] for row in rows],
+            list(Diamond.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)),
+        )
+        rows = self.walk('/api/interactions/', {'page_size': 5})
+        self.assertEqual(
+            [row['interaction_id'] for row in rows],
+            list(UserInteraction.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)),
+        )
+
+    def test_cursor_value_of_the_wrong_type_is_not_found(self):
+        cases = [
+            ('carat', encode_cursor({'dec': 'abc'}, 1)),
+            ('carat', encode_cursor('abc', 1)),
+            ('created_at', encode_cursor({'dt': 'yesterday'}, 1)),
+            ('carat', encode_cursor({'dec': '1.00'}, 'abc')),
+            ('value_score', encode_cursor('abc', 1)),
+            ('carat', encode_cursor({}, 1)),
+            ('carat', 'not base64'),
+        ]
+        for ordering, cursor in cases:
+            with self.subTest(ordering=ordering, cursor=cursor):
+                response = self.client.get('/api/diamonds/', {'ordering': ordering, 'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class CompatibilityParserTests(SimpleTestCase):
+    def test_formats_people_enter(self):
+        cases = [
+            ('["Round", "oval"]', ['Round', 'Oval']),
+            ('{Round,"Cushion",Pear}', ['Round', 'Cushion', 'Pear']),
+            ('Round, Oval; princess | Round', ['Round', 'Oval', 'Princess']),
+            ('Emerald/Asscher', ['Emerald', 'Asscher']),
+            ('[not json', ['[Not Json']),
+        ]
+        for text, shapes in cases:
+            with self.subTest(text):
+                self.assertEqual(parse_compatible_shapes(text), shapes)
+
+    def test_blank_and_catch_all_mean_any_shape(self):
+        for text in [None, '', '   ', 'All', 'Round, any shape', '[]', ', ;']:
+            with self.subTest(text):
+                self.assertEqual(parse_compatible_shapes(text), [ANY_SHAPE])
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class CompatibilityFilterTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.round_small = make_diamond(0, shape='Round', carat=Decimal('0.40'))
+        self.round = make_diamond(1, shape='Round', carat=Decimal('1.20'))
+        self.oval = make_diamond(2, shape='Oval', carat=Decimal('1.50'))
+        self.pear_large = make_diamond(3, shape='Pear', carat=Decimal('3.10'))
+        self.solitaire = make_setting(0, compatible_shapes='Round, Oval')
+        self.halo = make_setting(1, compatible_shapes='["Oval"]', min_carat=None, max_carat=None)
+        self.open_setting = make_setting(2, compatible_shapes='Any', max_carat=Decimal('4.00'))
+
+    def ids(self, url, params, key):
+        return sorted(row[key] for row in self.client.get(url, params).data['results'])
+
+    def test_settings_for_a_diamond(self):
+        cases = [
+            (self.round, [self.solitaire, self.open_setting]),
+            (self.oval, [self.solitaire, self.halo, self.open_setting]),
+            # Below every carat window but the unbounded halo's, which wants ovals
+            (self.round_small, []),
+            (self.pear_large, [self.open_setting]),
+        ]
+        for diamond, settings in cases:
+            with self.subTest(diamond.sku):
+                self.assertEqual(
+                    self.ids('/api/settings/', {'compatible_with_diamond': diamond.pk}, 'setting_id'),
+                    sorted(setting.pk for setting in settings),
+                )
+
+    def test_diamonds_for_a_setting(self):
+        cases = [
+            (self.solitaire, [self.round, self.oval]),
+            (self.halo, [self.oval]),
+            (self.open_setting, [self.round, self.oval, self.pear_large]),
+        ]
+        for setting, diamonds in cases:
+            with self.subTest(setting.sku):
+                self.assertEqual(
+                    self.ids('/api/diamonds/', {'compatible_with_setting': setting.pk}, 'diamond_id'),
+                    sorted(diamond.pk for diamond in diamonds),
+                )
+
+    def test_setting_edit_reindexes_it(self):
+        self.halo.compatible_shapes = 'Pear'
+        self.halo.save()
+
+        self.assertEqual(
+            self.ids('/api/diamonds/', {'compatible_with_setting': self.halo.pk}, 'diamond_id'), [self.pear_large.pk],
+        )
+
+    def test_migration_indexes_existing_settings(self):
+        SettingCompatibility.objects.all().delete()
+        self.assertEqual(self.ids('/api/settings/', {'compatible_with_diamond': self.round.pk}, 'setting_id'), [])
+
+        run_data_migration('0004_setting_compatibility', 'build_compatibility')
+        # The empty page above is still in the response cache
+        reset_process_state()
+
+        self.assertEqual(
+            self.ids('/api/settings/', {'compatible_with_diamond': self.round.pk}, 'setting_id'),
+            sorted([self.solitaire.pk, self.open_setting.pk]),
+        )
+
+
+class ConfigurationPricingTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.available = make_diamond(0)
+        self.sold = make_diamond(1, is_available=False)
+        self.held = make_diamond(2)
+        self.setting = make_setting(0)
+        reserve_diamond(self.held, 'config:999')
+
+    def test_quotes_refuse_sold_and_held_diamonds(self):
+        items = [
+            {'diamond_id': diamond.pk, 'setting_id': self.setting.pk}
+            for diamond in (self.available, self.sold, self.held)
+        ]
+        response = self.client.post('/api/configurations/quote/', items, format='json')
+
+        quotes = response.data['quotes']
+        self.assertEqual(quotes[0]['total_price'], '5500.00')
+        self.assertNotIn('error', quotes[0])
+        self.assertEqual(quotes[1]['error'], 'This diamond is no longer available.')
+        self.assertNotIn('total_price', quotes[1])
+        self.assertEqual(quotes[2]['error'], 'This diamond is reserved by another shopper.')
+
+    def test_holder_can_quote_its_own_hold(self):
+        items = [
+            {'diamond_id': self.held.pk, 'setting_id': self.setting.pk, 'config_id': 999},
+            {'diamond_id': self.held.pk, 'setting_id': self.setting.pk, 'config_id': 1000},
+        ]
+        response = self.client.post('/api/configurations/quote/', items, format='json')
+
+        quotes = response.data['quotes']
+        self.assertNotIn('error', quotes[0])
+        self.assertEqual(quotes[0]['config_id'], 999)
+        self.assertEqual(quotes[1]['error'], 'This diamond is reserved by another shopper.')
+
+    def test_configurations_refuse_sold_and_held_diamonds(self):
+        for diamond, message in [
+            (self.sold, 'This diamond is no longer available.'),
+            (self.held, 'This diamond is reserved by another shopper.'),
+        ]:
+            with self.subTest(diamond=diamond.sku):
+                response = self.client.post(
+                    '/api/configurations/', {'diamond': diamond.pk, 'setting': self.setting.pk}, format='json',
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['diamond'], [message])
+
+        response = self.client.post(
+            '/api/configurations/', {'diamond': self.available.pk, 'setting': self.setting.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+@override_settings(ORDER_TAX_RATE=Decimal('0.08'), ORDER_SHIPPING_COST=Decimal('25.00'))
+class OrderCreationTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.client = APIClient()
+        self.diamonds = [make_diamond(index) for index in range(3)]
+        self.setting = make_setting(0)
+        self.config = RingConfiguration.objects.create(
+            diamond=self.diamonds[2], setting=self.setting, total_price=Decimal('1.00'),
+            created_at=timezone.now(),
+        )
+
+    def post_order(self, items, **fields):
+        order = {
+            'order_number': 'ORD-NEW', 'customer_email': 'buyer@example.com',
+            'subtotal': '1.00', 'total_amount': '1.00', 'items': items,
+        }
+        order.update(fields)
+        return self.client.post('/api/orders/', order, format='json')
+
+    def loose_item(self, diamond, **fields):
+        item = {'diamond_sku': diamond.sku, 'diamond_price': '1.00', 'item_total': '1.00'}
+        item.update(fields)
+        return item
+
+    def test_prices_and_totals_come_from_the_catalog(self):
+        response = self.post_order(
+            [
+                self.loose_item(self.diamonds[0], setting_sku=self.setting.sku, setting_price='1.00'),
+                {'config': self.config.pk, 'diamond_price': '1.00', 'setting_price': '1.00', 'item_total': '2.00'},
+            ],
+            tax_amount='0.00', shipping_cost='-100.00',
+        )
+
+        self.assertEqual(response.status_code, 201, response.data)
+        order = Order.objects.get(order_number='ORD-NEW')
+        self.assertEqual(order.subtotal, Decimal('11000.00'))
+        self.assertEqual(order.tax_amount, Decimal('880.00'))
+        self.assertEqual(order.shipping_cost, Decimal('25.00'))
+        self.assertEqual(order.total_amount, Decimal('11905.00'))
+        items = list(order.items.order_by('pk').values_list('diamond_sku', 'diamond_price', 'setting_price', 'item_total'))
+        self.assertEqual(items, [
+            ('TEST-0', Decimal('4000.00'), Decimal('1500.00'), Decimal('5500.00')),
+            ('TEST-2', Decimal('4000.00'), Decimal('1500.00'), Decimal('5500.00')),
+        ])
+        self.assertEqual(
+            set(Diamond.objects.filter(is_available=False).values_list('sku', flat=True)), {'TEST-0', 'TEST-2'},
+        )
+
+    def test_configuration_rows_are_locked(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_order([{'config': self.config.pk, 'item_total': '1.00'}])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        if connection.features.has_select_for_update:
+            locked = [query['sql'] for query in queries if 'FOR UPDATE' in query['sql']]
+            for table in ('ring_configurations', 'diamonds', 'settings'):
+                with self.subTest(table):
+                    self.assertTrue(any(f'FROM "{table}"' in sql for sql in locked))
+
+    def test_item_prices_are_not_asked_for(self):
+        response = self.post_order([{'diamond_sku': self.diamonds[0].sku}, {'config': self.config.pk}])
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Order.objects.get(order_number='ORD-NEW').subtotal, Decimal('9500.00'))
+
+    def test_configuration_deleted_after_validation_is_refused(self):
+        serializer = OrderCreateSerializer(data={
+            'order_number': 'ORD-NEW', 'customer_email': 'buyer@example.com',
+            'items': [{'diamond_sku': self.diamonds[0].sku}, {'config': self.config.pk}],
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.config.delete()
+
+        with self.assertRaises(ValidationError) as raised:
+            serializer.save()
+
+        self.assertEqual(raised.exception.detail['items'][1]['config'], ['This configuration no longer exists.'])
+        self.assertFalse(Order.objects.exists())
+        self.assertTrue(Diamond.objects.get(pk=self.diamonds[0].pk).is_available)
+
+    def test_duplicate_diamond_is_refused(self):
+        response = self.post_order([self.loose_item(self.diamonds[0]), self.loose_item(self.diamonds[0])])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['items'][1]['diamond_sku'], ['This diamond appears more than once in the order.'],
+        )
+        self.assertFalse(Order.objects.exists())
+        self.assertTrue(Diamond.objects.get(pk=self.diamonds[0].pk).is_available)
+
+    def test_bad_item_rolls_back_the_whole_order(self):
+        Diamond.objects.filter(pk=self.diamonds[1].pk).update(is_available=False)
+        reserve_diamond(self.diamonds[2], 'config:999')
+
+        for label, items in [
+            ('sold', [self.loose_item(self.diamonds[0]), self.loose_item(self.diamonds[1])]),
+            ('held', [self.loose_item(self.diamonds[0]), {'config': self.config.pk, 'item_total': '1.00'}]),
+            ('unknown', [self.loose_item(self.diamonds[0]), {'diamond_sku': 'NOPE', 'item_total': '1.00'}]),
+        ]:
+            with self.subTest(label):
+                response = self.post_order(items)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['items'][0], {})
+                self.assertTrue(response.data['items'][1])
+                self.assertFalse(Order.objects.exists())
+                self.assertFalse(OrderItem.objects.exists())
+                self.assertTrue(Diamond.objects.get(pk=self.diamonds[0].pk).is_available)
+
+
+class QueryPlanTests(TestCase):
+    """The list endpoints' queries must stay on the migration 0005 indexes"""
+
+    def setUp(self):
+        # The checks filter on user 1
+        User.objects.create(user_id=1, email='plans@example.com', password_hash='!')
+        for index in range(50):
+            make_diamond(index, shape=['Round', 'Oval'][index % 2], carat=Decimal('0.50') + Decimal(index % 20) / 10)
+        for index in range(10):
+            make_setting(index, style_type=['Halo', 'Solitaire'][index % 2])
+
+    def test_no_sequential_scans_or_full_sorts(self):
+        for label, viewset_class, action, params, filters in PLAN_CHECKS:
+            with self.subTest(label):
+                plan, problems = explain_check(viewset_class, action, params, filters)
+                self.assertEqual(problems, [], f'{label}:\n{plan}')
+
+
+class InteractionRollupTests(TestCase):
+    """analytics_summary must give the same counts from rollups as from raw rows"""
+
+    now = datetime(2026, 3, 12, 10, 30, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.events = []
+        for _ in range(600):
+            self.events.append(UserInteraction(
+                session_id=f's{rng.randrange(150)}',
+                interaction_type=rng.choice(['view', 'search', 'favorite']),
+                device_type=rng.choice(['mobile', 'desktop', None]),
+                created_at=self.now - timedelta(seconds=rng.randrange(3 * 24 * 3600)),
+            ))
+        UserInteraction.objects.bulk_create(self.events)
+
+    def expected(self, start=None, end=None):
+        events = [
+            event for event in self.events
+            if (start is None or event.created_at >= start) and (end is None or event.created_at <= end)
+        ]
+        return (
+            len(events),
+            Counter(event.interaction_type for event in events),
+            Counter(event.device_type for event in events),
+            len({event.session_id for event in events}),
+        )
+
+    def assertMatchesRaw(self, start=None, end=None):
+        summary = summarize_interactions(start, end)
+        total, by_type, by_device, sessions = self.expected(start, end)
+        self.assertEqual(summary['total_interactions'], total)
+        self.assertEqual({row['interaction_type']: row['count'] for row in summary['by_type']}, by_type)
+        self.assertEqual({row['device_type']: row['count'] for row in summary['by_device']}, by_device)
+        # Sessions across rollups are merged sketches, so only approximate
+        self.assertAlmostEqual(summary['unique_sessions'], sessions, delta=sessions * 0.05)
+
+    def test_rollup_counts_equal_raw_counts(self):
+        self.assertGreater(refresh_rollups(now=self.now), 0)
+        self.assertTrue(InteractionRollup.objects.filter(granularity='day').exists())
+
+        # Rows that arrive after the rollup ran are read raw
+        late = UserInteraction(
+            session_id='late', interaction_type='view', device_type='mobile', created_at=self.now - timedelta(minutes=1),
+        )
+        late.save()
+        self.events.append(late)
+
+        ranges = [
+            (None, None),
+            (self.now - timedelta(days=2, minutes=17), None),
+            (None, self.now - timedelta(hours=30, minutes=5)),
+            (self.now - timedelta(days=2, hours=5, minutes=3), self.now - timedelta(hours=7, seconds=12)),
+            (self.now - timedelta(hours=3, minutes=40), self.now - timedelta(hours=3, minutes=10)),
+        ]
+        for start, end in ranges:
+            with self.subTest(start=start, end=end):
+                self.assertMatchesRaw(start, end)
+
+    def test_since_past_the_watermark_leaves_no_gap(self):
+        refresh_rollups(now=self.now - timedelta(days=2))
+        refresh_rollups(since=self.now - timedelta(days=1), now=self.now)
+
+        self.assertMatchesRaw()
+        self.assertMatchesRaw(self.now - timedelta(days=2, hours=3), self.now - timedelta(hours=20))
+
+    def test_rows_arriving_late_for_rolled_up_hours_are_counted(self):
+        refresh_rollups(now=self.now)
+        # Buffered or retried ingest: inserted now, dated inside hours (and
+        # a day) the rollups already cover
+        late = [
+            UserInteraction(
+                session_id='late', interaction_type='purchase', device_type='tablet',
+                created_at=self.now - timedelta(days=1, hours=hours, minutes=20),
+            )
+            for hours in (2, 2, 7)
+        ]
+        UserInteraction.objects.bulk_create(late)
+        self.events.extend(late)
+
+        self.assertEqual(refresh_rollups(now=self.now), 2)
+        self.assertEqual(refresh_rollups(now=self.now), 0)
+
+        day = floor_day(self.now - timedelta(days=1, hours=2))
+        self.assertEqual(
+            InteractionRollup.objects.filter(granularity='day', bucket_start=day, interaction_type='purchase')
+            .aggregate(total=Sum('count'))['total'],
+            3,
+        )
+        for start, end in [
+            (None, None),
+            (day, day + timedelta(days=1)),
+            (self.now - timedelta(days=1, hours=3), self.now - timedelta(days=1, hours=1)),
+        ]:
+            with self.subTest(start=start, end=end):
+                self.assertMatchesRaw(start, end)
+
+
+def load_project_settings(**env):
+    """
+    Evaluate diamond_project/settings.py as a server started with `env`
+    would. The .env file is not read, so only `env` decides the DB_* values.
+    """
+    path = Path(__file__).resolve().parent.parent / 'diamond_project' / 'settings.py'
+    with mock.patch.dict(os.environ), mock.patch('dotenv.load_dotenv'):
+        for name in [name for name in os.environ if name.startswith('DB_')]:
+            del os.environ[name]
+        os.environ.update(env)
+        return runpy.run_path(str(path))
+
+
+def fake_find_spec(*available):
+    """importlib.util.find_spec that finds psycopg and psycopg_pool only if named in `available`"""
+    find_spec = importlib.util.find_spec
+
+    def patched(name, *args, **kwargs):
+        if name in ('psycopg', 'psycopg_pool'):
+            return mock.sentinel.spec if name in available else None
+        return find_spec(name, *args, **kwargs)
+    return patched
+
+
+class ConnectionPoolSettingsTests(SimpleTestCase):
+    def database(self, **env):
+        return load_project_settings(**env)['DATABASES']['default']
+
+    def test_persistent_mode_keeps_health_checked_connections(self):
+        database = self.database(DB_POOL_MODE='persistent', DB_CONN_MAX_AGE='120')
+        self.assertEqual(database['CONN_MAX_AGE'], 120)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('OPTIONS', database)
+
+    def test_persistent_is_the_default(self):
+        settings = load_project_settings()
+        self.assertEqual(settings['DB_POOL_MODE'], 'persistent')
+        self.assertEqual(settings['DATABASES']['default']['CONN_MAX_AGE'], 600)
+
+    def test_none_mode_connects_per_request(self):
+        database = self.database(DB_POOL_MODE='none')
+        self.assertNotIn('CONN_MAX_AGE', database)
+        self.assertNotIn('OPTIONS', database)
+
+    def test_pool_mode_configures_the_psycopg_pool(self):
+        with mock.patch('importlib.util.find_spec', fake_find_spec('psycopg', 'psycopg_pool')):
+            settings = load_project_settings(
+                DB_POOL_MODE='pool', DB_POOL_MIN_SIZE='4', DB_POOL_MAX_SIZE='16', DB_POOL_TIMEOUT='2.5',
+            )
+        self.assertEqual(settings['DB_POOL_MODE'], 'pool')
+        database = settings['DATABASES']['default']
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 4, 'max_size': 16, 'timeout': 2.5})
+        # Django refuses persistent connections together with a pool
+        self.assertNotIn('CONN_MAX_AGE', database)
+
+    def test_pool_mode_falls_back_without_psycopg_3_and_its_pool(self):
+        for label, available in [
+            ('neither', ()),
+            ('pool on psycopg2', ('psycopg_pool',)),
+            ('psycopg 3 without the pool', ('psycopg',)),
+        ]:
+            with self.subTest(label), mock.patch('importlib.util.find_spec', fake_find_spec(*available)):
+                settings = load_project_settings(DB_POOL_MODE='pool')
+                self.assertEqual(settings['DB_POOL_MODE'], 'persistent')
+                self.assertNotIn('OPTIONS', settings['DATABASES']['default'])
+                self.assertEqual(settings['DATABASES']['default']['CONN_MAX_AGE'], 600)
+
+    def test_connection_reuse_follows_the_mode(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for mode, reused in [('persistent', True), ('none', False)]:
+                with self.subTest(mode):
+                    database = self.database(DB_POOL_MODE=mode)
+                    # Same reuse settings, on a database the test can open
+                    database.update(ENGINE='django.db.backends.sqlite3', NAME=os.path.join(directory, 'pool.sqlite3'))
+                    # Not an alias of the global handler, so the test may open it
+                    db = ConnectionHandler({'default': {}, 'reuse_check': database})['reuse_check']
+                    try:
+                        db.ensure_connection()
+                        # What Django runs when a request finishes
+                        db.close_if_unusable_or_obsolete()
+                        self.assertEqual(db.connection is not None, reused)
+                    finally:
+                        db.close()
+
+
+class InteractionBufferTests(TransactionTestCase):
+    # close() calls close_old_connections(), which drops a connection that
+    # is inside a transaction, as a TestCase's would be
+    def setUp(self):
+        self.buffer = InteractionBuffer(flush_size=10, max_retries=2)
+        self.bulk_create = UserInteraction.objects.bulk_create
+        self.failures = 0
+
+    def events(self, count, session='s'):
+        return [
+            UserInteraction(session_id=f'{session}{index}', interaction_type='view', created_at=timezone.now())
+            for index in range(count)
+        ]
+
+    def failing_bulk_create(self, times):
+        """bulk_create that raises the first `times` calls"""
+        def bulk_create(*args, **kwargs):
+            if self.failures < times:
+                self.failures += 1
+                raise OperationalError('database is unavailable')
+            return self.bulk_create(*args, **kwargs)
+        return mock.patch.object(UserInteraction.objects, 'bulk_create', bulk_create)
+
+    def test_failed_batch_is_retried_in_order(self):
+        self.buffer._events.extend(self.events(15))
+        with self.failing_bulk_create(2), self.assertLogs('rings.ingest', 'WARNING'):
+            self.assertEqual(self.buffer.flush(), 0)
+            self.assertEqual(len(self.buffer), 15)
+            self.assertEqual(self.buffer.flush(), 0)
+            self.assertEqual(self.buffer.flush(), 15)
+
+        self.assertEqual(self.buffer.stats['retried'], 20)
+        self.assertEqual(self.buffer.stats['failed'], 0)
+        self.assertEqual(
+            list(UserInteraction.objects.order_by('pk').values_list('session_id', flat=True)),
+            [f's{index}' for index in range(15)],
+        )
+
+    def test_batch_is_dropped_and_logged_after_its_retries(self):
+        self.buffer._events.extend(self.events(15))
+        with self.failing_bulk_create(3), self.assertLogs('rings.ingest') as logs:
+            for _ in range(3):
+                self.assertEqual(self.buffer.flush(), 0)
+            # The next batch starts with a clean slate
+            self.assertEqual(self.buffer.flush(), 5)
+
+        self.assertEqual(self.buffer.stats['failed'], 10)
+        self.assertIn('Dropped 10 buffered interactions after 2 retries', logs.output[-1])
+        self.assertEqual(UserInteraction.objects.count(), 5)
+
+    def test_close_uses_up_the_retries(self):
+        self.buffer._events.extend(self.events(5))
+        with self.failing_bulk_create(2), self.assertLogs('rings.ingest', 'WARNING'):
+            self.buffer.close()
+        self.assertEqual(UserInteraction.objects.count(), 5)
+        self.assertEqual(len(self.buffer), 0)
+
+
+class OpsAccessTests(TestCase):
+    urls = ['/api/ops/cache-stats/', '/api/ops/db-stats/', '/api/ops/metrics/']
+
+    def test_anonymous_clients_are_refused(self):
+        for url in self.urls:
+            with self.subTest(url):
+                self.assertEqual(APIClient().get(url).status_code, 403)
+
+    def test_staff_users_are_let_in(self):
+        client = APIClient()
+        client.force_authenticate(AuthUser.objects.create_user('ops', password='!', is_staff=True))
+        shopper = APIClient()
+        shopper.force_authenticate(AuthUser.objects.create_user('shopper', password='!'))
+
+        for url in self.urls:
+            with self.subTest(url):
+                self.assertEqual(client.get(url).status_code, 200)
+                self.assertEqual(shopper.get(url).status_code, 403)
+
+    def test_token_lets_scrapers_in_only_when_configured(self):
+        client = APIClient()
+        for token, sent, expected in [
+            ('', 'Bearer ', 403),
+            ('s3cret', 'Bearer s3cret', 200),
+            ('s3cret', 'Bearer wrong', 403),
+            ('s3cret', 's3cret', 403),
+        ]:
+            with self.subTest(token=token, sent=sent), override_settings(OPS_TOKEN=token):
+                self.assertEqual(client.get('/api/ops/metrics/', HTTP_AUTHORIZATION=sent).status_code, expected)
+
+
+@override_settings(REQUEST_PROFILING={
+    'ENABLED': True, 'SAMPLE_RATE': 1.0, 'SLOW_REQUEST_MS': 60_000, 'DUPLICATE_QUERY_THRESHOLD': 3,
+})
+class RequestProfilingTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        profiling.route_metrics.routes.clear()
+        self.addCleanup(profiling.route_metrics.routes.clear)
+
+    def test_fingerprint_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            profiling.fingerprint("SELECT * FROM diamonds WHERE sku = 'A''1' AND carat > 1.5 AND id IN (%s, %s, %s)"),
+            'SELECT * FROM diamonds WHERE sku = ? AND carat > ? AND id IN (...)',
+        )
+
+    def test_execute_wrapper_counts_and_times_queries(self):
+        profile = profiling.RequestProfile()
+        with connection.execute_wrapper(profile):
+            for index in range(3):
+                Diamond.objects.filter(sku=f'TEST-{index}').exists()
+            Setting.objects.count()
+
+        self.assertEqual(profile.queries, 4)
+        self.assertGreater(profile.sql_seconds, 0)
+        self.assertEqual(sorted(profile.fingerprints.values()), [1, 3])
+
+    def test_sampled_requests_are_folded_into_route_metrics(self):
+        make_setting(0)
+        client = APIClient()
+
+        self.assertEqual(client.get('/api/settings/').status_code, 200)
+
+        entry = profiling.route_metrics.routes[('setting-list', 'GET')]
+        self.assertEqual(entry['requests'], 1)
+        self.assertGreater(entry['queries'], 0)
+        self.assertGreater(entry['serialize_seconds'], 0)
+        self.assertGreater(entry['response_bytes'], 0)
+        text = profiling.route_metrics.render_prometheus()
+        self.assertIn('rings_sampled_requests_total{route="setting-list",method="GET"} 1', text)
+        self.assertIn('rings_request_duration_seconds_bucket{route="setting-list",method="GET",le="+Inf"} 1', text)
+
+    def test_repeated_query_shapes_are_logged(self):
+        user = User.objects.create(email='n1@example.com', password_hash='!')
+        for index in range(4):
+            Favorite.objects.create(user=user, diamond=make_diamond(index), created_at=timezone.now())
+        client = APIClient()
+
+        # Without its select_related the favorites list loads each diamond on its own
+        with mock.patch('rings.views.FavoriteViewSet.eager_loading', {}), \
+                self.assertLogs('rings.profiling', 'WARNING') as logs:
+            client.get('/api/favorites/my_favorites/', {'user_id': user.pk})
+
+        self.assertIn('likely N+1', logs.output[0])
+        route = ('favorite-my-favorites', 'GET')
+        self.assertEqual(profiling.route_metrics.routes[route]['duplicate_queries'], 1)
+
+
+class InteractionExportTests(TestCase):
+    def test_json_column_is_exported_as_json(self):
+        data = {'filters': {'shape': ['Round', 'Oval']}, 'page': 2, 'exact': None}
+        UserInteraction.objects.create(
+            session_id='s1', interaction_type='search', interaction_data=data, created_at=timezone.now(),
+        )
+
+        response = APIClient().get('/api/interactions/export/', {'export_format': 'csv'})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+
+        self.assertEqual(json.loads(rows[0]['interaction_data']), data)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        now = timezone.now()
+        self.empty = Order.objects.create(
+            order_number='ORD-EMPTY', customer_email='a@example.com', subtotal=Decimal('0.00'),
+            total_amount=Decimal('0.00'), status='pending', created_at=now - timedelta(days=2),
+        )
+        self.full = Order.objects.create(
+            order_number='ORD-FULL', customer_email='b@example.com', subtotal=Decimal('9000.00'),
+            total_amount=Decimal('9000.00'), status='shipped', created_at=now,
+        )
+        for index in range(3):
+            OrderItem.objects.create(
+                order=self.full, diamond_sku=f'TEST-{index}', item_total=Decimal('3000.00'), quantity=1,
+            )
+
+    def export(self, **params):
+        response = self.client.get('/api/orders/export/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_a_line_per_item(self):
+        rows = list(csv.DictReader(self.export(export_format='csv').splitlines()))
+
+        self.assertEqual([row['order_number'] for row in rows], ['ORD-EMPTY'] + ['ORD-FULL'] * 3)
+        self.assertEqual(rows[0]['item_order_item_id'], '')
+        self.assertEqual(rows[0]['item_diamond_sku'], '')
+        self.assertEqual([row['item_diamond_sku'] for row in rows[1:]], ['TEST-0', 'TEST-1', 'TEST-2'])
+        self.assertEqual({row['total_amount'] for row in rows[1:]}, {'9000.00'})
+
+    def test_ndjson_has_an_object_per_order(self):
+        orders = [json.loads(line) for line in self.export(export_format='ndjson').splitlines()]
+
+        self.assertEqual([order['order_number'] for order in orders], ['ORD-EMPTY', 'ORD-FULL'])
+        self.assertEqual(orders[0]['items'], [])
+        self.assertEqual([item['diamond_sku'] for item in orders[1]['items']], ['TEST-0', 'TEST-1', 'TEST-2'])
+        self.assertEqual(orders[1]['items'][0]['item_total'], 3000)
+        self.assertNotIn('order_id', orders[1]['items'][0])
+
+    def test_status_and_date_filters(self):
+        for label, params, expected in [
+            ('status', {'status': 'shipped'}, ['ORD-FULL']),
+            ('start_date', {'start_date': (timezone.now() - timedelta(days=1)).date().isoformat()}, ['ORD-FULL']),
+            ('end_date', {'end_date': (timezone.now() - timedelta(days=1)).date().isoformat()}, ['ORD-EMPTY']),
+        ]:
+            with self.subTest(label):
+                lines = self.export(export_format='ndjson', **params).splitlines()
+                self.assertEqual([json.loads(line)['order_number'] for line in lines], expected)
+
+
+class DiamondComparisonTests(TestCase):
+    def setUp(self):
+        reset_process_state()
+        self.first = make_diamond(0, carat=Decimal('1.00'), cut='Excellent', color='F')
+        self.second = make_diamond(1, carat=Decimal('1.00'), cut='Ideal', color='F', base_price=Decimal('5000.00'))
+        self.small = make_diamond(2, carat=Decimal('0.80'), cut='Excellent', color='G')
+        self.sold = make_diamond(3, is_available=False)
+
+    def compare(self, *ids):
+        response = APIClient().get('/api/diamonds/compare/', {'ids': ','.join(str(pk) for pk in ids)})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_ties_share_a_rank_and_unavailable_ids_are_missing(self):
+        missing_id = self.sold.pk + 1000
+        data = self.compare(self.small.pk, self.sold.pk, self.first.pk, missing_id, self.second.pk)
+
+        # Requested order, whatever order the ids are cached under
+        self.assertEqual(
+            [entry['diamond_id'] for entry in data['diamonds']], [self.small.pk, self.first.pk, self.second.pk],
+        )
+        self.assertEqual(data['missing'], [self.sold.pk, missing_id])
+        ranks = {entry['diamond_id']: entry['ranks'] for entry in data['diamonds']}
+        for metric, expected in [
+            ('carat', {self.first.pk: 1, self.second.pk: 1, self.small.pk: 3}),
+            ('base_price', {self.first.pk: 1, self.small.pk: 1, self.second.pk: 3}),
+            ('price_per_carat', {self.first.pk: 1, self.second.pk: 2, self.small.pk: 2}),
+            ('cut_grade', {self.second.pk: 1, self.first.pk: 2, self.small.pk: 2}),
+            ('color_grade', {self.first.pk: 1, self.second.pk: 1, self.small.pk: 3}),
+            ('value_score', {self.first.pk: None, self.second.pk: None, self.small.pk: None}),
+        ]:
+            with self.subTest(metric):
+                self.assertEqual({pk: ranks[pk][metric] for pk in ranks}, expected)
+
+        # A tie for first goes to the lowest id; no values, no best
+        self.assertEqual(data['best']['carat'], self.first.pk)
+        self.assertEqual(data['best']['base_price'], self.first.pk)
+        self.assertEqual(data['best']['cut_grade'], self.second.pk)
+        self.assertIsNone(data['best']['value_score'])
+
+        metrics = {entry['diamond_id']: entry['metrics'] for entry in data['diamonds']}
+        self.assertEqual(metrics[self.second.pk]['price_difference'], '1000.00')
+        self.assertEqual(metrics[self.second.pk]['price_difference_percent'], 25.0)
+        self.assertEqual(metrics[self.small.pk]['price_per_carat'], '5000.00')
+        self.assertEqual(metrics[self.first.pk]['cut_grade_difference'], -1)
+        self.assertEqual(metrics[self.second.pk]['cut_grade_difference'], 0)
+
+    def test_sets_are_cached_across_orderings(self):
+        self.compare(self.first.pk, self.second.pk)
+        data = self.compare(self.second.pk, self.first.pk)
+
+        self.assertEqual([entry['diamond_id'] for entry in data['diamonds']], [self.second.pk, self.first.pk])
+        self.assertEqual(comparison.comparison_cache_info()['hits'], 1)
+
+    def test_only_unavailable_ids(self):
+        data = self.compare(self.sold.pk)
+
+        self.assertEqual(data['diamonds'], [])
+        self.assertEqual(data['missing'], [self.sold.pk])
+        self.assertEqual(data['best'], {metric: None for metric in comparison.RANKED_METRICS})
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class SearchIndexRebuildTests(TransactionTestCase):
+    def setUp(self):
+        reset_process_state()
+
+    def test_previous_index_serves_while_rebuilding(self):
+        make_diamond(0)
+        index = get_search_index()
+
+        make_diamond(1)
+        # The caller is answered from the old index straight away
+        self.assertIs(get_search_index(), index)
+        search._rebuild_thread.join(timeout=10)
+
+        rebuilt = get_search_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.size, 2)
+        self.assertEqual(rebuilt.version, catalog.get_catalog_version('diamond'))
+
+
+@override_settings(CATALOG_VERSION_TTL=0)
+class SimilarityIndexTests(TransactionTestCase):
+    def setUp(self):
+        reset_process_state()
+        self.query = make_diamond(0, carat=Decimal('1.00'))
+        self.far = make_diamond(1, carat=Decimal('1.60'))
+        self.near = make_diamond(2, carat=Decimal('1.05'))
+        self.middle = make_diamond(3, carat=Decimal('1.20'))
+        self.sold = make_diamond(4, carat=Decimal('1.01'), is_available=False)
+        self.princess = make_diamond(5, carat=Decimal('1.02'), shape='Princess')
+
+    def neighbour_ids(self, index, diamond, **kwargs):
+        return [diamond_id for diamond_id, _ in index.similar(diamond.pk, **kwargs)]
+
+    def test_neighbours_nearest_first(self):
+        index = get_similarity_index()
+
+        neighbours = index.similar(self.query.pk, limit=10)
+        self.assertEqual(
+            [diamond_id for diamond_id, _ in neighbours], [self.near.pk, self.middle.pk, self.far.pk],
+        )
+        self.assertEqual([distance for _, distance in neighbours], sorted(distance for _, distance in neighbours))
+        self.assertEqual(self.neighbour_ids(index, self.query, limit=2), [self.near.pk, self.middle.pk])
+        self.assertEqual(
+            self.neighbour_ids(index, self.query, limit=2, same_shape=False), [self.princess.pk, self.near.pk],
+        )
+        self.assertIsNone(index.similar(10**9))
+
+    def test_sync_patches_a_copy_in_the_background(self):
+        index = get_similarity_index()
+        self.far.carat, self.far.updated_at = Decimal('1.03'), timezone.now()
+        self.far.save()
+        added = make_diamond(6, carat=Decimal('1.10'))
+
+        # The caller is answered from the old index straight away
+        self.assertIs(get_similarity_index(), index)
+        response = APIClient().get(f'/api/diamonds/{added.pk}/similar/')
+        self.assertEqual(response.status_code, 200)
+        similarity._refresh_thread.join(timeout=10)
+
+        synced = get_similarity_index()
+        self.assertIsNot(synced, index)
+        self.assertEqual(synced.version, catalog.get_catalog_version('diamond'))
+        # Patched rather than rebuilt
+        self.assertEqual(synced.built_at, index.built_at)
+        self.assertEqual(
+            self.neighbour_ids(synced, self.query, limit=10),
+            [self.far.pk, self.near.pk, added.pk, self.middle.pk],
+        )
+        self.assertEqual(self.neighbour_ids(synced, added, limit=1), [self.near.pk])
+        # Readers of the old index still see the old arrays
+        self.assertEqual(
+            self.neighbour_ids(index, self.query, limit=10), [self.near.pk, self.middle.pk, self.far.pk],
+        )
+
+    def test_deletion_forces_a_full_rebuild(self):
+        index = get_similarity_index()
+        self.middle.delete()
+
+        get_similarity_index()
+        similarity._refresh_thread.join(timeout=10)
+
+        rebuilt = get_similarity_index()
+        self.assertGreater(rebuilt.built_at, index.built_at)
+        self.assertEqual(self.neighbour_ids(rebuilt, self.query, limit=10), [self.near.pk, self.far.pk])
+
+
+class ReservationStressTests(TransactionTestCase):
+    buyers = 300
+    stones = 5
+    threads = 32
+
+    def setUp(self):
+        reset_process_state()
+
+    def test_concurrent_buyers_never_share_a_stone(self):
+        diamonds = [make_diamond(index) for index in range(self.stones)]
+        diamond_version = catalog.get_catalog_version('diamond')
+        start = threading.Barrier(self.threads)
+        lock = threading.Lock()
+        winners = {}
+
+        def buyer(number):
+            holder = f'buyer:{number}'
+            try:
+                if number < self.threads:
+                    start.wait()
+                # Everyone tries the whole pool, in their own order
+                for diamond in random.Random(number).sample(diamonds, len(diamonds)):
+                    if retry_locked(reserve_diamond, diamond, holder) is not None:
+                        with lock:
+                            winners.setdefault(diamond.pk, []).append(holder)
+                        return
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.threads) as pool:
+            list(pool.map(buyer, range(self.buyers)))
+
+        held = dict(DiamondReservation.objects.values_list('diamond_id', 'holder_key'))
+        self.assertEqual(sorted(winners), sorted(diamond.pk for diamond in diamonds))
+        for diamond_id, holders in winners.items():
+            self.assertEqual(holders, [held[diamond_id]])
+
+        # Holds are not inventory changes
+        catalog.load_catalog_versions()
+        self.assertEqual(catalog.get_catalog_version('diamond'), diamond_version)
+        self.assertGreaterEqual(catalog.get_catalog_version('reservation'), self.stones + 1)
@@ -2,10 +2,11 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     UserViewSet, DiamondViewSet, SettingViewSet,
     RingConfigurationViewSet, FavoriteViewSet, ReviewViewSet,
-    OrderViewSet, UserInteractionViewSet
+    OrderViewSet, UserInteractionViewSet, cache_stats, db_pool_stats, metrics
 )
 
 router = DefaultRouter()
@@ -20,4 +21,14 @@ router.register(r'interactions', UserInteractionViewSet, basename='interaction')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('ops/cache-stats/', cache_stats, name='cache-stats'),
+    path('ops/db-stats/', db_pool_stats, name='db-stats'),
+    path('ops/metrics/', metrics, name='metrics'),
+    
+    # Async read path (see rings/async_views.py)
+    path('async/diamonds/', async_views.diamond_list, name='async-diamond-list'),
+    path('async/diamonds/<int:pk>/', async_views.diamond_detail, name='async-diamond-detail'),
+    path('async/settings/', async_views.setting_list, name='async-setting-list'),
+    path('async/settings/<int:pk>/', async_views.setting_detail, name='async-setting-detail'),
+    path('async/reviews/product_reviews/', async_views.product_reviews, name='async-product-reviews'),
 ]
\ No newline at end of file
@@ -0,0 +1,201 @@
+# rings/valuation.py
+
+import logging
+import os
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from .catalog import bump_catalog_version, get_catalog_version
+from .models import Diamond, DiamondValueScore, DiamondValueScoreFit
+
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# VALUE SCORES
+# ============================================
+#
+# A log-linear price model is fitted over the available inventory with one
+# least-squares solve:
+#     log(price) ~ 1 + log(carat) + log(carat)^2 + one-hot(cut, color,
+#                  clarity, shape, polish, symmetry, fluorescence)
+# Each stone's value score is how far below (positive) or above (negative)
+# its fitted price it is listed, in percent. Scores are stored in
+# diamond_value_scores, so /diamonds/?ordering=-value_score and
+# ?min_value_score= are a plain join on an indexed column.
+#
+# Any inventory change moves the coefficients, so the whole table is
+# refitted. A background thread per worker checks every CHECK_INTERVAL
+# seconds whether the diamond catalog version moved and, if the inventory
+# fingerprint (available count, max id, max updated_at, price total) no
+# longer matches the one stored with the last fit, refits. The fingerprint
+# lives in diamond_value_score_fits and a refit runs in one transaction
+# under pg_advisory_xact_lock, so workers that notice the same change at
+# the same time queue up behind the first and then find nothing to do.
+# Stones listed since the last refit have no score until the next one.
+#
+# The thread is started by gunicorn's post_worker_init hook
+# (gunicorn.conf.py), never from a request. Under any other server, run the
+# refresh_value_scores command from cron instead.
+
+CATEGORICAL_FIELDS = ['cut', 'color', 'clarity', 'shape', 'polish', 'symmetry', 'fluorescence']
+COLUMNS = ['diamond_id', 'carat', 'base_price', *CATEGORICAL_FIELDS]
+
+# Fewer stones than this and the fit is not worth trusting
+MIN_FIT_ROWS = 50
+
+# Key of the PostgreSQL advisory lock that serializes refits
+REFIT_LOCK_ID = 7_403_251_017
+
+
+def get_value_score_options():
+    return getattr(settings, 'VALUE_SCORES', {})
+
+
+def design_matrix(rows):
+    """Model inputs for COLUMNS rows: intercept, carat terms and one-hot grades"""
+    count = len(rows)
+    log_carat = np.log(np.array([float(row[1]) for row in rows]))
+    blocks = [np.ones((count, 1)), log_carat[:, None], (log_carat ** 2)[:, None]]
+    for index in range(3, len(COLUMNS)):
+        levels = {}
+        codes = np.array([levels.setdefault((row[index] or '').strip().lower(), len(levels)) for row in rows])
+        # The first level seen is the baseline, absorbed by the intercept
+        blocks.append((codes[:, None] == np.arange(1, len(levels))).astype(np.float64))
+    return np.hstack(blocks)
+
+
+def fit_predicted_prices(rows):
+    """Fitted price per row, from one least-squares solve in log space"""
+    features = design_matrix(rows)
+    log_price = np.log(np.array([float(row[2]) for row in rows]))
+    coefficients, *_ = np.linalg.lstsq(features, log_price, rcond=None)
+    return np.exp(features @ coefficients)
+
+
+def inventory_fingerprint():
+    """Cheap summary that changes whenever the available inventory does"""
+    figures = Diamond.objects.filter(is_available=True).aggregate(
+        count=Count('pk'), max_id=Max('pk'), updated=Max('updated_at'), total=Sum('base_price'),
+    )
+    return '|'.join(str(figures[name]) for name in ('count', 'max_id', 'updated', 'total'))
+
+
+def stored_fingerprint():
+    """Fingerprint of the inventory the stored scores were fitted on, or None"""
+    return DiamondValueScoreFit.objects.filter(pk=1).values_list('fingerprint', flat=True).first()
+
+
+def lock_refits():
+    """
+    Hold the refit lock until the current transaction ends. Only PostgreSQL
+    needs it; SQLite already lets one writer in at a time.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [REFIT_LOCK_ID])
+
+
+def refresh_value_scores(force=True):
+    """
+    Refit the price model and rewrite every score; returns the number of
+    stones scored. Unless `force` is set, returns None without refitting
+    when the stored scores already match the inventory.
+    """
+    with transaction.atomic():
+        lock_refits()
+        # Read under the lock: a refit that finished while we waited counts
+        fingerprint = inventory_fingerprint()
+        if not force and stored_fingerprint() == fingerprint:
+            return None
+
+        rows = list(
+            Diamond.objects.filter(is_available=True, carat__gt=0, base_price__gt=0)
+            .order_by('pk').values_list(*COLUMNS).iterator(chunk_size=5000)
+        )
+        scores = []
+        scored_at = timezone.now()
+        if len(rows) >= MIN_FIT_ROWS:
+            predicted = fit_predicted_prices(rows)
+            prices = np.array([float(row[2]) for row in rows])
+            value_scores = np.round((predicted - prices) / predicted * 100, 2)
+            scores = [
+                DiamondValueScore(
+                    diamond_id=row[0], predicted_price=Decimal(f'{price:.2f}'),
+                    value_score=float(score), scored_at=scored_at,
+                )
+                for row, price, score in zip(rows, predicted.tolist(), value_scores.tolist())
+            ]
+
+        DiamondValueScore.objects.all().delete()
+        DiamondValueScore.objects.bulk_create(scores, batch_size=5000)
+        DiamondValueScoreFit.objects.update_or_create(pk=1, defaults={
+            'fingerprint': fingerprint, 'diamonds_scored': len(scores), 'fitted_at': scored_at,
+        })
+        bump_catalog_version('valuation')
+    return len(scores)
+
+
+class ValueScoreRefresher:
+    """Per-process background thread; see the module comment"""
+
+    def __init__(self, check_interval=60):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._seen_version = None
+
+    def start(self):
+        # Threads don't survive fork, so each worker process starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='value-score-refresher', daemon=True)
+            self._thread.start()
+
+    def check(self):
+        """Refit if the inventory changed; returns the number scored, or None"""
+        version = get_catalog_version('diamond')
+        if version == self._seen_version:
+            return None
+        scored = None
+        # Cheap test first, so an unchanged inventory never waits on the lock
+        if stored_fingerprint() != inventory_fingerprint():
+            scored = refresh_value_scores(force=False)
+        self._seen_version = version
+        if scored is not None:
+            logger.info('Refitted value scores for %d diamonds', scored)
+        return scored
+
+    def _run(self):
+        while True:
+            close_old_connections()
+            try:
+                self.check()
+            except Exception:
+                # Scores just stay as they were until the next check
+                logger.exception('Value score refresh failed')
+            close_old_connections()
+            time.sleep(self.check_interval)
+
+
+value_score_refresher = ValueScoreRefresher(
+    check_interval=get_value_score_options().get('CHECK_INTERVAL', 60),
+)
+
+
+def start_value_score_refresher():
+    if get_value_score_options().get('BACKGROUND_REFRESH', True):
+        value_score_refresher.start()
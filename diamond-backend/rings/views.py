@@ -1,10 +1,20 @@
 # rings/views.py
 
+import hmac
+import os
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import viewsets, filters, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import BasePermission
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Avg, Count
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.db.models import F
 
 from .models import (
     User, Diamond, Setting, RingConfiguration,
@@ -17,8 +27,124 @@ from .serializers import (
     RingConfigurationCreateSerializer, FavoriteSerializer, FavoriteCreateSerializer,
     ReviewSerializer, ReviewCreateSerializer, OrderListSerializer,
     OrderDetailSerializer, OrderCreateSerializer, UserInteractionSerializer,
-    UserInteractionCreateSerializer
+    UserInteractionCreateSerializer, ConfigurationQuoteSerializer
+)
+from .caching import CachedListMixin, ConditionalCatalogMixin, response_cache_stats
+from .comparison import comparison_cache_info, compare_diamonds, parse_compare_ids
+from .compatibility import filter_diamonds_for_setting, filter_settings_for_diamond
+from .dbpool import get_pool_stats
+from .exports import EXPORT_FORMATS, export_interactions, export_orders
+from .fastpath import FastListMixin
+from .ingest import BufferFull, interaction_buffer, prefetch_interaction_relations
+from .pagination import KeysetPagination
+from .pricing import quote_configurations
+from .profiling import route_metrics
+from .ratings import get_rating_summary
+from .reservations import (
+    config_holder_key, exclude_reserved, expire_lapsed_reservations, release_reservation, reserve_diamond,
+    reserved_diamond_ids,
 )
+from .rollups import parse_bound, summarize_interactions
+from .search import get_search_index, parse_search_filters
+from .similarity import get_similarity_index
+from .statistics import get_diamond_statistics
+from .votes import HelpfulVoteThrottle, get_helpful_count, get_voter_key, record_helpful_vote
+
+
+def parse_id(value, name):
+    """Validate an integer id query param"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'A valid integer is required.'})
+
+
+def parse_number(value, name):
+    """Validate a range bound query param; NaN and infinities are rejected"""
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ValidationError({name: 'A valid number is required.'})
+    return number
+
+
+def filter_export(queryset, request):
+    """Apply start_date/end_date to an export and read its export_format"""
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise ValidationError({'export_format': f"Choose one of: {', '.join(EXPORT_FORMATS)}."})
+    try:
+        start_date = parse_bound(request.query_params.get('start_date'))
+        end_date = parse_bound(request.query_params.get('end_date'))
+    except ValueError as exc:
+        raise ValidationError({'error': str(exc)})
+    if start_date:
+        queryset = queryset.filter(created_at__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(created_at__lte=end_date)
+    return queryset, export_format
+
+
+def parse_product_reviews(query_params, page_size):
+    """
+    Read product_reviews params: the product filter (diamond_id and/or
+    setting_id), the page number and that page's row offset
+    """
+    product = {}
+    for name in ('diamond_id', 'setting_id'):
+        value = query_params.get(name)
+        if value:
+            product[name] = parse_id(value, name)
+    try:
+        page_number = max(int(query_params.get('page', 1)), 1)
+    except ValueError:
+        page_number = 1
+    return product, page_number, (page_number - 1) * page_size
+
+
+def product_reviews_body(url, reviews, summary, page_number, page_size):
+    """product_reviews response: the page of reviews, page links and the summary"""
+    next_url = None
+    previous_url = None
+    if page_number * page_size < summary['total_reviews']:
+        next_url = replace_query_param(url, 'page', page_number + 1)
+    if page_number > 1:
+        previous_url = replace_query_param(url, 'page', page_number - 1)
+    return {
+        'reviews': reviews,
+        'next': next_url,
+        'previous': previous_url,
+        **summary,
+    }
+
+
+# ============================================
+# EAGER LOADING
+# ============================================
+
+class EagerLoadingMixin:
+    """
+    Apply the select_related / prefetch_related plan declared for the
+    current action, falling back to the 'default' plan.
+    
+    eager_loading = {
+        'default': {'select_related': [...], 'prefetch_related': [...]},
+        'retrieve': {...},
+    }
+    """
+    eager_loading = {}
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        plan = self.eager_loading.get(self.action, self.eager_loading.get('default'))
+        if plan:
+            if plan.get('select_related'):
+                queryset = queryset.select_related(*plan['select_related'])
+            if plan.get('prefetch_related'):
+                queryset = queryset.prefetch_related(*plan['prefetch_related'])
+        return queryset
 
 
 # ============================================
@@ -39,17 +165,24 @@ class UserViewSet(viewsets.ModelViewSet):
 # DIAMOND VIEWSET
 # ============================================
 
-class DiamondViewSet(viewsets.ReadOnlyModelViewSet):
+class DiamondViewSet(ConditionalCatalogMixin, CachedListMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for diamonds
     List, retrieve, and filter diamonds
     """
+    catalog_names = ['diamond']
+    response_cache_params = [
+        'page', 'page_size', 'ordering', 'cut', 'color', 'clarity', 'shape',
+        'min_carat', 'max_carat', 'min_price', 'max_price', 'compatible_with_setting',
+        'min_value_score',
+    ]
     queryset = Diamond.objects.filter(is_available=True)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['cut', 'color', 'clarity', 'shape']
     search_fields = ['sku']
-    ordering_fields = ['carat', 'base_price', 'created_at']
+    ordering_fields = ['carat', 'base_price', 'created_at', 'value_score']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -62,55 +195,160 @@ class DiamondViewSet(viewsets.ReadOnlyModelViewSet):
         """
         queryset = super().get_queryset()
         
+        # Stones held by someone's checkout are hidden from listings
+        if self.action != 'retrieve':
+            queryset = exclude_reserved(queryset)
+            # Precomputed by rings/valuation.py; NULL until the next refit
+            queryset = queryset.annotate(value_score=F('valuation__value_score'))
+            min_value_score = self.request.query_params.get('min_value_score')
+            if min_value_score:
+                queryset = queryset.filter(value_score__gte=float(parse_number(min_value_score, 'min_value_score')))
+        
         # Filter by carat range
         min_carat = self.request.query_params.get('min_carat')
         max_carat = self.request.query_params.get('max_carat')
         if min_carat:
-            queryset = queryset.filter(carat__gte=min_carat)
+            queryset = queryset.filter(carat__gte=parse_number(min_carat, 'min_carat'))
         if max_carat:
-            queryset = queryset.filter(carat__lte=max_carat)
+            queryset = queryset.filter(carat__lte=parse_number(max_carat, 'max_carat'))
         
         # Filter by price range
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
         if min_price:
-            queryset = queryset.filter(base_price__gte=min_price)
+            queryset = queryset.filter(base_price__gte=parse_number(min_price, 'min_price'))
         if max_price:
-            queryset = queryset.filter(base_price__lte=max_price)
+            queryset = queryset.filter(base_price__lte=parse_number(max_price, 'max_price'))
+        
+        # Filter by what fits a setting
+        setting_id = self.request.query_params.get('compatible_with_setting')
+        if setting_id:
+            queryset = filter_diamonds_for_setting(queryset, parse_id(setting_id, 'compatible_with_setting'))
         
         return queryset
     
+    def get_catalog_names(self, request):
+        names = list(self.catalog_names)
+        # Listings hide stones held by a checkout; a detail page doesn't
+        if self.action != 'retrieve':
+            expire_lapsed_reservations()
+            names.append('reservation')
+        if 'compatible_with_setting' in request.query_params:
+            names.append('setting')
+        if 'min_value_score' in request.query_params or 'value_score' in request.query_params.get('ordering', ''):
+            names.append('valuation')
+        return names
+    
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get diamond statistics for filters"""
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
+        stats = get_diamond_statistics(queryset, request.query_params, self.get_catalog_names(request))
+        return Response(stats)
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Faceted search: a page of diamonds plus live facet counts"""
+        filters, ordering = parse_search_filters(request.query_params)
         
-        stats = {
-            'total_count': queryset.count(),
-            'carat_range': {
-                'min': queryset.order_by('carat').first().carat if queryset.exists() else 0,
-                'max': queryset.order_by('-carat').first().carat if queryset.exists() else 0,
-            },
-            'price_range': {
-                'min': queryset.order_by('base_price').first().base_price if queryset.exists() else 0,
-                'max': queryset.order_by('-base_price').first().base_price if queryset.exists() else 0,
-            },
-            'shapes': queryset.values('shape').annotate(count=Count('shape')),
-            'cuts': queryset.values('cut').annotate(count=Count('cut')),
-        }
+        page_size = self.paginator.get_page_size(request)
+        try:
+            page_number = max(int(request.query_params.get('page', 1)), 1)
+        except ValueError:
+            page_number = 1
         
-        return Response(stats)
+        index = get_search_index()
+        count, diamond_ids, facets, histograms = index.search(
+            filters, ordering,
+            offset=(page_number - 1) * page_size,
+            limit=page_size,
+            hidden_ids=reserved_diamond_ids(),
+        )
+        
+        # The index may be a rebuild behind: don't show stones sold since
+        diamonds = Diamond.objects.filter(is_available=True).in_bulk(diamond_ids)
+        results = [diamonds[pk] for pk in diamond_ids if pk in diamonds]
+        serializer = DiamondListSerializer(results, many=True, context=self.get_serializer_context())
+        
+        url = request.build_absolute_uri()
+        next_url = None
+        previous_url = None
+        if page_number * page_size < count:
+            next_url = replace_query_param(url, 'page', page_number + 1)
+        if page_number > 1:
+            previous_url = replace_query_param(url, 'page', page_number - 1)
+        
+        return Response({
+            'count': count,
+            'next': next_url,
+            'previous': previous_url,
+            'results': serializer.data,
+            'facets': facets,
+            'histograms': histograms,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """Side-by-side comparison of up to COMPARE_MAX_ITEMS diamonds with derived metrics"""
+        try:
+            ids = parse_compare_ids(request.query_params.get('ids'))
+        except ValueError:
+            raise ValidationError({'ids': 'A comma separated list of integers is required.'})
+        max_items = getattr(settings, 'COMPARE_MAX_ITEMS', 10)
+        if not ids:
+            raise ValidationError({'ids': 'At least one id is required.'})
+        if len(ids) > max_items:
+            raise ValidationError({'ids': f'At most {max_items} diamonds can be compared.'})
+        return Response(compare_diamonds(ids))
+    
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Closest available stones by weighted 4Cs, proportions and price"""
+        diamond_id = parse_id(pk, 'id')
+        max_results = getattr(settings, 'SIMILAR_DIAMONDS_MAX_RESULTS', 24)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 6)), 1), max_results)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        same_shape = request.query_params.get('any_shape', '').lower() not in ('1', 'true', 'yes')
+        
+        # Ask for spares: stones held by a checkout are dropped below
+        neighbours = get_similarity_index().similar(diamond_id, limit * 2, same_shape=same_shape)
+        if neighbours is None and Diamond.objects.filter(pk=diamond_id).exists():
+            # Added since the index was built; it is being refreshed
+            neighbours = []
+        if neighbours is None:
+            return Response(
+                {"error": "Diamond not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        diamonds = exclude_reserved(
+            Diamond.objects.filter(is_available=True)
+        ).in_bulk([neighbour_id for neighbour_id, _ in neighbours])
+        results = []
+        for neighbour_id, distance in neighbours:
+            if neighbour_id in diamonds and len(results) < limit:
+                data = DiamondListSerializer(diamonds[neighbour_id], context=self.get_serializer_context()).data
+                data['distance'] = round(distance, 4)
+                results.append(data)
+        return Response({'diamond_id': diamond_id, 'results': results})
 
 
 # ============================================
 # SETTING VIEWSET
 # ============================================
 
-class SettingViewSet(viewsets.ReadOnlyModelViewSet):
+class SettingViewSet(ConditionalCatalogMixin, CachedListMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for settings
     List, retrieve, and filter settings
     """
+    catalog_names = ['setting']
+    response_cache_params = [
+        'page', 'page_size', 'ordering', 'style_type', 'metal_type',
+        'min_price', 'max_price', 'compatible_with_diamond',
+    ]
     queryset = Setting.objects.filter(is_available=True)
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['style_type', 'metal_type']
@@ -133,23 +371,44 @@ class SettingViewSet(viewsets.ReadOnlyModelViewSet):
         min_price = self.request.query_params.get('min_price')
         max_price = self.request.query_params.get('max_price')
         if min_price:
-            queryset = queryset.filter(base_price__gte=min_price)
+            queryset = queryset.filter(base_price__gte=parse_number(min_price, 'min_price'))
         if max_price:
-            queryset = queryset.filter(base_price__lte=max_price)
+            queryset = queryset.filter(base_price__lte=parse_number(max_price, 'max_price'))
+        
+        # Filter by what fits a diamond
+        diamond_id = self.request.query_params.get('compatible_with_diamond')
+        if diamond_id:
+            diamond = Diamond.objects.filter(
+                pk=parse_id(diamond_id, 'compatible_with_diamond')
+            ).only('shape', 'carat').first()
+            if diamond is None:
+                return queryset.none()
+            queryset = filter_settings_for_diamond(queryset, diamond)
         
         return queryset
+    
+    def get_catalog_names(self, request):
+        if 'compatible_with_diamond' in request.query_params:
+            return ['setting', 'diamond']
+        return self.catalog_names
 
 
 # ============================================
 # RING CONFIGURATION VIEWSET
 # ============================================
 
-class RingConfigurationViewSet(viewsets.ModelViewSet):
+class RingConfigurationViewSet(EagerLoadingMixin, FastListMixin, viewsets.ModelViewSet):
     """
     API endpoint for ring configurations
     Create, list, retrieve, update ring configurations
     """
     queryset = RingConfiguration.objects.all()
+    eager_loading = {
+        'default': {'select_related': ['diamond', 'setting']},
+        'create': {},
+        'update': {},
+        'destroy': {},
+    }
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['user', 'is_saved', 'is_ordered']
     ordering_fields = ['total_price', 'created_at']
@@ -172,20 +431,73 @@ class RingConfigurationViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        configs = self.queryset.filter(user_id=user_id)
+        configs = self.get_queryset().filter(user_id=user_id)
         serializer = self.get_serializer(configs, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['post', 'delete'])
+    def checkout(self, request, pk=None):
+        """Hold (POST) or release (DELETE) the configuration's diamond"""
+        config = self.get_object()
+        if config.diamond is None:
+            return Response(
+                {"error": "Configuration has no diamond"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        holder_key = config_holder_key(config)
+        if request.method == 'DELETE':
+            release_reservation(config.diamond, holder_key)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        
+        expires_at = reserve_diamond(config.diamond, holder_key, config=config)
+        if expires_at is None:
+            return Response(
+                {"error": "This diamond is sold or reserved by another shopper"},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response({'diamond': config.diamond_id, 'reserved_until': expires_at})
+    
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """Authoritative prices for many diamond/setting combinations"""
+        combinations = request.data
+        if isinstance(combinations, dict):
+            combinations = combinations.get('items')
+        if not isinstance(combinations, list) or not combinations:
+            return Response(
+                {"error": "A non-empty list of items is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_items = getattr(settings, 'QUOTE_MAX_ITEMS', 500)
+        if len(combinations) > max_items:
+            return Response(
+                {"error": f"At most {max_items} items per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        serializer = ConfigurationQuoteSerializer(data=combinations, many=True)
+        serializer.is_valid(raise_exception=True)
+        quotes = quote_configurations(serializer.validated_data)
+        return Response({'quotes': ConfigurationQuoteSerializer(quotes, many=True).data})
 
 
 # ============================================
 # FAVORITE VIEWSET
 # ============================================
 
-class FavoriteViewSet(viewsets.ModelViewSet):
+class FavoriteViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     API endpoint for favorites/wishlist
     """
     queryset = Favorite.objects.all()
+    eager_loading = {
+        'default': {
+            'select_related': ['diamond', 'setting', 'config__diamond', 'config__setting'],
+        },
+        'create': {},
+        'destroy': {},
+    }
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['user']
     
@@ -204,7 +516,7 @@ class FavoriteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        favorites = self.queryset.filter(user_id=user_id)
+        favorites = self.get_queryset().filter(user_id=user_id)
         serializer = self.get_serializer(favorites, many=True)
         return Response(serializer.data)
 
@@ -213,11 +525,17 @@ class FavoriteViewSet(viewsets.ModelViewSet):
 # REVIEW VIEWSET
 # ============================================
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     API endpoint for reviews
     """
     queryset = Review.objects.filter(is_approved=True)
+    eager_loading = {
+        'default': {'select_related': ['user']},
+        'create': {},
+        'mark_helpful': {},
+        'destroy': {},
+    }
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['diamond', 'setting', 'config', 'rating']
     ordering_fields = ['rating', 'helpful_count', 'created_at']
@@ -228,49 +546,46 @@ class ReviewViewSet(viewsets.ModelViewSet):
             return ReviewCreateSerializer
         return ReviewSerializer
     
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], throttle_classes=[HelpfulVoteThrottle])
     def mark_helpful(self, request, pk=None):
-        """Mark review as helpful"""
+        """Mark review as helpful (once per user/session)"""
         review = self.get_object()
-        review.helpful_count += 1
-        review.save()
-        return Response({'helpful_count': review.helpful_count})
+        counted = record_helpful_vote(review, get_voter_key(request))
+        return Response({
+            'helpful_count': get_helpful_count(review),
+            'counted': counted,
+        })
     
     @action(detail=False, methods=['get'])
     def product_reviews(self, request):
-        """Get reviews for a specific product"""
-        diamond_id = request.query_params.get('diamond_id')
-        setting_id = request.query_params.get('setting_id')
-        
-        queryset = self.queryset
-        
-        if diamond_id:
-            queryset = queryset.filter(diamond_id=diamond_id)
-        if setting_id:
-            queryset = queryset.filter(setting_id=setting_id)
-        
-        # Calculate average rating
-        avg_rating = queryset.aggregate(Avg('rating'))['rating__avg']
-        total_reviews = queryset.count()
+        """
+        A page of reviews for a product plus its rating summary: two
+        queries however many reviews the product has
+        """
+        page_size = self.paginator.get_page_size(request)
+        product, page_number, offset = parse_product_reviews(request.query_params, page_size)
         
-        serializer = self.get_serializer(queryset, many=True)
+        queryset = self.get_queryset().filter(**product)
+        summary = get_rating_summary(product.get('diamond_id'), product.get('setting_id'))
+        serializer = self.get_serializer(queryset[offset:offset + page_size], many=True)
         
-        return Response({
-            'reviews': serializer.data,
-            'average_rating': round(avg_rating, 1) if avg_rating else 0,
-            'total_reviews': total_reviews
-        })
+        return Response(product_reviews_body(
+            request.build_absolute_uri(), serializer.data, summary, page_number, page_size,
+        ))
 
 
 # ============================================
 # ORDER VIEWSET
 # ============================================
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     API endpoint for orders
     """
     queryset = Order.objects.all()
+    eager_loading = {
+        'retrieve': {'prefetch_related': ['items']},
+    }
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['user', 'status', 'payment_status']
     ordering_fields = ['created_at', 'total_amount']
@@ -293,10 +608,16 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        orders = self.queryset.filter(user_id=user_id)
+        orders = self.get_queryset().filter(user_id=user_id)
         serializer = self.get_serializer(orders, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream orders with items as CSV or NDJSON (filters + start_date/end_date)"""
+        queryset, export_format = filter_export(self.filter_queryset(self.get_queryset()), request)
+        return export_orders(queryset, export_format)
+    
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
         """Update order status"""
@@ -325,32 +646,119 @@ class UserInteractionViewSet(viewsets.ModelViewSet):
     queryset = UserInteraction.objects.all()
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['user', 'interaction_type', 'device_type']
+    ordering_fields = ['created_at']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
     
     def get_serializer_class(self):
-        if self.action == 'create':
+        if self.action in ('create', 'bulk'):
             return UserInteractionCreateSerializer
         return UserInteractionSerializer
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Accept a batch of events; they are written asynchronously"""
+        events = request.data
+        if isinstance(events, dict):
+            events = events.get('events')
+        if not isinstance(events, list) or not events:
+            return Response(
+                {"error": "A non-empty list of events is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_batch = getattr(settings, 'INTERACTION_BULK_MAX_EVENTS', 1000)
+        if len(events) > max_batch:
+            return Response(
+                {"error": f"At most {max_batch} events per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        context = self.get_serializer_context()
+        context['prefetched'] = prefetch_interaction_relations(events)
+        serializer = self.get_serializer(data=events, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+        
+        now = timezone.now()
+        try:
+            interaction_buffer.add([
+                UserInteraction(created_at=now, **event)
+                for event in serializer.validated_data
+            ])
+        except BufferFull:
+            return Response(
+                {"error": "Event buffer is full, retry later"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'}
+            )
+        
+        return Response({'accepted': len(events)}, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream interactions as CSV or NDJSON (filters + start_date/end_date)"""
+        queryset, export_format = filter_export(self.filter_queryset(self.get_queryset()), request)
+        return export_interactions(queryset, export_format)
+    
     @action(detail=False, methods=['get'])
     def analytics_summary(self, request):
         """Get analytics summary"""
-        queryset = self.queryset
-        
-        # Filter by date range if provided
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
+        try:
+            start_date = parse_bound(request.query_params.get('start_date'))
+            end_date = parse_bound(request.query_params.get('end_date'))
+        except ValueError as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        summary = {
-            'total_interactions': queryset.count(),
-            'by_type': queryset.values('interaction_type').annotate(count=Count('interaction_type')),
-            'by_device': queryset.values('device_type').annotate(count=Count('device_type')),
-            'unique_sessions': queryset.values('session_id').distinct().count(),
-        }
+        # Served from hourly/daily rollups; only hours the rollups don't
+        # cover yet (normally the current one) are read from raw rows
+        summary = summarize_interactions(start_date, end_date)
         
-        return Response(summary)
\ No newline at end of file
+        return Response(summary)
+
+
+# ============================================
+# OPS
+# ============================================
+
+class IsOpsClient(BasePermission):
+    """
+    Staff users, or clients sending `Authorization: Bearer <OPS_TOKEN>`
+    (e.g. a Prometheus scraper) when that setting is configured
+    """
+
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        token = getattr(settings, 'OPS_TOKEN', '')
+        scheme, _, sent = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return bool(token) and scheme.lower() == 'bearer' and hmac.compare_digest(sent.strip(), token)
+
+
+@api_view(['GET'])
+@permission_classes([IsOpsClient])
+def cache_stats(request):
+    """Response cache hit/miss counters for this worker process"""
+    counters = response_cache_stats.snapshot()
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_ratio'] = round(counters['hits'] / lookups, 4) if lookups else 0
+    counters['compare_cache'] = comparison_cache_info()
+    counters['pid'] = os.getpid()
+    return Response(counters)
+
+
+@api_view(['GET'])
+@permission_classes([IsOpsClient])
+def db_pool_stats(request):
+    """Database connection reuse figures for this worker process"""
+    stats = get_pool_stats()
+    stats['pid'] = os.getpid()
+    return Response(stats)
+
+
+@api_view(['GET'])
+@permission_classes([IsOpsClient])
+def metrics(request):
+    """Per-route request profiling aggregates in Prometheus text format"""
+    return HttpResponse(route_metrics.render_prometheus(), content_type='text/plain; version=0.0.4')
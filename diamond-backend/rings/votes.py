@@ -0,0 +1,112 @@
+# rings/votes.py
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import Review, ReviewHelpfulVote
+
+
+# ============================================
+# HELPFUL VOTES
+# ============================================
+#
+# Votes are appended to review_helpful_votes (unique per review and voter)
+# instead of rewriting the review row, so concurrent votes never contend on
+# a row lock or overwrite each other. aggregate_helpful_votes() periodically
+# folds pending votes into Review.helpful_count.
+#
+# A voter is the signed-in user or, for the anonymous shoppers who cast
+# nearly every vote, a server-side session started by their first vote.
+# The client address never identifies a voter, since everyone behind one
+# NAT or proxy shares it; it only caps how fast votes arrive from there.
+
+def get_client_address(request):
+    """
+    The client's address: REMOTE_ADDR, or with TRUSTED_PROXY_COUNT proxies
+    in front of the app, the X-Forwarded-For entry the outermost of them
+    added. Entries further left are whatever the client sent.
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if proxies > 0:
+        forwarded = [entry.strip() for entry in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        forwarded = [entry for entry in forwarded if entry]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def get_voter_key(request):
+    """
+    Identify the voter from what the client can't choose freely: the
+    authenticated user, else the session, started here on the first vote
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    session = request.session
+    if session.session_key is None:
+        # Saving it gives the session its key; the middleware sends the cookie
+        session['helpful_voter'] = True
+        session.save()
+    return f'session:{session.session_key}'
+
+
+class HelpfulVoteThrottle(SimpleRateThrottle):
+    """HELPFUL_VOTE_RATE per client address, counted in the default cache"""
+    scope = 'helpful_votes'
+
+    def get_rate(self):
+        return getattr(settings, 'HELPFUL_VOTE_RATE', '30/minute')
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': get_client_address(request)}
+
+
+def record_helpful_vote(review, voter_key):
+    """Record a vote; returns False if this voter already voted"""
+    try:
+        with transaction.atomic():
+            ReviewHelpfulVote.objects.create(review=review, voter_key=voter_key[:120])
+    except IntegrityError:
+        return False
+    return True
+
+
+def get_helpful_count(review):
+    """Aggregated count plus votes that haven't been folded in yet"""
+    pending = ReviewHelpfulVote.objects.filter(review=review, is_aggregated=False).count()
+    return (review.helpful_count or 0) + pending
+
+
+def aggregate_helpful_votes(batch_size=10000):
+    """
+    Fold pending votes into Review.helpful_count; returns votes processed.
+
+    Each batch runs in one transaction. Rows locked by a concurrent run are
+    skipped rather than waited on, so overlapping runs never double count.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            vote_ids = list(
+                ReviewHelpfulVote.objects.select_for_update(skip_locked=True)
+                .filter(is_aggregated=False)
+                .order_by('vote_id')
+                .values_list('vote_id', flat=True)[:batch_size]
+            )
+            if not vote_ids:
+                break
+            votes = ReviewHelpfulVote.objects.filter(vote_id__in=vote_ids)
+            per_review = votes.values('review_id').annotate(total=Count('vote_id')).order_by()
+            for row in per_review:
+                Review.objects.filter(pk=row['review_id']).update(
+                    helpful_count=Coalesce(F('helpful_count'), Value(0)) + row['total']
+                )
+            votes.update(is_aggregated=True)
+        processed += len(vote_ids)
+        if len(vote_ids) < batch_size:
+            break
+    return processed
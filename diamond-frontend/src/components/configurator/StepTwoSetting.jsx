@@ -24,6 +24,7 @@ const StepTwoSetting = ({ selectedSetting, onSelectSetting, onBack, selectedDiam
       const params = {
         page_size: 6,
         ordering: '-popularity_score',
+        compatible_with_diamond: selectedDiamond?.diamond_id,
         ...filters,
       };
 
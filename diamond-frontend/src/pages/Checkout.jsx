@@ -1,8 +1,8 @@
-import { useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { CreditCard, Lock, CheckCircle } from 'lucide-react';
 import { useCartStore } from '../store/useCartStore';
-import { orderAPI } from '../services/api';
+import { configurationAPI, orderAPI } from '../services/api';
 import { formatPrice } from '../utils/formatters';
 import Button from '../components/common/Button';
 import Loading from '../components/common/Loading';
@@ -10,10 +10,56 @@ import toast from 'react-hot-toast';
 
 const Checkout = () => {
   const navigate = useNavigate();
-  const { items, getTotal, clearCart } = useCartStore();
+  const { items, getTotal, clearCart, updateItem } = useCartStore();
   const [loading, setLoading] = useState(false);
   const [orderComplete, setOrderComplete] = useState(false);
   const [orderNumber, setOrderNumber] = useState('');
+  const orderPlaced = useRef(false);
+
+  // Hold every diamond in the cart while the form is filled in, so nobody
+  // else can buy it meanwhile. A hold belongs to a configuration, so loose
+  // diamonds and rings get one first. Holds are released when the shopper
+  // leaves without ordering and lapse on their own otherwise.
+  useEffect(() => {
+    let cancelled = false;
+    const held = [];
+
+    const holdDiamonds = async () => {
+      for (const item of useCartStore.getState().items) {
+        const diamondId = item.diamond?.diamond_id || item.diamond_id;
+        if (!diamondId || cancelled) continue;
+        try {
+          let configId = item.config_id;
+          if (!configId) {
+            const response = await configurationAPI.create({
+              diamond: diamondId,
+              setting: item.setting?.setting_id || item.setting_id || null,
+              ring_size: item.ring_size || null,
+            });
+            configId = response.data.config_id;
+            updateItem(item.id, { config_id: configId });
+          }
+          await configurationAPI.reserve(configId);
+          held.push(configId);
+        } catch (error) {
+          if (!cancelled) {
+            toast.error(
+              error.response?.data?.error || error.response?.data?.diamond?.[0] ||
+              'A diamond in your cart could not be reserved.'
+            );
+          }
+        }
+      }
+    };
+
+    holdDiamonds();
+    return () => {
+      cancelled = true;
+      if (!orderPlaced.current) {
+        held.forEach(configId => configurationAPI.release(configId).catch(() => {}));
+      }
+    };
+  }, [updateItem]);
 
   const [formData, setFormData] = useState({
     // Customer Info
@@ -86,21 +132,17 @@ const Checkout = () => {
         billing_state: formData.shippingState,
         billing_postal_code: formData.shippingZip,
         billing_country: formData.shippingCountry,
-        subtotal: subtotal.toFixed(2),
-        tax_amount: tax.toFixed(2),
-        shipping_cost: shipping.toFixed(2),
-        total_amount: total.toFixed(2),
+        // Totals and item prices are computed by the server from the catalog
         payment_method: 'credit_card',
         payment_status: 'completed',
         status: 'confirmed',
         items: items.map(item => ({
-          config_id: item.config_id || null,
+          // The held configuration; the order may only take a held stone
+          // on behalf of its holder
+          config: item.config_id || null,
           diamond_sku: item.diamond?.sku || item.sku,
           setting_sku: item.setting?.sku || '',
           ring_size: item.ring_size || '',
-          diamond_price: item.diamond?.base_price || item.base_price || 0,
-          setting_price: item.setting?.base_price || 0,
-          item_total: item.total_price,
           quantity: 1,
           item_description: `${item.type} - ${item.diamond?.shape || item.shape || ''}`
         }))
@@ -108,6 +150,7 @@ const Checkout = () => {
 
       // Submit order
       await orderAPI.create(orderData);
+      orderPlaced.current = true;
       
       // Clear cart
       clearCart();
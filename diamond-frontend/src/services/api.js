@@ -44,6 +44,9 @@ export const diamondAPI = {
   getAll: (params) => api.get('/diamonds/', { params }),
   getById: (id) => api.get(`/diamonds/${id}/`),
   getStatistics: () => api.get('/diamonds/statistics/'),
+  search: (params) => api.get('/diamonds/search/', { params }),
+  getSimilar: (id, params) => api.get(`/diamonds/${id}/similar/`, { params }),
+  compare: (ids) => api.get('/diamonds/compare/', { params: { ids: ids.join(',') } }),
 };
 
 export const settingAPI = {
@@ -58,6 +61,9 @@ export const configurationAPI = {
   update: (id, data) => api.patch(`/configurations/${id}/`, data),
   delete: (id) => api.delete(`/configurations/${id}/`),
   getMy: (userId) => api.get('/configurations/my_configurations/', { params: { user_id: userId } }),
+  reserve: (id) => api.post(`/configurations/${id}/checkout/`),
+  release: (id) => api.delete(`/configurations/${id}/checkout/`),
+  quote: (items) => api.post('/configurations/quote/', { items }),
 };
 
 export const favoriteAPI = {
@@ -71,7 +77,8 @@ export const reviewAPI = {
   getAll: (params) => api.get('/reviews/', { params }),
   create: (data) => api.post('/reviews/', data),
   getProductReviews: (params) => api.get('/reviews/product_reviews/', { params }),
-  markHelpful: (id) => api.post(`/reviews/${id}/mark_helpful/`),
+  // The session cookie set by the first vote is what tells voters apart
+  markHelpful: (id) => api.post(`/reviews/${id}/mark_helpful/`, null, { withCredentials: true }),
 };
 
 export const orderAPI = {
@@ -84,6 +91,7 @@ export const orderAPI = {
 
 export const interactionAPI = {
   create: (data) => api.post('/interactions/', data),
+  createBulk: (events) => api.post('/interactions/bulk/', events),
   getSummary: (params) => api.get('/interactions/analytics_summary/', { params }),
 };
 
@@ -7,6 +7,10 @@ export const useCartStore = create((set, get) => ({
     items: [...state.items, { ...item, id: Date.now() }]
   })),
   
+  updateItem: (id, changes) => set((state) => ({
+    items: state.items.map(item => item.id === id ? { ...item, ...changes } : item)
+  })),
+  
   removeItem: (id) => set((state) => ({
     items: state.items.filter(item => item.id !== id)
   })),